@@ -0,0 +1,52 @@
+"""Login by username or email with a single indexed query.
+
+Identifiers containing "@" match `lower(email)` (indexed by
+accounts/migrations/0001) or the username, whichever row comes first by
+preference, in one round trip. Anything else is looked up by username, as
+ModelBackend does. Password checking is ModelBackend's, so a hash made
+with an older hasher or other costs is upgraded on the next successful
+login (see PASSWORD_HASHERS in settings).
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+UserModel = get_user_model()
+
+
+def find_user(identifier: str):
+    """The user `identifier` names, or None.
+
+    For an email address, the oldest account with that email (case-insensitive)
+    wins over an account whose username happens to be the address.
+    """
+    if "@" not in identifier:
+        return UserModel._default_manager.filter(**{UserModel.USERNAME_FIELD: identifier}).first()
+    # Usernames are unique, so at most one candidate isn't an email match and the oldest
+    # email match is always within the first two rows.
+    candidates = list(
+        UserModel._default_manager.alias(email_lower=Lower("email"))
+        .filter(Q(email_lower=identifier.lower()) | Q(**{UserModel.USERNAME_FIELD: identifier}))
+        .order_by("pk")[:2]
+    )
+    for user in candidates:
+        if user.email.lower() == identifier.lower():
+            return user
+    return candidates[0] if candidates else None
+
+
+class UsernameOrEmailBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD) or kwargs.get("email")
+        if username is None or password is None:
+            return None
+        user = find_user(username)
+        if user is None:
+            # Hash anyway so a missing account takes as long as a wrong password.
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
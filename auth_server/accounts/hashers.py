@@ -0,0 +1,23 @@
+"""Password hashers whose costs come from settings.
+
+Same algorithm names as Django's own, so they verify every existing hash of
+that algorithm. When PASSWORD_HASHER or a cost setting changes, Django's
+`must_update` sees the stored parameters differ and the password is
+re-hashed with the new ones at the user's next successful login.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    time_cost = settings.PASSWORD_ARGON2_TIME_COST
+    memory_cost = settings.PASSWORD_ARGON2_MEMORY_KIB
+    parallelism = settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    rounds = settings.PASSWORD_BCRYPT_ROUNDS
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    iterations = settings.PASSWORD_PBKDF2_ITERATIONS
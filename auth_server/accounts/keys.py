@@ -0,0 +1,136 @@
+"""Asymmetric token signing keys and the JWKS we publish for them.
+
+With `JWT_ALGORITHM` set to RS256/EdDSA/ES256 the auth server signs with the
+private key from `JWT_PRIVATE_KEY_FILE` and stamps its `kid` into every
+token header. The public halves of the current key and any retired keys
+listed in `JWT_PREVIOUS_PUBLIC_KEY_FILES` are served at
+`/api/auth/.well-known/jwks.json`, so verifiers never need a shared secret.
+"""
+import base64
+import hashlib
+import json
+from functools import lru_cache
+from typing import Any, Dict, List
+
+import jwt
+from django.conf import settings
+from rest_framework_simplejwt.backends import TokenBackend
+
+# Members that make up a JWK thumbprint (RFC 7638), by key type.
+THUMBPRINT_MEMBERS = {"RSA": ("e", "kty", "n"), "EC": ("crv", "kty", "x", "y"), "OKP": ("crv", "kty", "x")}
+
+
+def is_asymmetric(algorithm: str) -> bool:
+    return not algorithm.upper().startswith("HS")
+
+
+def load_private_key(pem: str):
+    from cryptography.hazmat.primitives import serialization
+
+    return serialization.load_pem_private_key(pem.encode("utf-8"), password=None)
+
+
+def load_public_key(pem: str):
+    from cryptography.hazmat.primitives import serialization
+
+    return serialization.load_pem_public_key(pem.encode("utf-8"))
+
+
+def public_pem(public_key) -> str:
+    from cryptography.hazmat.primitives import serialization
+
+    return public_key.public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode("ascii")
+
+
+def algorithm_for_key(public_key) -> str:
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, ed448, rsa
+
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return "RS256"
+    if isinstance(public_key, (ed25519.Ed25519PublicKey, ed448.Ed448PublicKey)):
+        return "EdDSA"
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        return {"secp256r1": "ES256", "secp384r1": "ES384", "secp521r1": "ES512"}[public_key.curve.name]
+    raise ValueError(f"Unsupported key type: {type(public_key).__name__}")
+
+
+def thumbprint(jwk: Dict[str, Any]) -> str:
+    members = {k: jwk[k] for k in THUMBPRINT_MEMBERS[jwk["kty"]]}
+    digest = hashlib.sha256(json.dumps(members, sort_keys=True, separators=(",", ":")).encode("utf-8")).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def public_jwk(public_key, algorithm: str, kid: str = "") -> Dict[str, Any]:
+    jwk = jwt.PyJWS().get_algorithm_by_name(algorithm).to_jwk(public_key, as_dict=True)
+    jwk.update(kid=kid or thumbprint(jwk), use="sig", alg=algorithm)
+    return jwk
+
+
+@lru_cache(maxsize=None)
+def current_jwk() -> Dict[str, Any]:
+    """JWK for the active signing key (its `kid` goes into every token we issue)."""
+    public_key = load_private_key(settings.SIMPLE_JWT["SIGNING_KEY"]).public_key()
+    return public_jwk(public_key, settings.SIMPLE_JWT["ALGORITHM"], settings.JWT_KEY_ID)
+
+
+@lru_cache(maxsize=None)
+def jwks() -> Dict[str, List[Dict[str, Any]]]:
+    """The JWKS document. Empty when signing with a shared HMAC secret."""
+    if not is_asymmetric(settings.SIMPLE_JWT["ALGORITHM"]):
+        return {"keys": []}
+    keys = [current_jwk()]
+    for pem in settings.JWT_PREVIOUS_PUBLIC_KEYS:
+        public_key = load_public_key(pem)
+        jwk = public_jwk(public_key, algorithm_for_key(public_key))
+        if jwk["kid"] != keys[0]["kid"]:
+            keys.append(jwk)
+    return {"keys": keys}
+
+
+class KeyedTokenBackend(TokenBackend):
+    """SimpleJWT backend that puts the signing key's `kid` in the token header."""
+
+    def __init__(self, *args: Any, kid: str, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.kid = kid
+
+    def encode(self, payload: Dict[str, Any]) -> str:
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload["aud"] = self.audience
+        if self.issuer is not None:
+            jwt_payload["iss"] = self.issuer
+        return jwt.encode(
+            jwt_payload,
+            self.prepared_signing_key,
+            algorithm=self.algorithm,
+            headers={"kid": self.kid},
+            json_encoder=self.json_encoder,
+        )
+
+
+def install_token_backend() -> None:
+    """Swap SimpleJWT's module-level backend for one that signs with our key and `kid`.
+
+    SimpleJWT token classes resolve `rest_framework_simplejwt.state.token_backend`
+    lazily, so replacing it during app loading covers issuing and verifying alike.
+    """
+    from rest_framework_simplejwt import state
+    from rest_framework_simplejwt.settings import api_settings
+
+    if not is_asymmetric(api_settings.ALGORITHM):
+        return
+    private_key = load_private_key(api_settings.SIGNING_KEY)
+    state.token_backend = KeyedTokenBackend(
+        api_settings.ALGORITHM,
+        api_settings.SIGNING_KEY,
+        public_pem(private_key.public_key()),
+        api_settings.AUDIENCE,
+        api_settings.ISSUER,
+        api_settings.JWK_URL,
+        api_settings.LEEWAY,
+        api_settings.JSON_ENCODER,
+        kid=current_jwk()["kid"],
+    )
@@ -0,0 +1,5 @@
+from worknomads_common.bootstrap import BootstrapCommand
+
+
+class Command(BootstrapCommand):
+    pass
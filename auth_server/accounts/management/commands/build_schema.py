@@ -0,0 +1,5 @@
+from worknomads_common.build_schema import BuildSchemaCommand
+
+
+class Command(BuildSchemaCommand):
+    pass
@@ -0,0 +1,35 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Write a new PEM private key for asymmetric token signing (use with JWT_PRIVATE_KEY_FILE)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Where to write the private key (PEM).")
+        parser.add_argument("--algorithm", choices=["EdDSA", "RS256", "ES256"], default="EdDSA")
+        parser.add_argument("--force", action="store_true", help="Overwrite an existing file.")
+
+    def handle(self, *args, **options):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+        path = Path(options["path"])
+        if path.exists() and not options["force"]:
+            raise CommandError(f"{path} already exists (use --force to overwrite).")
+
+        algorithm = options["algorithm"]
+        if algorithm == "RS256":
+            key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        elif algorithm == "ES256":
+            key = ec.generate_private_key(ec.SECP256R1())
+        else:
+            key = ed25519.Ed25519PrivateKey.generate()
+
+        pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        path.write_bytes(pem)
+        path.chmod(0o600)
+        self.stdout.write(f"Wrote {algorithm} signing key to {path}. Set JWT_ALGORITHM={algorithm} and JWT_PRIVATE_KEY_FILE={path}.")
@@ -0,0 +1,55 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.provisioning import FORMATS, Provisioner, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users from a CSV (header: username,email,first_name,last_name,password) or JSON Lines file. "
+        "Prints each rejected row and carries on with the rest."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to read, or - for stdin.")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to the file's extension (.csv, else jsonl).")
+        parser.add_argument("--workers", type=int, default=settings.BULK_REGISTER_WORKERS, help="Hashing processes (0 = one per CPU).")
+        parser.add_argument("--batch-size", type=int, default=settings.BULK_REGISTER_BATCH_SIZE, help="Rows per query and insert.")
+        parser.add_argument("--errors", help="Also write the rejected rows' results here, one JSON object per line.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("csv" if path.lower().endswith(".csv") else "jsonl")
+        if path == "-":
+            source = sys.stdin
+        else:
+            try:
+                source = Path(path).open(newline="", encoding="utf-8")
+            except OSError as exc:
+                raise CommandError(f"Can't read {path}: {exc}")
+        errors = Path(options["errors"]).open("w", encoding="utf-8") if options["errors"] else None
+
+        start = time.monotonic()
+        try:
+            with Provisioner(workers=options["workers"], batch_size=options["batch_size"]) as provisioner:
+                for result in provisioner.run(read_rows(source, fmt)):
+                    if result["status"] == 201:
+                        continue
+                    self.stderr.write(f"row {result['row']} ({result['username']}): {json.dumps(result['errors'])}")
+                    if errors is not None:
+                        errors.write(json.dumps(result) + "\n")
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if errors is not None:
+                errors.close()
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            f"Created {provisioner.created} user(s), rejected {provisioner.failed} row(s) in {elapsed:.1f}s "
+            f"({provisioner.created / max(elapsed, 1e-9):.0f} users/s)."
+        )
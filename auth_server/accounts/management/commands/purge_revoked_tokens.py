@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.revocation import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete revoked-token rows whose tokens have expired anyway; run it from cron or a scheduled job."
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(f"Purged {deleted} expired revocation(s).")
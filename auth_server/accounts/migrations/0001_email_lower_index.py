@@ -0,0 +1,31 @@
+"""Index auth_user on lower(email) for login by email (accounts.backends.find_user).
+
+auth.User belongs to django.contrib.auth, so the index is created with SQL
+here instead of in its Meta. On PostgreSQL it's built CONCURRENTLY, so
+signups and logins aren't blocked while it builds on a large table.
+"""
+from django.db import migrations
+
+INDEX_NAME = "accounts_user_email_lower_idx"
+
+
+def create_index(apps, schema_editor):
+    concurrently = "CONCURRENTLY " if schema_editor.connection.vendor == "postgresql" else ""
+    table = schema_editor.quote_name(apps.get_model("auth", "User")._meta.db_table)
+    schema_editor.execute(f"CREATE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} ON {table} (LOWER(email))")
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index, elidable=False),
+    ]
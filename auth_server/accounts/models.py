@@ -0,0 +1,19 @@
+from django.db import models
+from django.utils import timezone
+
+
+class RevokedToken(models.Model):
+    """A revoked refresh token, or a whole family of rotated ones (accounts.revocation).
+
+    Only a signed 64-bit fingerprint of the jti or family id is kept, so a
+    million rows stay small and an insert doubles as the "was it already
+    revoked?" check through the unique index. Rows are worthless once
+    `expires_at` has passed and are removed by `manage.py purge_revoked_tokens`.
+    """
+
+    fingerprint = models.BigIntegerField(unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.fingerprint:x} until {self.expires_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,33 @@
+"""Request parsers for bulk registration: CSV with a header line, or JSON Lines.
+
+Both hand the view a list of row dicts, the same as a JSON array body.
+They stop reading one row past BULK_REGISTER_MAX_USERS so the view can
+refuse an oversized request without parsing all of it.
+"""
+import codecs
+from itertools import islice
+
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+
+from .provisioning import read_rows
+
+
+class RowsParser(BaseParser):
+    format = ""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        lines = codecs.iterdecode(stream, encoding)
+        return list(islice(read_rows(lines, self.format), settings.BULK_REGISTER_MAX_USERS + 1))
+
+
+class CSVRowsParser(RowsParser):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class JSONLinesRowsParser(RowsParser):
+    media_type = "application/x-ndjson"
+    format = "jsonl"
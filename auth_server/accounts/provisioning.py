@@ -0,0 +1,203 @@
+"""Registering many users at once: `POST /api/auth/register/bulk/` and `manage.py import_users`.
+
+Rows are dicts with RegisterSerializer's fields. They are read lazily and
+handled BULK_REGISTER_BATCH_SIZE at a time, so a file of any size is
+imported in bounded memory. For each batch:
+
+- each row's fields are checked in this process (ProvisionUserSerializer);
+- usernames are checked with one `username__in` query for the whole batch,
+  and against the batch's earlier rows;
+- password validation (AUTH_PASSWORD_VALIDATORS) and hashing, nearly all of
+  the work, run on a pool of BULK_REGISTER_WORKERS processes for
+  `import_users`. The endpoint hashes in the request's own thread; its
+  rows are capped at BULK_REGISTER_MAX_USERS;
+- the rows that are left go in with one bulk_create.
+
+Every row gets a result, in input order: 201, or 400 with that row's
+errors. A bad row never stops the others. Users are normalized the way
+`create_user` does it, but bulk_create sends no post_save signals.
+"""
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connections, transaction
+
+FORMATS = ("csv", "jsonl")
+USERNAME_TAKEN = "A user with that username already exists."
+
+
+def read_rows(lines: Iterable[str], fmt: str) -> Iterator[object]:
+    """Rows from CSV (with a header line) or JSON Lines text.
+
+    A JSONL line that isn't valid JSON comes through as the raw string, so
+    it fails validation as a row of its own instead of ending the import.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line
+
+
+def _init_worker(settings_module: Optional[str]) -> None:
+    # Forked workers inherit a configured Django; spawned ones have to set it up.
+    if not apps.ready:
+        if settings_module:
+            os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+        django.setup()
+
+
+def hash_password(fields: dict) -> Tuple[str, List[str]]:
+    """(encoded hash, []) for a row that passes AUTH_PASSWORD_VALIDATORS, else ("", errors). Runs in the pool."""
+    user = get_user_model()(
+        username=fields["username"],
+        email=fields.get("email", ""),
+        first_name=fields.get("first_name", ""),
+        last_name=fields.get("last_name", ""),
+    )
+    try:
+        validate_password(fields["password"], user)
+    except ValidationError as exc:
+        return "", list(exc.messages)
+    return make_password(fields["password"]), []
+
+
+class Provisioner:
+    """Creates users from a stream of rows.
+
+    Passwords are hashed in the calling thread unless `workers` is more
+    than 1 (0 means one per CPU). A pool is only for single-threaded callers
+    like `import_users`: it forks, and starting it closes this process's DB
+    connections. It starts with the first batch that has more than one
+    password to hash; use this as a context manager so it's shut down.
+    """
+
+    def __init__(self, workers: int = 1, batch_size: Optional[int] = None):
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.batch_size = max(batch_size or settings.BULK_REGISTER_BATCH_SIZE, 1)
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.created = self.failed = 0
+
+    def __enter__(self) -> "Provisioner":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def start_pool(self, workers: int) -> None:
+        # Don't hand open DB sockets to the forked workers; they never use the DB.
+        connections.close_all()
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(os.environ.get("DJANGO_SETTINGS_MODULE"),),
+        )
+
+    def run(self, rows: Iterable[object]) -> Iterator[dict]:
+        """One result per row, in order, yielded as each batch is committed."""
+        rows = iter(rows)
+        first = 1
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return
+            yield from self.provision(batch, first)
+            first += len(batch)
+
+    def provision(self, batch: List[object], first: int = 1) -> List[dict]:
+        from .serializers import ProvisionUserSerializer
+
+        User = get_user_model()
+        results: List[Optional[dict]] = [None] * len(batch)
+
+        def fail(i: int, errors) -> None:
+            data = batch[i]
+            username = data.get("username") if isinstance(data, dict) else None
+            results[i] = {"row": first + i, "username": username, "status": 400, "errors": errors}
+
+        valid = {}
+        for i, data in enumerate(batch):
+            serializer = ProvisionUserSerializer(data=data)
+            if not serializer.is_valid():
+                fail(i, serializer.errors)
+                continue
+            fields = dict(serializer.validated_data)
+            fields["username"] = User.normalize_username(fields["username"])
+            fields["email"] = BaseUserManager.normalize_email(fields.get("email", ""))
+            valid[i] = fields
+
+        taken = set(User.objects.filter(username__in=[f["username"] for f in valid.values()]).values_list("username", flat=True))
+        for i in list(valid):
+            username = valid[i]["username"]
+            if username in taken:
+                fail(i, {"username": [USERNAME_TAKEN]})
+                del valid[i]
+            taken.add(username)
+
+        indexes = list(valid)
+        rows = [valid[i] for i in indexes]
+        if self.pool is None and self.workers > 1 and len(rows) > 1:
+            self.start_pool(min(self.workers, len(rows)))
+        if self.pool is not None:
+            # A few chunks per worker: few round trips, and no worker left idle at the end.
+            hashed = self.pool.map(hash_password, rows, chunksize=max(1, len(rows) // (self.workers * 4)))
+        else:
+            hashed = map(hash_password, rows)
+        users = {}
+        for i, (encoded, errors) in zip(indexes, hashed):
+            if errors:
+                fail(i, {"password": errors})
+                continue
+            fields = valid[i]
+            users[i] = User(
+                username=fields["username"],
+                email=fields["email"],
+                first_name=fields.get("first_name", ""),
+                last_name=fields.get("last_name", ""),
+                password=encoded,
+            )
+
+        self.insert(users, fail)
+        for i in users:
+            results[i] = {"row": first + i, "username": users[i].username, "status": 201}
+        self.created += len(users)
+        self.failed += len(batch) - len(users)
+        return results
+
+    def insert(self, users: dict, fail) -> None:
+        User = get_user_model()
+        while users:
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create(users.values())
+                return
+            except IntegrityError:
+                # Someone registered one of these usernames after the check: drop those rows, insert the rest.
+                names = {user.username: i for i, user in users.items()}
+                taken = set(User.objects.filter(username__in=list(names)).values_list("username", flat=True))
+                if not taken:
+                    raise
+                for username in taken:
+                    fail(names[username], {"username": [USERNAME_TAKEN]})
+                    del users[names[username]]
@@ -0,0 +1,230 @@
+"""Revoked refresh tokens: a Bloom filter in memory, a compact table behind it.
+
+Every refresh rotates the token: the old jti is revoked and a new refresh
+token comes back. Revoking is one INSERT into RevokedToken. Its unique
+index also catches a token that was already rotated. That is a replay, so
+the whole family (every token descended from the same login, `fam` claim)
+is revoked too. Logout revokes the family.
+
+Checking is the hot path and doesn't touch the database: each process
+keeps a Bloom filter of the revoked fingerprints. A miss means "not
+revoked" for certain. Only a hit, which is a real revocation or a false
+positive (REVOCATION_FILTER_ERROR_RATE), is confirmed with one indexed
+lookup.
+
+Revocations made by other processes reach the filter on a background
+sync every REVOCATION_SYNC_SECONDS. Until then a revoked family can still
+refresh there, but a replayed jti is always caught by the insert. Bloom
+filters can't forget, so the filter is rebuilt from the unexpired rows
+every REVOCATION_REBUILD_SECONDS, or sooner once it holds more than it
+was sized for. With REVOCATION_FILTER_PATH set, the last build is saved
+there so a restarted worker loads it instead of reading the whole table.
+"""
+import hashlib
+import logging
+import math
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+JTI = "jti"
+FAMILY = "fam"
+# Rows are read again from this far back on each sync: a row's created_at is set before its
+# transaction commits, and app servers' clocks differ a little.
+SYNC_OVERLAP = timedelta(seconds=60)
+MASK32 = 0xFFFFFFFF
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def fingerprint(kind: str, value: str) -> int:
+    """Signed 64-bit digest of a jti or family id; `kind` keeps the two apart."""
+    digest = hashlib.blake2b(f"{kind}:{value}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 64-bit fingerprints (double hashing on their two halves).
+
+    `count` is kept by the caller: the same fingerprint may be added more than once.
+    """
+
+    HEADER = struct.Struct("!4sQIQd")
+    MAGIC = b"RVK1"
+
+    def __init__(self, capacity: int, error_rate: float, bits: Optional[bytearray] = None, size: int = 0, hashes: int = 0):
+        self.capacity = capacity
+        self.size = size or max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = hashes or max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.built_at = 0.0
+
+    def add(self, fp: int) -> None:
+        fp &= MASK64
+        h1, h2 = fp & MASK32, (fp >> 32) | 1
+        size, bits = self.size, self.bits
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % size
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, fp: int) -> bool:
+        fp &= MASK64
+        h1, h2 = fp & MASK32, (fp >> 32) | 1
+        size, bits = self.size, self.bits
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % size
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.size, self.hashes, self.count, self.built_at))
+            f.write(self.bits)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, capacity: int) -> Optional["BloomFilter"]:
+        try:
+            with open(path, "rb") as f:
+                magic, size, hashes, count, built_at = cls.HEADER.unpack(f.read(cls.HEADER.size))
+                bits = bytearray(f.read())
+        except (OSError, struct.error):
+            return None
+        if magic != cls.MAGIC or len(bits) != (size + 7) // 8:
+            return None
+        bloom = cls(capacity, 0.5, bits=bits, size=size, hashes=hashes)
+        bloom.count, bloom.built_at = count, built_at
+        return bloom
+
+
+class RevocationList:
+    def __init__(self):
+        self._filter: Optional[BloomFilter] = None
+        self._synced_at: Optional[datetime] = None
+        self._last_id = 0
+        self._add_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    # Checking
+
+    def is_revoked(self, kind: str, value: str) -> bool:
+        fp = fingerprint(kind, value)
+        if fp not in self.filter():
+            return False
+        return RevokedToken.objects.filter(fingerprint=fp).exists()
+
+    # Revoking
+
+    def revoke(self, kind: str, value: str, expires_at: datetime) -> bool:
+        """Record the revocation; False if it had been revoked already."""
+        fp = fingerprint(kind, value)
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(fingerprint=fp, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        finally:
+            self._add(fp)
+        return True
+
+    def _add(self, fp: int) -> None:
+        bloom = self._filter
+        if bloom is not None:
+            with self._add_lock:
+                bloom.add(fp)
+
+    # Keeping the filter current
+
+    def filter(self) -> BloomFilter:
+        if self._thread is None:
+            self._start()
+        return self._filter
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            path = settings.REVOCATION_FILTER_PATH
+            bloom = BloomFilter.load(path, settings.REVOCATION_FILTER_CAPACITY) if path else None
+            if bloom is not None and time.time() - bloom.built_at < settings.REVOCATION_REBUILD_SECONDS:
+                self._filter = bloom
+                self._synced_at = datetime.fromtimestamp(bloom.built_at, tz=dt_timezone.utc)
+                self.sync()
+            else:
+                # First build happens inline so the very first check is answered.
+                self.rebuild()
+            self._thread = threading.Thread(target=self._run, name="revocation-sync", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(settings.REVOCATION_SYNC_SECONDS)
+            try:
+                bloom = self._filter
+                if bloom.count > bloom.capacity or time.time() - bloom.built_at >= settings.REVOCATION_REBUILD_SECONDS:
+                    self.rebuild()
+                else:
+                    self.sync()
+            except Exception:
+                logger.exception("Syncing the token revocation filter failed")
+
+    def sync(self) -> int:
+        """Add rows other processes wrote since the last sync; returns how many were read."""
+        started = timezone.now()
+        rows = RevokedToken.objects.filter(created_at__gte=self._synced_at - SYNC_OVERLAP, expires_at__gt=started)
+        read = 0
+        for pk, fp in rows.values_list("pk", "fingerprint").iterator(chunk_size=10000):
+            self._add(fp)
+            read += 1
+            # The overlap re-reads rows; only count each one once.
+            if pk > self._last_id:
+                self._filter.count += 1
+                self._last_id = pk
+        self._synced_at = started
+        return read
+
+    def rebuild(self) -> BloomFilter:
+        """Build a fresh filter from the unexpired rows and swap it in."""
+        started = timezone.now()
+        rows = RevokedToken.objects.filter(expires_at__gt=started)
+        capacity = max(settings.REVOCATION_FILTER_CAPACITY, rows.count() * 2)
+        bloom = BloomFilter(capacity, settings.REVOCATION_FILTER_ERROR_RATE)
+        last_id = 0
+        for pk, fp in rows.values_list("pk", "fingerprint").iterator(chunk_size=10000):
+            bloom.add(fp)
+            bloom.count += 1
+            last_id = max(last_id, pk)
+        bloom.built_at = started.timestamp()
+        self._last_id = last_id
+        self._filter = bloom
+        # Revocations committed while the rows were being read.
+        self._synced_at = started
+        self.sync()
+        if settings.REVOCATION_FILTER_PATH:
+            try:
+                bloom.save(settings.REVOCATION_FILTER_PATH)
+            except OSError as exc:
+                logger.warning("Saving the revocation filter to %s failed: %s", settings.REVOCATION_FILTER_PATH, exc)
+        return bloom
+
+
+revocations = RevocationList()
+
+
+def purge_expired() -> int:
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
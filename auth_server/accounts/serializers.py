@@ -1,7 +1,18 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
-from django.db.models import Q
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .revocation import FAMILY, JTI, revocations
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -22,34 +33,40 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
+class ProvisionUserSerializer(RegisterSerializer):
+    """One row of a bulk registration: RegisterSerializer's checks minus its per-row uniqueness query.
+
+    accounts.provisioning checks usernames a whole batch at a time instead.
+    """
+
+    class Meta(RegisterSerializer.Meta):
+        extra_kwargs = {"username": {"validators": [UnicodeUsernameValidator()]}}
+
+
+class BulkRegisterResultSerializer(serializers.Serializer):
+    row = serializers.IntegerField(help_text="1-based position of the row in the request")
+    username = serializers.CharField(allow_null=True)
+    status = serializers.IntegerField(help_text="201 if created, 400 if not")
+    errors = serializers.DictField(required=False, help_text="Per-field messages, when status is 400")
+
+
 class LoginByUsernameOrEmailSerializer(TokenObtainPairSerializer):
     """Allow login using either username or email.
 
     This accepts the standard SimpleJWT payload:
     - {"username": "<username or email>", "password": "..."}
 
-    For convenience, it also accepts {"email": "...", "password": "..."}.
-    We normalize inputs to the actual username before calling the parent.
+    The identifier goes straight to `authenticate()`, where
+    accounts.backends.UsernameOrEmailBackend resolves it in one query.
     """
 
-    def validate(self, attrs):
-        identifier = attrs.get("username") or attrs.get("email") or ""
-        if identifier:
-            # If it looks like an email, try to resolve it to a username.
-            if "@" in identifier:
-                user = (
-                    User.objects.filter(Q(email__iexact=identifier)).order_by("id").first()
-                )
-                if user:
-                    attrs["username"] = getattr(user, User.USERNAME_FIELD, user.username)
-            # else: assume it's already a username
-
-        return super().validate(attrs)
-
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
         # Include a few handy claims for the backend to consume (optional)
+        # Every token rotated from this one carries the same family id, so a logout or a
+        # replayed token can revoke them all at once.
+        token[FAMILY] = token[api_settings.JTI_CLAIM]
         token["username"] = user.get_username()
         if getattr(user, "email", ""):
             token["email"] = user.email
@@ -58,3 +75,61 @@ class LoginByUsernameOrEmailSerializer(TokenObtainPairSerializer):
         if getattr(user, "last_name", ""):
             token["last_name"] = user.last_name
         return token
+
+
+def family_of(refresh: RefreshToken) -> str:
+    # Tokens issued before families existed are a family of one.
+    return refresh.get(FAMILY) or refresh[api_settings.JTI_CLAIM]
+
+
+def revoke_family(family: str) -> None:
+    # Any live member was issued before now, so none outlives now + the refresh lifetime.
+    expires_at = datetime.now(timezone.utc) + settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"]
+    revocations.revoke(FAMILY, family, expires_at)
+
+
+class RotatingRefreshSerializer(TokenRefreshSerializer):
+    """Refresh that also hands back a new refresh token and revokes the one it was given.
+
+    A revoked family is refused after a Bloom filter check (no query, see
+    accounts.revocation). Presenting a token that was already rotated means
+    it leaked, so its whole family is revoked and the refresh refused.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        jti = refresh[api_settings.JTI_CLAIM]
+        family = family_of(refresh)
+        if revocations.is_revoked(FAMILY, family):
+            raise TokenError(_("Token is revoked"))
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM, None)
+        if user_id:
+            user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            if not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        if not revocations.revoke(JTI, jti, datetime.fromtimestamp(refresh["exp"], timezone.utc)):
+            revoke_family(family)
+            raise TokenError(_("Token is revoked"))
+
+        data = {"access": str(refresh.access_token)}
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        data["refresh"] = str(refresh)
+        return data
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(write_only=True)
+
+    def validate(self, attrs):
+        try:
+            attrs["token"] = RefreshToken(attrs["refresh"])
+        except TokenError as exc:
+            raise InvalidToken(exc.args[0])
+        return attrs
+
+    def save(self, **kwargs):
+        revoke_family(family_of(self.validated_data["token"]))
@@ -1,8 +1,11 @@
 from django.urls import path
-from .views import RegisterView, LoginView, LoginRefreshView
+from .views import RegisterView, BulkRegisterView, LoginView, LoginRefreshView, LogoutView, JWKSView
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
+    path("register/bulk/", BulkRegisterView.as_view(), name="register-bulk"),
     path("login/", LoginView.as_view(), name="login"),
     path("login/refresh/", LoginRefreshView.as_view(), name="login-refresh"),
+    path("logout/", LogoutView.as_view(), name="logout"),
+    path(".well-known/jwks.json", JWKSView.as_view(), name="jwks"),
 ]
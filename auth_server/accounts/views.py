@@ -1,9 +1,22 @@
-from rest_framework import status
+from django.conf import settings
+from rest_framework import permissions, serializers, status
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, inline_serializer
 from drf_spectacular.types import OpenApiTypes
-from .serializers import RegisterSerializer, LoginByUsernameOrEmailSerializer
+from worknomads_common import metrics
+from .keys import jwks
+from .parsers import CSVRowsParser, JSONLinesRowsParser
+from .provisioning import Provisioner
+from .serializers import (
+    BulkRegisterResultSerializer,
+    LoginByUsernameOrEmailSerializer,
+    LogoutSerializer,
+    ProvisionUserSerializer,
+    RegisterSerializer,
+    RotatingRefreshSerializer,
+)
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 
@@ -34,6 +47,58 @@ class RegisterView(APIView):
         return Response({"detail": "Registration successful"}, status=status.HTTP_201_CREATED)
 
 
+class BulkRegisterView(APIView):
+    """Registers many users in one request (staff only).
+
+    Takes a JSON array of RegisterView payloads, CSV with a header line
+    (`text/csv`) or JSON Lines (`application/x-ndjson`). Rows are checked
+    and inserted in batches (accounts.provisioning). Passwords are hashed in
+    this thread; forking a pool from a threaded server worker isn't safe,
+    and BULK_REGISTER_MAX_USERS bounds the work. `manage.py import_users`
+    does the same with a process pool, for files of any size.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [JSONParser, CSVRowsParser, JSONLinesRowsParser]
+
+    @extend_schema(
+        summary="Register many users at once (staff only)",
+        description=(
+            "Up to BULK_REGISTER_MAX_USERS rows. Each row is created or rejected on its own: the response is 207 "
+            "with one result per row, in request order."
+        ),
+        request=ProvisionUserSerializer(many=True),
+        responses={
+            207: inline_serializer(
+                name="BulkRegisterResponse",
+                fields={
+                    "created": serializers.IntegerField(),
+                    "failed": serializers.IntegerField(),
+                    "results": BulkRegisterResultSerializer(many=True),
+                },
+            ),
+            400: OpenApiTypes.OBJECT,
+            413: OpenApiTypes.OBJECT,
+        },
+    )
+    def post(self, request):
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response({"detail": "Expected a list of users."}, status=status.HTTP_400_BAD_REQUEST)
+        max_users = settings.BULK_REGISTER_MAX_USERS
+        if len(rows) > max_users:
+            return Response(
+                {"detail": f"Too many users. At most {max_users} per request; use `manage.py import_users` for more."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        provisioner = Provisioner()
+        results = list(provisioner.run(rows))
+        return Response(
+            {"created": provisioner.created, "failed": provisioner.failed, "results": results},
+            status=status.HTTP_207_MULTI_STATUS,
+        )
+
+
 @extend_schema(
     summary="Login (obtain access & refresh tokens)",
     tags=["auth"],
@@ -41,10 +106,74 @@ class RegisterView(APIView):
 class LoginView(TokenObtainPairView):
     serializer_class = LoginByUsernameOrEmailSerializer
 
+    def post(self, request, *args, **kwargs):
+        # Password check plus signing the token pair.
+        with metrics.phase("auth"):
+            return super().post(request, *args, **kwargs)
+
 
 @extend_schema(
-    summary="Refresh access token",
+    summary="Refresh access token (rotates the refresh token)",
     tags=["auth"],
+    responses={
+        200: {
+            "type": "object",
+            "properties": {"access": {"type": "string"}, "refresh": {"type": "string"}},
+        },
+        401: OpenApiTypes.OBJECT,
+    },
 )
 class LoginRefreshView(TokenRefreshView):
-    pass
+    """Returns a new access token and a new refresh token; the one sent is revoked."""
+
+    serializer_class = RotatingRefreshSerializer
+
+    def post(self, request, *args, **kwargs):
+        # Verifying the refresh token plus signing the new access token.
+        with metrics.phase("auth"):
+            return super().post(request, *args, **kwargs)
+
+
+class LogoutView(APIView):
+    """Revokes the refresh token sent and every token rotated from the same login.
+
+    Access tokens already issued stay valid until they expire.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+
+    def get_authenticate_header(self, request):
+        # Lets an invalid token answer 401 (as refresh does) rather than 403.
+        return 'Bearer realm="api"'
+
+    @extend_schema(
+        summary="Logout (revoke a refresh token)",
+        request=LogoutSerializer,
+        responses={204: None, 401: OpenApiTypes.OBJECT},
+        tags=["auth"],
+    )
+    def post(self, request):
+        serializer = LogoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class JWKSView(APIView):
+    """Public keys for verifying the tokens we issue (RFC 7517 key set).
+
+    Verifiers pick the key by the token's `kid` header and cache this document;
+    it only changes when keys are rotated.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+
+    @extend_schema(
+        summary="JSON Web Key Set for token verification",
+        responses={200: OpenApiTypes.OBJECT},
+        tags=["auth"],
+    )
+    def get(self, request):
+        return Response(jwks(), headers={"Cache-Control": "public, max-age=300"})
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
-import dj_database_url
+
+from worknomads_common.db import database
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -9,6 +10,10 @@ DEBUG = os.getenv("DJANGO_DEBUG", "False").lower() == "true"
 ALLOWED_HOSTS = [h.strip() for h in os.getenv("DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1,[::1]").split(",") if h.strip()]
 TIME_ZONE = os.getenv("DJANGO_TIME_ZONE", "UTC")
 
+# Serve the OpenAPI schema with Swagger UI and ReDoc. Off, drf-spectacular is neither installed nor
+# imported by the URLconf, which trims start-up time and memory for replicas that only serve the API.
+API_DOCS_ENABLED = os.getenv("API_DOCS_ENABLED", "True").lower() == "true"
+
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
@@ -17,13 +22,15 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "rest_framework",
-    "drf_spectacular",
+    *(["drf_spectacular"] if API_DOCS_ENABLED else []),
     "corsheaders",
     "rest_framework_simplejwt",
     "accounts",
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover every other middleware too.
+    "worknomads_common.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -54,11 +61,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "auth_server.wsgi.application"
 
+# Persistent connections per thread (CONN_MAX_AGE), or a pool per process with DATABASE_POOL=true;
+# see common/worknomads_common/db.py for the knobs.
 DATABASES = {
-    "default": dj_database_url.parse(
-        os.getenv("DATABASE_URL", f"sqlite:///{(BASE_DIR / 'db.sqlite3').as_posix()}"),
-        conn_max_age=600,
-    )
+    "default": database(os.getenv("DATABASE_URL", f"sqlite:///{(BASE_DIR / 'db.sqlite3').as_posix()}")),
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -68,6 +74,30 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
+# One query per login, by username or case-insensitive email (accounts/backends.py).
+AUTHENTICATION_BACKENDS = ["accounts.backends.UsernameOrEmailBackend"]
+
+# Hasher for new and re-saved passwords: "argon2" (default), "bcrypt", "scrypt" or "pbkdf2". The others
+# stay listed so existing hashes still verify; a user whose hash was made with another hasher or other
+# costs is re-hashed with these on their next successful login. The Argon2 defaults are OWASP's
+# (argon2id, 19 MiB, 2 passes, 1 lane): tens of ms of CPU and 19 MiB per concurrent login, where Django's
+# default PBKDF2 (1M iterations) spends over half a second. `python -m benchmarks.login` compares them.
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "argon2")
+PASSWORD_ARGON2_TIME_COST = int(os.getenv("PASSWORD_ARGON2_TIME_COST", "2"))
+PASSWORD_ARGON2_MEMORY_KIB = int(os.getenv("PASSWORD_ARGON2_MEMORY_KIB", "19456"))
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", "1"))
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "1000000"))
+PASSWORD_HASHER_CHOICES = {
+    "argon2": "accounts.hashers.Argon2PasswordHasher",
+    "bcrypt": "accounts.hashers.BCryptSHA256PasswordHasher",
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+    "pbkdf2": "accounts.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER
+]
+
 LANGUAGE_CODE = "en-us"
 USE_I18N = True
 USE_TZ = True
@@ -83,20 +113,88 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.AllowAny",
     ),
-    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": (
+        "worknomads_common.metrics.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
+if API_DOCS_ENABLED:
+    REST_FRAMEWORK["DEFAULT_SCHEMA_CLASS"] = "drf_spectacular.openapi.AutoSchema"
 
 from datetime import timedelta
+
+
+def _read_pem(path: str) -> str:
+    return Path(path).read_text()
+
+
+# HS256 with the shared SIMPLE_JWT_SIGNING_KEY stays the default. Set JWT_ALGORITHM to RS256/EdDSA/ES256
+# and JWT_PRIVATE_KEY_FILE to a PEM private key to sign asymmetrically; the public key is then published
+# at /api/auth/.well-known/jwks.json and the backend no longer needs any secret.
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+JWT_PRIVATE_KEY_FILE = os.getenv("JWT_PRIVATE_KEY_FILE", "")
+# Defaults to the key's RFC 7638 thumbprint.
+JWT_KEY_ID = os.getenv("JWT_KEY_ID", "")
+# Retired public keys (comma-separated PEM paths) kept in the JWKS until tokens signed with them expire.
+JWT_PREVIOUS_PUBLIC_KEYS = [
+    _read_pem(p.strip()) for p in os.getenv("JWT_PREVIOUS_PUBLIC_KEY_FILES", "").split(",") if p.strip()
+]
+
 SIMPLE_JWT = {
-    "SIGNING_KEY": os.getenv("SIMPLE_JWT_SIGNING_KEY", SECRET_KEY),
-    "ALGORITHM": "HS256",
+    "SIGNING_KEY": (
+        _read_pem(JWT_PRIVATE_KEY_FILE)
+        if JWT_PRIVATE_KEY_FILE and not JWT_ALGORITHM.upper().startswith("HS")
+        else os.getenv("SIMPLE_JWT_SIGNING_KEY", SECRET_KEY)
+    ),
+    "ALGORITHM": JWT_ALGORITHM,
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    # Every refresh returns a new refresh token; accounts.revocation revokes the old one.
+    "ROTATE_REFRESH_TOKENS": True,
 }
 
+# Revoked refresh tokens (accounts/revocation.py): each process checks a Bloom filter sized for
+# REVOCATION_FILTER_CAPACITY entries at REVOCATION_FILTER_ERROR_RATE false positives (1M at 0.1% is
+# ~1.8 MB), picks up other processes' revocations every REVOCATION_SYNC_SECONDS, and rebuilds it
+# without expired entries every REVOCATION_REBUILD_SECONDS. REVOCATION_FILTER_PATH, if set, keeps the
+# last build on disk so restarted workers don't re-read the table. `manage.py purge_revoked_tokens`
+# deletes expired rows.
+REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", "1000000"))
+REVOCATION_FILTER_ERROR_RATE = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", "0.001"))
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+REVOCATION_REBUILD_SECONDS = float(os.getenv("REVOCATION_REBUILD_SECONDS", "3600"))
+REVOCATION_FILTER_PATH = os.getenv("REVOCATION_FILTER_PATH", "")
+
+# Bulk registration (accounts/provisioning.py): POST /api/auth/register/bulk/ (staff only, at most
+# BULK_REGISTER_MAX_USERS rows per request) and `manage.py import_users` for CSV/JSONL files. Rows are
+# checked and inserted BULK_REGISTER_BATCH_SIZE at a time. import_users runs password validation and
+# hashing on BULK_REGISTER_WORKERS processes (0 = one per CPU, 1 = in the calling process); the endpoint
+# always hashes in the request's thread.
+BULK_REGISTER_WORKERS = int(os.getenv("BULK_REGISTER_WORKERS", "0"))
+BULK_REGISTER_BATCH_SIZE = int(os.getenv("BULK_REGISTER_BATCH_SIZE", "1000"))
+BULK_REGISTER_MAX_USERS = int(os.getenv("BULK_REGISTER_MAX_USERS", "1000"))
+
+# Request metrics (common/worknomads_common/metrics.py), scraped from /metrics. METRICS_TOKEN, if set, is the
+# bearer token the scraper must send. Under gunicorn each worker writes its numbers to METRICS_DIR every
+# METRICS_FLUSH_SECONDS so any worker can answer for all of them (worknomads_common/gunicorn_conf.py defaults it to /dev/shm).
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+# Add a Server-Timing header (auth, db, render, total) to every response; it shows in browser dev tools.
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "False").lower() == "true"
+
 CORS_ALLOWED_ORIGINS = [o.strip() for o in os.getenv("CORS_ALLOWED_ORIGINS", "").split(",") if o.strip()]
 CORS_ALLOW_ALL_ORIGINS = not CORS_ALLOWED_ORIGINS
 
+# Serve /api/schema/ from a document built once per process instead of introspecting every view on each
+# request (worknomads_common/schema.py). `manage.py build_schema` writes it to API_SCHEMA_FILE at image build
+# time; without the file, each process generates it on its first schema request. Off by default under DEBUG,
+# so edits show up straight away.
+API_SCHEMA_CACHE = os.getenv("API_SCHEMA_CACHE", str(not DEBUG)).lower() == "true"
+API_SCHEMA_FILE = os.getenv("API_SCHEMA_FILE", str(BASE_DIR / "openapi-schema.json"))
+# The settings the document depends on. The file records a digest of them and isn't served if they differ.
+API_SCHEMA_SETTINGS = ["REST_FRAMEWORK", "SPECTACULAR_SETTINGS"]
 SPECTACULAR_SETTINGS = {
     "TITLE": "Auth Server API",
     "DESCRIPTION": "Registration and JWT token issuance",
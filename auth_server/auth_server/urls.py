@@ -1,24 +1,35 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-    SpectacularRedocView,
-)
+
+from worknomads_common.metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/auth/", include("accounts.urls")),
-    # OpenAPI schema and docs
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path(
-        "api/docs/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
-        name="swagger-ui",
-    ),
-    path(
-        "api/redoc/",
-        SpectacularRedocView.as_view(url_name="schema"),
-        name="redoc",
-    ),
+    # Prometheus scrape endpoint
+    path("metrics", metrics_view, name="metrics"),
 ]
+
+if settings.API_DOCS_ENABLED:
+    from drf_spectacular.views import (
+        SpectacularSwaggerView,
+        SpectacularRedocView,
+    )
+
+    from worknomads_common.schema import CachedSchemaView
+
+    # OpenAPI schema and docs
+    urlpatterns += [
+        path("api/schema/", CachedSchemaView.as_view(), name="schema"),
+        path(
+            "api/docs/",
+            SpectacularSwaggerView.as_view(url_name="schema"),
+            name="swagger-ui",
+        ),
+        path(
+            "api/redoc/",
+            SpectacularRedocView.as_view(url_name="schema"),
+            name="redoc",
+        ),
+    ]
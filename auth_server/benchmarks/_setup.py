@@ -0,0 +1,31 @@
+"""Shared bootstrapping for the auth server's benchmark scripts.
+
+Each script runs against a throwaway SQLite database unless
+BENCH_DATABASE_URL points somewhere else (e.g. a local Postgres). Run them
+from `auth_server/`, e.g. `python -m benchmarks.login`.
+"""
+import os
+import statistics
+import tempfile
+from pathlib import Path
+from typing import List
+
+
+def setup_django() -> Path:
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "auth_server.settings")
+    os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{(workdir / 'bench.db').as_posix()}")
+    os.environ.setdefault("DJANGO_ALLOWED_HOSTS", "*")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    return workdir
+
+
+def summarize(samples: List[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"median {statistics.median(samples):7.2f} ms  p95 {p95:7.2f} ms"
@@ -0,0 +1,66 @@
+"""Bulk registration throughput against one RegisterView request per user.
+
+Writes `--users` rows to a CSV file, then reports users per second for:
+- `POST /api/auth/register/` once per user, over the first `--serial` rows
+  (like RegisterView, no AUTH_PASSWORD_VALIDATORS);
+- `manage.py import_users` on the whole file with 1 hashing process and
+  with one per CPU (field checks, set-based uniqueness check, password
+  validation and hashing, bulk_create);
+and the time each would take for 100k users. Hashing dominates, so the
+pool scales with the number of cores; run it on a machine with several.
+
+    python -m benchmarks.bulk_register --users 5000
+"""
+import argparse
+import csv
+import io
+import os
+import time
+
+from ._setup import setup_django
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--serial", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    workdir = setup_django()
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.test import Client
+
+    path = workdir / "users.csv"
+    with path.open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["username", "email", "first_name", "last_name", "password"])
+        for i in range(args.users):
+            writer.writerow([f"member{i}", f"member{i}@example.com", "Member", str(i), f"onboarding-{i}-Xq7"])
+
+    def report(label: str, users: int, elapsed: float) -> None:
+        rate = users / elapsed
+        print(f"{label:36} {rate:8.1f} users/s   100k users in {100_000 / rate / 60:6.1f} min")
+
+    client = Client()
+    with path.open(newline="") as f:
+        rows = list(csv.DictReader(f))[: args.serial]
+    start = time.perf_counter()
+    for row in rows:
+        row["username"] = "serial-" + row["username"]
+        assert client.post("/api/auth/register/", row, content_type="application/json").status_code == 201
+    report("POST /api/auth/register/ per user", len(rows), time.perf_counter() - start)
+
+    cpus = os.cpu_count() or 1
+    for workers in sorted({1, cpus}):
+        User.objects.filter(username__startswith="member").delete()
+        start = time.perf_counter()
+        call_command("import_users", str(path), workers=workers, batch_size=args.batch_size, stdout=io.StringIO())
+        elapsed = time.perf_counter() - start
+        assert User.objects.filter(username__startswith="member").count() == args.users
+        report(f"import_users, {workers} process(es)", args.users, elapsed)
+
+
+if __name__ == "__main__":
+    main()
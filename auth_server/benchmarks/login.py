@@ -0,0 +1,94 @@
+"""Login throughput: the user lookup, the password hasher, and rehash-on-login.
+
+Seeds `--users` accounts, then reports:
+- the lookup by email: the old `email__iexact` query followed by SimpleJWT's
+  second lookup by username, against the single `lower(email)` query of
+  accounts.backends.find_user (queries per login and time per lookup);
+- logins per second through `POST /api/auth/login/`, on one thread, with
+  each hasher policy;
+- rehash-on-login: a user with a Django-default PBKDF2 hash logs in once
+  under the Argon2 policy, and later logins use the Argon2 hash.
+
+    python -m benchmarks.login --users 50000 --seconds 3
+"""
+import argparse
+import time
+
+from ._setup import setup_django, summarize
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--lookups", type=int, default=300)
+    parser.add_argument("--seconds", type=float, default=3.0, help="Login time per hasher policy.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client, override_settings
+    from django.test.utils import CaptureQueriesContext
+
+    from accounts.backends import find_user
+
+    placeholder = make_password(None)
+    batch = [
+        User(username=f"user{i}", email=f"User{i}@Example.com", password=placeholder) for i in range(args.users)
+    ]
+    User.objects.bulk_create(batch, batch_size=2000)
+
+    def old_lookup(identifier: str) -> User:
+        user = User.objects.filter(email__iexact=identifier).order_by("id").first()
+        return User._default_manager.get_by_natural_key(user.username)
+
+    for label, lookup in (("iexact + by username", old_lookup), ("lower(email), one query", find_user)):
+        with CaptureQueriesContext(connection) as queries:
+            lookup("user1@example.com")
+        samples = []
+        for i in range(args.lookups):
+            identifier = f"user{i * 7919 % args.users}@example.com"
+            start = time.perf_counter()
+            user = lookup(identifier)
+            samples.append((time.perf_counter() - start) * 1000)
+            assert user.username == identifier.split("@")[0]
+        print(f"lookup, {label:24} {len(queries)} queries  {summarize(samples)}")
+
+    client = Client()
+    body = {"username": "user1@example.com", "password": "correct horse battery staple"}
+    policies = {
+        "pbkdf2 (Django default)": "pbkdf2",
+        f"bcrypt {settings.PASSWORD_BCRYPT_ROUNDS} rounds": "bcrypt",
+        f"argon2 {settings.PASSWORD_ARGON2_MEMORY_KIB // 1024} MiB x{settings.PASSWORD_ARGON2_TIME_COST}": "argon2",
+    }
+    user = User.objects.get(username="user1")
+    for label, name in policies.items():
+        choices = settings.PASSWORD_HASHER_CHOICES
+        hashers = [choices[name]] + [path for other, path in choices.items() if other != name]
+        with override_settings(PASSWORD_HASHERS=hashers):
+            user.set_password(body["password"])
+            user.save(update_fields=["password"])
+            logins = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < args.seconds:
+                resp = client.post("/api/auth/login/", body, content_type="application/json")
+                assert resp.status_code == 200, resp.content
+                logins += 1
+            print(f"login, {label:26} {logins / (time.perf_counter() - start):7.1f} logins/s")
+
+    # A hash from before the policy change: Django's stock PBKDF2 settings.
+    with override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.PBKDF2PasswordHasher"]):
+        user.set_password(body["password"])
+        user.save(update_fields=["password"])
+    for attempt in ("first", "second", "third"):
+        start = time.perf_counter()
+        assert client.post("/api/auth/login/", body, content_type="application/json").status_code == 200
+        elapsed = (time.perf_counter() - start) * 1000
+        algorithm = User.objects.get(pk=user.pk).password.split("$", 1)[0]
+        print(f"rehash-on-login, {attempt:6} login under the {settings.PASSWORD_HASHER} policy: {elapsed:7.1f} ms, stored hash now {algorithm}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
-import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional, Tuple
 
 import jwt
@@ -6,12 +9,17 @@ from django.contrib.auth.models import AnonymousUser
 from rest_framework import authentication, exceptions
 
 from django.conf import settings
-from drf_spectacular.extensions import OpenApiAuthenticationExtension
+
+from worknomads_common import metrics
+
+from .jwks import JWKSCache
 
 
 class AuthUser:
     """Tiny user object we build from JWT claims (no DB lookup here)."""
 
+    __slots__ = ("id", "username", "email", "first_name", "last_name")
+
     def __init__(self, user_id: str | int, username: str = "", email: str = "", first_name: str = "", last_name: str = ""):
         self.id = user_id
         self.username = username
@@ -24,17 +32,107 @@ class AuthUser:
         return True
 
 
+class VerifiedTokenCache:
+    """Bounded LRU of tokens whose signature we've already checked.
+
+    Keyed by a digest of the raw token so the token itself isn't kept around.
+    Each entry expires at the token's own `exp`, or after `ttl` seconds if
+    that comes first. A hit skips signature verification and claim parsing
+    and hands back the same AuthUser and payload as the first time.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, Tuple[float, AuthUser, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def key(token: bytes) -> bytes:
+        return hashlib.blake2b(token, digest_size=20).digest()
+
+    def get(self, key: bytes) -> Optional[Tuple[AuthUser, dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key: bytes, user: AuthUser, payload: dict) -> None:
+        expires_at = time.time() + self.ttl
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        with self._lock:
+            self._entries[key] = (expires_at, user, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+    def register_metrics(self, prefix: str) -> None:
+        """Export the counters at /metrics as `<prefix>_hits_total`, `<prefix>_misses_total` and `<prefix>_entries`."""
+        metrics.registry.register(f"{prefix}_hits_total", "counter", "Requests whose token was found in the cache.", lambda: self.hits)
+        metrics.registry.register(
+            f"{prefix}_misses_total", "counter", "Requests whose token had to be verified.", lambda: self.misses
+        )
+        metrics.registry.register(f"{prefix}_entries", "gauge", "Verified tokens cached.", lambda: len(self._entries))
+
+
+# Set when the auth server signs asymmetrically (JWT_JWKS_URL); otherwise we verify with the shared secret.
+jwks_cache = (
+    JWKSCache(settings.JWT_JWKS_URL, refresh_interval=settings.JWT_JWKS_REFRESH_SECONDS)
+    if getattr(settings, "JWT_JWKS_URL", "")
+    else None
+)
+
+token_cache = VerifiedTokenCache(
+    max_size=getattr(settings, "JWT_VERIFIED_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "JWT_VERIFIED_CACHE_TTL", 300),
+)
+token_cache.register_metrics("jwt_verified_cache")
+
+
 class ExternalJWTAuthentication(authentication.BaseAuthentication):
     """Accepts a Bearer token from the auth service and checks its signature.
 
     We skip Django's user model entirely and just return a minimal user-like
-    object with a couple of fields from the token.
+    object with a couple of fields from the token. Verified tokens are kept
+    in `token_cache`, so repeat requests with the same token skip the HMAC.
     """
 
-    keyword = "Bearer"
+    keyword = b"Bearer"
+    cache = token_cache
 
     def authenticate(self, request) -> Optional[Tuple[AuthUser, dict]]:
-        header = authentication.get_authorization_header(request).decode("utf-8")
+        with metrics.phase("auth"):
+            return self.authenticate_bearer(request)
+
+    def authenticate_header(self, request) -> str:
+        """WWW-Authenticate value; DRF answers 401 rather than 403 when authentication fails."""
+        return 'Bearer realm="api"'
+
+    def authenticate_bearer(self, request) -> Optional[Tuple[AuthUser, dict]]:
+        header = authentication.get_authorization_header(request)
         if not header:
             return None
         parts = header.split()
@@ -42,11 +140,40 @@ class ExternalJWTAuthentication(authentication.BaseAuthentication):
             raise exceptions.AuthenticationFailed("Bad Authorization header. Expected: 'Bearer <token>'.")
 
         token = parts[1]
+        if self.cache.enabled:
+            key = self.cache.key(token)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        user, payload = self.verify(token)
+        if self.cache.enabled:
+            self.cache.put(key, user, payload)
+        return user, payload
+
+    def verification_key(self, token: bytes):
+        """Key and allowed algorithms for this token: from the JWKS by `kid`, or the shared secret."""
+        if jwks_cache is None:
+            return settings.SIMPLE_JWT_SIGNING_KEY, [getattr(settings, "SIMPLE_JWT_ALGORITHM", "HS256")]
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.InvalidTokenError:
+            raise exceptions.AuthenticationFailed("Invalid token.")
+        try:
+            jwk = jwks_cache.get_key(kid)
+        except KeyError:
+            raise exceptions.AuthenticationFailed("Unknown token signing key.")
+        if jwk.algorithm_name not in settings.JWT_ALLOWED_ALGORITHMS:
+            raise exceptions.AuthenticationFailed("Invalid token.")
+        return jwk.key, [jwk.algorithm_name]
+
+    def verify(self, token: bytes) -> Tuple[AuthUser, dict]:
+        key, algorithms = self.verification_key(token)
         try:
             payload = jwt.decode(
                 token,
-                settings.SIMPLE_JWT_SIGNING_KEY,
-                algorithms=[getattr(settings, "SIMPLE_JWT_ALGORITHM", "HS256")],
+                key,
+                algorithms=algorithms,
                 options={"verify_aud": False},
             )
         except jwt.ExpiredSignatureError:
@@ -64,18 +191,3 @@ class ExternalJWTAuthentication(authentication.BaseAuthentication):
 
         user = AuthUser(user_id=user_id, username=username, email=email, first_name=first_name, last_name=last_name)
         return user, payload
-
-
-class ExternalJWTAuthenticationScheme(OpenApiAuthenticationExtension):
-    """Tells drf-spectacular how to render the Bearer auth in Swagger UI."""
-
-    target_class = "backend_server.authentication.ExternalJWTAuthentication"
-    name = "ExternalJWTAuthentication"
-    match_subclasses = True
-
-    def get_security_definition(self, auto_schema):
-        return {
-            "type": "http",
-            "scheme": "bearer",
-            "bearerFormat": "JWT",
-        }
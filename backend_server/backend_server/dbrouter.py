@@ -0,0 +1,165 @@
+"""Read replicas for the media tables, with read-your-writes stickiness.
+
+With DATABASE_REPLICA_URLS set, `ReplicaRoutingMiddleware` gives each
+GET/HEAD/OPTIONS request one replica, picked at random. `ReplicaRouter`
+sends that request's reads of the replicated apps (the media tables:
+listings, downloads, usage, waveforms, the admin changelist) to it.
+Everything else stays on the primary:
+- reads in any other request method, so an upload's quota check or a
+  delete's lookups see current rows;
+- reads inside a transaction on the primary, `select_for_update()` included;
+- reads outside a request (management commands, the derivative worker);
+- sessions, users and the other Django apps, whose rows are read straight
+  after they're written (a login, then the next page);
+- every read of an owner who wrote in the last DATABASE_REPLICA_STICKY_SECONDS.
+
+That last rule is the stickiness. The first write of a request pins its
+user in the "db_pins" cache, before the transaction commits. Until the pin
+expires, every request for that owner reads the primary, from any client.
+That includes their other devices, so a list page rebuilt after the
+upload's cache bump (mediafiles/listcache.py) isn't read from a replica
+that hasn't caught up yet and then cached. The window only has to outlast
+replication lag. Pins are only shared between workers if the cache is
+(see MEDIA_LIST_CACHE_URL); with the local-memory default a pin covers the
+worker that took the write, which is enough for a single-worker deploy.
+"""
+import contextvars
+import random
+from typing import List, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+PIN_CACHE_ALIAS = "db_pins"
+REPLICATED_APPS = frozenset(("mediafiles",))
+READ_ONLY_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+class Routing:
+    """One request's routing state. Mutated in place, so sync_to_async threads share it."""
+
+    __slots__ = ("request", "replica", "wrote", "pinned", "pin_recorded")
+
+    def __init__(self, request, replica: Optional[str]):
+        self.request = request
+        self.replica = replica
+        self.wrote = False
+        # None until the user is known.
+        self.pinned: Optional[bool] = None
+        self.pin_recorded = False
+
+
+current: contextvars.ContextVar[Optional[Routing]] = contextvars.ContextVar("db_routing", default=None)
+
+
+def replicas() -> List[str]:
+    return settings.DATABASE_REPLICAS
+
+
+def pin_key(user_id) -> str:
+    return f"db-pin:{user_id}"
+
+
+def request_user_id(request) -> Optional[str]:
+    """The request's user id, or None if nobody is authenticated yet. Never loads a lazy user itself."""
+    user = getattr(request, "user", None)
+    if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+        return None
+    if not getattr(user, "is_authenticated", False):
+        return None
+    return str(user.id)
+
+
+def pinned(state: Routing) -> bool:
+    if state.pinned is None:
+        user_id = request_user_id(state.request)
+        if user_id is None:
+            return False
+        state.pinned = caches[PIN_CACHE_ALIAS].get(pin_key(user_id)) is not None
+    return state.pinned
+
+
+def record_pin(state: Routing) -> None:
+    """Pin the request's user to the primary, once; a no-op until the user is known."""
+    if state.pin_recorded:
+        return
+    user_id = request_user_id(state.request)
+    if user_id is not None:
+        caches[PIN_CACHE_ALIAS].set(pin_key(user_id), 1, timeout=settings.DATABASE_REPLICA_STICKY_SECONDS)
+        state.pin_recorded = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = current.get()
+        if state is None or state.replica is None or state.wrote:
+            return None
+        if model._meta.app_label not in REPLICATED_APPS:
+            return None
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block or pinned(state):
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current.get()
+        if state is not None:
+            state.wrote = True
+            record_pin(state)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        return db not in replicas()
+
+
+class ReplicaRoutingMiddleware:
+    """Sets up `current` for each request; a no-op without replicas."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state, token = self.start(request)
+        try:
+            return self.get_response(request)
+        finally:
+            self.finish(state, token)
+
+    async def __acall__(self, request):
+        state, token = self.start(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            self.finish(state, token)
+
+    def start(self, request):
+        replica = random.choice(replicas()) if request.method in READ_ONLY_METHODS else None
+        state = Routing(request, replica)
+        return state, current.set(state)
+
+    def finish(self, state: Routing, token: contextvars.Token) -> None:
+        current.reset(token)
+        if state.wrote:
+            # The user may only have become known after the write (session logins, for one).
+            record_pin(state)
@@ -0,0 +1,91 @@
+"""In-process cache of the auth server's public signing keys (JWKS).
+
+Keys are fetched once, then refreshed on a daemon thread every
+`refresh_interval` seconds, so verifying a token never waits on the
+network. A token with an unknown `kid` (the auth server just rotated)
+triggers one synchronous refetch, rate-limited by `min_refetch_interval`.
+"""
+import json
+import logging
+import threading
+import time
+import urllib.request
+from typing import Dict, Optional
+
+import jwt
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSCache:
+    def __init__(self, url: str, refresh_interval: float = 300, min_refetch_interval: float = 30, timeout: float = 5):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._fetched_at: Optional[float] = None
+        self._fetch_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def get_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        """Return the key for `kid`; raises KeyError if the auth server doesn't publish it."""
+        self._ensure_started()
+        key = self._keys.get(kid or "")
+        if key is None and self._stale_enough_to_refetch():
+            self.refresh()
+            key = self._keys.get(kid or "")
+        if key is None:
+            raise KeyError(kid)
+        return key
+
+    def refresh(self) -> bool:
+        """Fetch the key set now. Keeps the previous keys if the fetch fails."""
+        with self._fetch_lock:
+            try:
+                with urllib.request.urlopen(self.url, timeout=self.timeout) as resp:
+                    document = json.load(resp)
+            except (OSError, ValueError) as exc:
+                logger.warning("JWKS fetch from %s failed: %s", self.url, exc)
+                return False
+            finally:
+                self._fetched_at = time.monotonic()
+
+            if not isinstance(document, dict) or not isinstance(document.get("keys", []), list):
+                logger.warning("JWKS fetch from %s failed: expected an object with a \"keys\" list", self.url)
+                return False
+
+            keys = {}
+            for data in document.get("keys", []):
+                if not isinstance(data, dict):
+                    logger.warning("Skipping JWK that isn't an object: %r", data)
+                    continue
+                try:
+                    key = jwt.PyJWK(data)
+                except jwt.PyJWKError as exc:
+                    logger.warning("Skipping unusable JWK %r: %s", data.get("kid"), exc)
+                    continue
+                if key.key_id:
+                    keys[key.key_id] = key
+            # Swap the whole dict so readers never see a half-built key set.
+            self._keys = keys
+            return True
+
+    def _stale_enough_to_refetch(self) -> bool:
+        return self._fetched_at is None or time.monotonic() - self._fetched_at >= self.min_refetch_interval
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._fetch_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="jwks-refresh", daemon=True)
+        # First fetch happens inline so the very first request can be verified.
+        self.refresh()
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.refresh_interval)
+            self.refresh()
@@ -0,0 +1,20 @@
+"""The backend's drf-spectacular extension, only imported when API_DOCS_ENABLED.
+
+The cached /api/schema/ view itself is shared: worknomads_common.schema.
+"""
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+
+
+class ExternalJWTAuthenticationScheme(OpenApiAuthenticationExtension):
+    """Tells drf-spectacular how to render the Bearer auth in Swagger UI."""
+
+    target_class = "backend_server.authentication.ExternalJWTAuthentication"
+    name = "ExternalJWTAuthentication"
+    match_subclasses = True
+
+    def get_security_definition(self, auto_schema):
+        return {
+            "type": "http",
+            "scheme": "bearer",
+            "bearerFormat": "JWT",
+        }
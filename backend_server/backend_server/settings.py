@@ -1,8 +1,9 @@
 import os
 from pathlib import Path
-import dj_database_url
 from datetime import timedelta
 
+from worknomads_common.db import database
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "dev-secret-backend-change")
@@ -10,6 +11,10 @@ DEBUG = os.getenv("DJANGO_DEBUG", "False").lower() == "true"
 ALLOWED_HOSTS = [h.strip() for h in os.getenv("DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1,[::1]").split(",") if h.strip()]
 TIME_ZONE = os.getenv("DJANGO_TIME_ZONE", "UTC")
 
+# Serve the OpenAPI schema with Swagger UI and ReDoc. Off, drf-spectacular is neither installed nor
+# imported by the URLconf, which trims start-up time and memory for replicas that only serve the API.
+API_DOCS_ENABLED = os.getenv("API_DOCS_ENABLED", "True").lower() == "true"
+
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
@@ -18,12 +23,16 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "rest_framework",
-    "drf_spectacular",
+    *(["drf_spectacular"] if API_DOCS_ENABLED else []),
     "corsheaders",
     "mediafiles",
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover every other middleware too.
+    "worknomads_common.metrics.MetricsMiddleware",
+    # Before anything that reads the database; only used with DATABASE_REPLICA_URLS.
+    "backend_server.dbrouter.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -54,13 +63,22 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "backend_server.wsgi.application"
 
+# Persistent connections per thread (CONN_MAX_AGE), or a pool per process with DATABASE_POOL=true;
+# see common/worknomads_common/db.py for the knobs.
 DATABASES = {
-    "default": dj_database_url.parse(
-        os.getenv("DATABASE_URL", f"sqlite:///{(BASE_DIR / 'db.sqlite3').as_posix()}"),
-        conn_max_age=600,
-    )
+    "default": database(os.getenv("DATABASE_URL", f"sqlite:///{(BASE_DIR / 'db.sqlite3').as_posix()}")),
 }
 
+# Read replicas (comma-separated URLs) for the media tables; see backend_server/dbrouter.py for what reads
+# go there. An owner's reads stay on the primary for DATABASE_REPLICA_STICKY_SECONDS after they write,
+# which should be longer than replication lag.
+DATABASE_REPLICAS = []
+for n, url in enumerate(u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()):
+    DATABASE_REPLICAS.append(f"replica{n + 1}")
+    DATABASES[f"replica{n + 1}"] = {**database(url), "TEST": {"MIRROR": "default"}}
+DATABASE_ROUTERS = ["backend_server.dbrouter.ReplicaRouter"]
+DATABASE_REPLICA_STICKY_SECONDS = int(os.getenv("DATABASE_REPLICA_STICKY_SECONDS", "10"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -77,7 +95,113 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 MEDIA_URL = "/media/"
-MEDIA_ROOT = BASE_DIR / "media"
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", BASE_DIR / "media"))
+
+# Where stored media lives: "local" (MEDIA_ROOT, so a single node) or "s3" (any S3-compatible object
+# store: AWS S3, MinIO, ...). Upload staging, resumable-upload parts and derivative scratch files stay
+# under MEDIA_ROOT either way.
+MEDIA_STORAGE_BACKEND = os.getenv("MEDIA_STORAGE_BACKEND", "local")
+MEDIA_S3_BUCKET = os.getenv("MEDIA_S3_BUCKET", "media")
+MEDIA_S3_ENDPOINT_URL = os.getenv("MEDIA_S3_ENDPOINT_URL", "")  # empty for AWS itself
+# The endpoint clients reach for presigned URLs, if it isn't the one the backend uses (http://localhost:9000 vs http://minio:9000).
+MEDIA_S3_PUBLIC_ENDPOINT_URL = os.getenv("MEDIA_S3_PUBLIC_ENDPOINT_URL", "") or MEDIA_S3_ENDPOINT_URL
+MEDIA_S3_REGION = os.getenv("MEDIA_S3_REGION", "us-east-1")
+MEDIA_S3_ACCESS_KEY_ID = os.getenv("MEDIA_S3_ACCESS_KEY_ID", "")
+MEDIA_S3_SECRET_ACCESS_KEY = os.getenv("MEDIA_S3_SECRET_ACCESS_KEY", "")
+# Lifetime of presigned download and direct-upload URLs.
+MEDIA_PRESIGNED_URL_TTL = int(os.getenv("MEDIA_PRESIGNED_URL_TTL", "900"))
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+if MEDIA_STORAGE_BACKEND == "s3":
+    STORAGES["default"] = {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {
+            "bucket_name": MEDIA_S3_BUCKET,
+            "endpoint_url": MEDIA_S3_ENDPOINT_URL or None,
+            "region_name": MEDIA_S3_REGION,
+            "access_key": MEDIA_S3_ACCESS_KEY_ID or None,
+            "secret_key": MEDIA_S3_SECRET_ACCESS_KEY or None,
+            "signature_version": "s3v4",
+            "addressing_style": "path",
+            # Blob names are content hashes, so writing the same name twice writes the same bytes.
+            "file_overwrite": True,
+            "default_acl": None,
+            "querystring_expire": MEDIA_PRESIGNED_URL_TTL,
+        },
+    }
+
+# Per-type upload limits, enforced while the body streams in.
+MEDIA_MAX_UPLOAD_BYTES = {
+    "image": int(os.getenv("MEDIA_MAX_IMAGE_MB", "20")) * 1024 * 1024,
+    "audio": int(os.getenv("MEDIA_MAX_AUDIO_MB", "200")) * 1024 * 1024,
+}
+# Batch endpoints: files per `upload/<type>/batch/` request and ids per `delete/batch/` request.
+MEDIA_BATCH_MAX_FILES = int(os.getenv("MEDIA_BATCH_MAX_FILES", "100"))
+MEDIA_BATCH_MAX_DELETE = int(os.getenv("MEDIA_BATCH_MAX_DELETE", "1000"))
+# Threads used to remove storage objects concurrently (batch delete).
+MEDIA_STORAGE_IO_WORKERS = int(os.getenv("MEDIA_STORAGE_IO_WORKERS", "8"))
+# Total bytes each owner may store across all file types; 0 means no quota.
+MEDIA_QUOTA_BYTES = int(os.getenv("MEDIA_QUOTA_MB", "0")) * 1024 * 1024
+
+# Resized renditions rendered in the background for every uploaded image: name -> longest edge (px) and format.
+# Clients pick one with `?variant=<name>` on the list endpoint.
+MEDIA_IMAGE_VARIANTS = {
+    "thumb": {"size": 256, "format": "WEBP"},
+    "small": {"size": 640, "format": "WEBP"},
+    "large": {"size": 1600, "format": "JPEG"},
+}
+# Min/max pairs in each audio file's waveform (served at /api/media/waveform/<id>/); 2000 pairs is ~4 KB.
+MEDIA_WAVEFORM_POINTS = int(os.getenv("MEDIA_WAVEFORM_POINTS", "2000"))
+# Render processes used by `manage.py process_derivatives`, and how often a job is retried before it's marked failed.
+MEDIA_DERIVATIVE_WORKERS = int(os.getenv("MEDIA_DERIVATIVE_WORKERS", "2"))
+MEDIA_DERIVATIVE_MAX_ATTEMPTS = int(os.getenv("MEDIA_DERIVATIVE_MAX_ATTEMPTS", "3"))
+# Deleted files removed per transaction by `manage.py collect_garbage`.
+MEDIA_GC_BATCH_SIZE = int(os.getenv("MEDIA_GC_BATCH_SIZE", "100"))
+
+# Hand downloads to the reverse proxy instead of streaming them from Python:
+# "X-Accel-Redirect" (nginx, paths under MEDIA_ACCEL_REDIRECT_PREFIX) or
+# "X-Sendfile" (Apache/lighttpd, absolute paths). Empty serves them directly.
+MEDIA_SENDFILE_HEADER = os.getenv("MEDIA_SENDFILE_HEADER", "")
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+
+# Serve upload/list/delete with the async views (mediafiles/async_views.py); on by default under ASGI.
+MEDIA_ASYNC_VIEWS = os.getenv("MEDIA_ASYNC_VIEWS", str(os.getenv("SERVER_MODE") == "asgi")).lower() == "true"
+
+# Resumable multi-part uploads
+MEDIA_UPLOAD_PART_MAX_BYTES = int(os.getenv("MEDIA_UPLOAD_PART_MAX_MB", "32")) * 1024 * 1024
+MEDIA_UPLOAD_MAX_PARTS = int(os.getenv("MEDIA_UPLOAD_MAX_PARTS", "10000"))
+MEDIA_UPLOAD_SESSION_TTL = timedelta(hours=int(os.getenv("MEDIA_UPLOAD_SESSION_TTL_HOURS", "24")))
+
+# Per-owner cache of /api/media/list/ pages (0 disables it). Local memory by default, which is per
+# process: under gunicorn with several workers, a write only invalidates the worker that served it
+# and the others can serve the old listing for up to the TTL. Point MEDIA_LIST_CACHE_URL at a shared
+# cache (redis://host:6379/0 needs `redis`, memcached://host:11211 needs `pymemcache`) to avoid that.
+MEDIA_LIST_CACHE_TTL = int(os.getenv("MEDIA_LIST_CACHE_TTL", "60"))
+MEDIA_LIST_CACHE_URL = os.getenv("MEDIA_LIST_CACHE_URL", "")
+if MEDIA_LIST_CACHE_URL.startswith(("redis://", "rediss://")):
+    MEDIA_LIST_CACHE = {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": MEDIA_LIST_CACHE_URL}
+elif MEDIA_LIST_CACHE_URL.startswith("memcached://"):
+    MEDIA_LIST_CACHE = {
+        "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+        "LOCATION": MEDIA_LIST_CACHE_URL.removeprefix("memcached://"),
+    }
+else:
+    MEDIA_LIST_CACHE = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "media-list",
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("MEDIA_LIST_CACHE_MAX_ENTRIES", "10000"))},
+    }
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "media_list": {**MEDIA_LIST_CACHE, "TIMEOUT": MEDIA_LIST_CACHE_TTL},
+    # Read-your-writes pins for replica routing, on the same server as list pages but never evicted by them.
+    "db_pins": {**MEDIA_LIST_CACHE, "KEY_PREFIX": "db-pins"},
+}
+if CACHES["db_pins"]["BACKEND"].endswith("LocMemCache"):
+    CACHES["db_pins"]["LOCATION"] = "db-pins"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
@@ -86,16 +210,53 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
-    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": (
+        "worknomads_common.metrics.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
+if API_DOCS_ENABLED:
+    REST_FRAMEWORK["DEFAULT_SCHEMA_CLASS"] = "drf_spectacular.openapi.AutoSchema"
 
 SIMPLE_JWT_SIGNING_KEY = os.getenv("SIMPLE_JWT_SIGNING_KEY", SECRET_KEY)
 SIMPLE_JWT_ALGORITHM = os.getenv("SIMPLE_JWT_ALGORITHM", "HS256")
+# When set, verify tokens against the auth server's published public keys (picked by `kid`)
+# instead of the shared SIMPLE_JWT_SIGNING_KEY, e.g. http://auth_server:8000/api/auth/.well-known/jwks.json
+JWT_JWKS_URL = os.getenv("JWT_JWKS_URL", "")
+JWT_JWKS_REFRESH_SECONDS = int(os.getenv("JWT_JWKS_REFRESH_SECONDS", "300"))
+JWT_ALLOWED_ALGORITHMS = [a.strip() for a in os.getenv("JWT_ALLOWED_ALGORITHMS", "RS256,EdDSA,ES256").split(",") if a.strip()]
 ACCESS_TOKEN_LIFETIME = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_MINUTES", "60")))
+# Per-process cache of already-verified tokens (0 disables it). Entries never outlive the token's exp.
+JWT_VERIFIED_CACHE_SIZE = int(os.getenv("JWT_VERIFIED_CACHE_SIZE", "10000"))
+JWT_VERIFIED_CACHE_TTL = int(os.getenv("JWT_VERIFIED_CACHE_TTL", "300"))
+
+# Request metrics (common/worknomads_common/metrics.py), scraped from /metrics. METRICS_TOKEN, if set, is the
+# bearer token the scraper must send. Under gunicorn each worker writes its numbers to METRICS_DIR every
+# METRICS_FLUSH_SECONDS so any worker can answer for all of them (worknomads_common/gunicorn_conf.py defaults it to /dev/shm).
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+# Add a Server-Timing header (auth, db, storage, total) to every response; it shows in browser dev tools.
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "False").lower() == "true"
 
 CORS_ALLOWED_ORIGINS = [o.strip() for o in os.getenv("CORS_ALLOWED_ORIGINS", "").split(",") if o.strip()]
 CORS_ALLOW_ALL_ORIGINS = not CORS_ALLOWED_ORIGINS
 
+# Serve /api/schema/ from a document built once per process instead of introspecting every view on each
+# request (worknomads_common/schema.py). `manage.py build_schema` writes it to API_SCHEMA_FILE at image build
+# time; without the file, each process generates it on its first schema request. Off by default under DEBUG,
+# so edits show up straight away.
+API_SCHEMA_CACHE = os.getenv("API_SCHEMA_CACHE", str(not DEBUG)).lower() == "true"
+API_SCHEMA_FILE = os.getenv("API_SCHEMA_FILE", str(BASE_DIR / "openapi-schema.json"))
+# The settings the document depends on. The file records a digest of them and isn't served if they differ.
+API_SCHEMA_SETTINGS = [
+    "REST_FRAMEWORK",
+    "SPECTACULAR_SETTINGS",
+    "MEDIA_ASYNC_VIEWS",
+    "MEDIA_IMAGE_VARIANTS",
+    "MEDIA_BATCH_MAX_DELETE",
+]
 SPECTACULAR_SETTINGS = {
     "TITLE": "Backend Media API",
     "DESCRIPTION": "Authenticated media upload and listing",
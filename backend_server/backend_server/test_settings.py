@@ -0,0 +1,10 @@
+"""Settings for `manage.py test`: the usual ones plus a "replica1" alias that mirrors the primary.
+
+A test mirror shares the primary's test database, so the router's tests
+can check which connection each query went to. Routing only turns on
+where a test sets DATABASE_REPLICAS; every other test reads the primary.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+DATABASES.setdefault("replica1", {**DATABASES["default"], "TEST": {"MIRROR": "default"}})
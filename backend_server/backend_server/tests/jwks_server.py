@@ -0,0 +1,49 @@
+"""A local stand-in for the auth server's `/.well-known/jwks.json`, shared by the tests and benchmarks/jwks_verify.py."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+
+
+class StandInJWKS:
+    """Serves `{"keys": [...published keys]}` from a thread, or `document` instead when that is set."""
+
+    def __init__(self):
+        self.keys = []
+        self.document = None
+        self.fetches = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.fetches += 1
+                document = stand_in.document if stand_in.document is not None else {"keys": stand_in.keys}
+                body = json.dumps(document).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/auth/.well-known/jwks.json"
+
+    def publish(self, private_key, algorithm: str, kid: str) -> None:
+        jwk = jwt.PyJWS().get_algorithm_by_name(algorithm).to_jwk(private_key.public_key(), as_dict=True)
+        jwk.update(kid=kid, use="sig", alg=algorithm)
+        self.keys.append(jwk)
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def sign(private_key, algorithm: str, kid: str, user_id: int) -> bytes:
+    claims = {"user_id": user_id, "exp": int(time.time()) + 3600}
+    return jwt.encode(claims, private_key, algorithm=algorithm, headers={"kid": kid}).encode()
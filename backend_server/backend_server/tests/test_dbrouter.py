@@ -0,0 +1,144 @@
+import time
+from types import SimpleNamespace
+
+import jwt
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections, transaction
+from django.test import Client, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from backend_server import dbrouter
+from backend_server.dbrouter import ReplicaRouter, ReplicaRoutingMiddleware, Routing
+from mediafiles.models import MediaFile
+
+REPLICA = "replica1"
+
+
+def request(method: str = "GET", user_id=None):
+    user = SimpleNamespace(id=user_id, is_authenticated=True) if user_id is not None else None
+    return SimpleNamespace(method=method, user=user)
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], DATABASE_REPLICA_STICKY_SECONDS=60)
+class ReplicaRouterTests(SimpleTestCase):
+    databases = {"default"}
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        caches[dbrouter.PIN_CACHE_ALIAS].clear()
+
+    def routed(self, state: Routing):
+        token = dbrouter.current.set(state)
+        self.addCleanup(dbrouter.current.reset, token)
+        return state
+
+    def test_outside_a_request_everything_uses_the_primary(self):
+        self.assertIsNone(self.router.db_for_read(MediaFile))
+        self.assertEqual(self.router.db_for_write(MediaFile), "default")
+
+    def test_read_only_request_reads_media_tables_from_its_replica(self):
+        self.routed(Routing(request("GET", 1), REPLICA))
+        self.assertEqual(self.router.db_for_read(MediaFile), REPLICA)
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_reads_inside_a_transaction_use_the_primary(self):
+        self.routed(Routing(request("GET", 1), REPLICA))
+        with transaction.atomic():
+            self.assertIsNone(self.router.db_for_read(MediaFile))
+        self.assertEqual(self.router.db_for_read(MediaFile), REPLICA)
+
+    def test_reads_after_a_write_in_the_same_request_use_the_primary(self):
+        state = self.routed(Routing(request("GET", 1), REPLICA))
+        self.assertEqual(self.router.db_for_write(MediaFile), "default")
+        self.assertTrue(state.wrote)
+        self.assertIsNone(self.router.db_for_read(MediaFile))
+
+    def test_a_write_pins_the_owner_to_the_primary_until_the_pin_expires(self):
+        self.routed(Routing(request("POST", 1), None))
+        self.router.db_for_write(MediaFile)
+
+        self.routed(Routing(request("GET", 1), REPLICA))
+        self.assertIsNone(self.router.db_for_read(MediaFile))
+        self.routed(Routing(request("GET", 2), REPLICA))
+        self.assertEqual(self.router.db_for_read(MediaFile), REPLICA)
+
+        with self.settings(DATABASE_REPLICA_STICKY_SECONDS=1):
+            self.routed(Routing(request("POST", 3), None))
+            self.router.db_for_write(MediaFile)
+        self.routed(Routing(request("GET", 3), REPLICA))
+        self.assertIsNone(self.router.db_for_read(MediaFile))
+        time.sleep(1.1)
+        self.routed(Routing(request("GET", 3), REPLICA))
+        self.assertEqual(self.router.db_for_read(MediaFile), REPLICA)
+
+    def test_instance_reads_stay_on_the_instances_database(self):
+        self.routed(Routing(request("GET", 1), REPLICA))
+        instance = MediaFile()
+        instance._state.db = "default"
+        self.assertEqual(self.router.db_for_read(MediaFile, instance=instance), "default")
+
+    def test_migrations_skip_replicas(self):
+        self.assertTrue(self.router.allow_migrate("default", "mediafiles"))
+        self.assertFalse(self.router.allow_migrate(REPLICA, "mediafiles"))
+
+    def test_middleware_picks_a_replica_for_read_only_methods(self):
+        seen = []
+        middleware = ReplicaRoutingMiddleware(lambda r: seen.append(dbrouter.current.get().replica))
+        for method in ("GET", "HEAD", "OPTIONS", "POST", "DELETE"):
+            middleware(request(method))
+        self.assertEqual(seen, [REPLICA, REPLICA, REPLICA, None, None])
+        self.assertIsNone(dbrouter.current.get())
+
+    def test_middleware_is_unused_without_replicas(self):
+        with self.settings(DATABASE_REPLICAS=[]):
+            with self.assertRaises(MiddlewareNotUsed):
+                ReplicaRoutingMiddleware(lambda r: None)
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], DATABASE_REPLICA_STICKY_SECONDS=60, MEDIA_LIST_CACHE_TTL=0)
+class ReadYourWritesTests(TransactionTestCase):
+    """Through the middleware and views; the replica is a test mirror, so the data is the same on both."""
+
+    databases = {"default", REPLICA}
+
+    def setUp(self):
+        caches[dbrouter.PIN_CACHE_ALIAS].clear()
+        self.files = MediaFile.objects.bulk_create(
+            MediaFile(owner_id=owner, file=f"images/{owner}-{i}.jpg", file_type=MediaFile.TYPE_IMAGE,
+                      original_filename=f"{i}.jpg", content_type="image/jpeg", size=100)
+            for owner in ("1", "2")
+            for i in range(3)
+        )
+
+    def client_for(self, user_id: int) -> Client:
+        token = jwt.encode({"user_id": user_id, "exp": int(time.time()) + 60}, settings.SIMPLE_JWT_SIGNING_KEY, algorithm="HS256")
+        return Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def list_queries(self, client: Client):
+        """(queries on the primary, queries on the replica) for one list call."""
+        with CaptureQueriesContext(connections["default"]) as primary, CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = client.get("/api/media/list/")
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_listing_reads_the_replica(self):
+        primary, replica = self.list_queries(self.client_for(1))
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_owner_reads_the_primary_after_writing(self):
+        owner, other_device, someone_else = self.client_for(1), self.client_for(1), self.client_for(2)
+        response = owner.post("/api/media/delete/batch/", {"ids": [self.files[0].pk]}, content_type="application/json")
+        self.assertEqual(response.status_code, 207, response.content)
+
+        for client in (owner, other_device):
+            primary, replica = self.list_queries(client)
+            self.assertGreater(primary, 0)
+            self.assertEqual(replica, 0)
+        self.assertEqual(self.list_queries(someone_else)[0], 0)
+
+        caches[dbrouter.PIN_CACHE_ALIAS].delete(dbrouter.pin_key("1"))
+        self.assertEqual(self.list_queries(owner)[0], 0)
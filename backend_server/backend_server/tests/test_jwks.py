@@ -0,0 +1,100 @@
+from unittest import mock
+
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from django.test import SimpleTestCase
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+
+from backend_server import authentication
+from backend_server.authentication import ExternalJWTAuthentication
+from backend_server.jwks import JWKSCache
+
+from .jwks_server import StandInJWKS, sign
+
+
+class JWKSVerificationTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.ed_key = ed25519.Ed25519PrivateKey.generate()
+        cls.rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def setUp(self):
+        self.stand_in = StandInJWKS()
+        self.addCleanup(self.stand_in.close)
+        self.stand_in.publish(self.ed_key, "EdDSA", "ed-1")
+        self.stand_in.publish(self.rsa_key, "RS256", "rsa-1")
+        self.use_cache(min_refetch_interval=30)
+        authentication.token_cache.clear()
+        self.auth = ExternalJWTAuthentication()
+
+    def use_cache(self, **kwargs) -> JWKSCache:
+        cache = JWKSCache(self.stand_in.url, refresh_interval=3600, **kwargs)
+        patcher = mock.patch.object(authentication, "jwks_cache", cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return cache
+
+    def test_accepts_tokens_signed_with_published_keys(self):
+        for algorithm, key, kid in (("EdDSA", self.ed_key, "ed-1"), ("RS256", self.rsa_key, "rsa-1")):
+            with self.subTest(algorithm=algorithm):
+                user, payload = self.auth.verify(sign(key, algorithm, kid, 7))
+                self.assertEqual(user.id, 7)
+                self.assertEqual(payload["user_id"], 7)
+        self.assertEqual(self.stand_in.fetches, 1)
+
+    def test_rejects_forged_token_with_known_kid(self):
+        forged = sign(ed25519.Ed25519PrivateKey.generate(), "EdDSA", "ed-1", 7)
+        with self.assertRaisesMessage(AuthenticationFailed, "Invalid token."):
+            self.auth.verify(forged)
+
+    def test_rejects_unpublished_kid_and_refetches_once_per_interval(self):
+        token = sign(ed25519.Ed25519PrivateKey.generate(), "EdDSA", "ed-2", 7)
+        for _ in range(3):
+            with self.assertRaisesMessage(AuthenticationFailed, "Unknown token signing key."):
+                self.auth.verify(token)
+        # The first lookup fetched; the unknown kid is inside min_refetch_interval, so it didn't refetch.
+        self.assertEqual(self.stand_in.fetches, 1)
+
+    def test_rejects_algorithm_outside_allowed_list(self):
+        with self.settings(JWT_ALLOWED_ALGORITHMS=["RS256"]):
+            with self.assertRaisesMessage(AuthenticationFailed, "Invalid token."):
+                self.auth.verify(sign(self.ed_key, "EdDSA", "ed-1", 7))
+
+    def test_rotation_picks_up_a_new_kid_with_one_fetch(self):
+        self.use_cache(min_refetch_interval=0)
+        self.auth.verify(sign(self.ed_key, "EdDSA", "ed-1", 7))
+        new_key = ed25519.Ed25519PrivateKey.generate()
+        token = sign(new_key, "EdDSA", "ed-2", 8)
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.verify(token)
+        self.stand_in.publish(new_key, "EdDSA", "ed-2")
+        fetches = self.stand_in.fetches
+
+        user, _ = self.auth.verify(token)
+
+        self.assertEqual(user.id, 8)
+        self.assertEqual(self.stand_in.fetches, fetches + 1)
+
+    def test_failed_refresh_keeps_previous_keys(self):
+        cache = self.use_cache(min_refetch_interval=0)
+        self.auth.verify(sign(self.ed_key, "EdDSA", "ed-1", 7))  # first fetch and the refresh thread
+        for document in (["not", "an", "object"], "keys", {"keys": "ed-1"}):
+            with self.subTest(document=document):
+                self.stand_in.document = document
+                with self.assertLogs("backend_server.jwks", "WARNING"):
+                    self.assertFalse(cache.refresh())
+                self.assertEqual(self.auth.verify(sign(self.ed_key, "EdDSA", "ed-1", 7))[0].id, 7)
+
+    def test_malformed_key_set_is_an_authentication_failure(self):
+        self.stand_in.document = [{"kid": "ed-1"}]
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION="Bearer " + sign(self.ed_key, "EdDSA", "ed-1", 7).decode())
+        with self.assertLogs("backend_server.jwks", "WARNING"):
+            with self.assertRaisesMessage(AuthenticationFailed, "Unknown token signing key."):
+                self.auth.authenticate(request)
+
+    def test_rejected_token_is_a_401(self):
+        forged = sign(ed25519.Ed25519PrivateKey.generate(), "EdDSA", "ed-1", 7)
+        response = self.client.get("/api/media/list/", HTTP_AUTHORIZATION="Bearer " + forged.decode())
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="api"')
@@ -0,0 +1,60 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from drf_spectacular.drainage import GENERATOR_STATS
+
+from worknomads_common import schema
+
+
+class SchemaFileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "openapi-schema.json"
+        patcher = override_settings(API_SCHEMA_CACHE=True, API_SCHEMA_FILE=str(self.path))
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        schema.schema_cache.clear()
+        self.addCleanup(schema.schema_cache.clear)
+        # The generator's own warnings about the views aren't what's tested here.
+        self.enterContext(GENERATOR_STATS.silence())
+        self.document = schema.write_schema(self.path)
+
+    def fetch(self) -> dict:
+        response = self.client.get("/api/schema/", HTTP_ACCEPT="application/vnd.oai.openapi+json")
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def generations(self):
+        return mock.patch.object(schema, "generate_schema", wraps=schema.generate_schema)
+
+    def test_file_records_the_settings_digest(self):
+        self.assertEqual(json.loads(self.path.read_bytes())[schema.DIGEST_KEY], schema.settings_digest())
+
+    def test_file_built_with_the_same_settings_is_served(self):
+        with self.generations() as generate:
+            served = self.fetch()
+        generate.assert_not_called()
+        self.assertEqual(served, self.document)
+        self.assertNotIn(schema.DIGEST_KEY, served)
+
+    def test_file_built_with_other_settings_is_not_served(self):
+        variants = {"tiny": {"size": 64, "format": "WEBP"}}
+        for overrides in ({"MEDIA_IMAGE_VARIANTS": variants}, {"MEDIA_ASYNC_VIEWS": not settings.MEDIA_ASYNC_VIEWS}):
+            with self.subTest(**overrides), self.settings(**overrides), self.generations() as generate:
+                schema.schema_cache.clear()
+                with self.assertLogs("worknomads_common.schema", "INFO"):
+                    self.fetch()
+                self.fetch()
+                # Once per process, not on every request.
+                generate.assert_called_once()
+
+    def test_file_without_a_digest_is_not_served(self):
+        self.path.write_text(json.dumps(self.document))
+        with self.generations() as generate, self.assertLogs("worknomads_common.schema", "INFO"):
+            self.fetch()
+        generate.assert_called_once()
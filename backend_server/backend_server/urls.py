@@ -2,16 +2,32 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+
+# Imported here, not on the first authenticated request, so every worker's /metrics knows the token cache's series.
+from . import authentication  # noqa: F401
+from worknomads_common.metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/media/", include("mediafiles.urls")),
-    # OpenAPI schema and docs
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
-    path("api/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+    # Prometheus scrape endpoint
+    path("metrics", metrics_view, name="metrics"),
 ]
 
+if settings.API_DOCS_ENABLED:
+    from drf_spectacular.views import SpectacularSwaggerView, SpectacularRedocView
+
+    from worknomads_common.schema import CachedSchemaView
+
+    # Registers the Bearer auth extension.
+    from . import schema  # noqa: F401
+
+    # OpenAPI schema and docs
+    urlpatterns += [
+        path("api/schema/", CachedSchemaView.as_view(), name="schema"),
+        path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
+        path("api/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+    ]
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
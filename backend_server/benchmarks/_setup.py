@@ -0,0 +1,58 @@
+"""Shared bootstrapping for the benchmark scripts.
+
+Each script runs against a throwaway SQLite database and MEDIA_ROOT unless
+BENCH_DATABASE_URL points somewhere else (e.g. a local Postgres). Run them
+from `backend_server/`, e.g. `python -m benchmarks.list_pagination`.
+"""
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+
+def setup_django() -> Path:
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend_server.settings")
+    os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{(workdir / 'bench.db').as_posix()}")
+    os.environ.setdefault("DJANGO_ALLOWED_HOSTS", "*")
+
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    django.setup()
+    settings.MEDIA_ROOT = workdir / "media"
+    call_command("migrate", verbosity=0)
+    return workdir
+
+
+def bearer(user_id: str | int) -> str:
+    """Authorization header value signed the same way the auth server does it."""
+    import jwt
+    from django.conf import settings
+
+    token = jwt.encode(
+        {"user_id": user_id, "username": f"user{user_id}", "exp": int(time.time()) + 3600},
+        settings.SIMPLE_JWT_SIGNING_KEY,
+        algorithm=settings.SIMPLE_JWT_ALGORITHM,
+    )
+    return f"Bearer {token}"
+
+
+def timeit(fn: Callable[[], object], repeat: int = 20) -> List[float]:
+    """Run `fn` `repeat` times and return per-call wall times in milliseconds."""
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples: List[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"median {statistics.median(samples):7.2f} ms  p95 {p95:7.2f} ms"
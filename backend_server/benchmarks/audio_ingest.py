@@ -0,0 +1,73 @@
+"""Cost of audio metadata probing and waveform peaks versus track length.
+
+Writes 16-bit stereo WAV files of increasing length. For each, it times:
+- `probe()`, which reads headers only and should stay flat;
+- a plain full read of the file, which is the floor for anything that
+  decodes;
+- `compute_peaks()`, the numpy min/max reduction the derivative worker
+  runs.
+No Django or database needed.
+"""
+import argparse
+import os
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from mediafiles.audioinfo import probe
+from mediafiles.waveform import compute_peaks
+
+
+def write_wav(path: str, seconds: int, rate: int = 44100) -> None:
+    t = np.arange(rate, dtype=np.float32) / rate
+    second = (np.sin(2 * np.pi * 440 * t) * 12000).astype("<i2")
+    frame = np.repeat(second, 2).tobytes()  # stereo, same signal on both channels
+    with wave.open(path, "wb") as out:
+        out.setnchannels(2)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        for _ in range(seconds):
+            out.writeframes(frame)
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", default="1,5,20", help="Comma-separated track lengths.")
+    parser.add_argument("--points", type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-audio-")
+    for minutes in [int(m) for m in args.minutes.split(",") if m.strip()]:
+        path = os.path.join(workdir, f"{minutes}m.wav")
+        write_wav(path, minutes * 60)
+        size_mb = os.path.getsize(path) / 2**20
+
+        def read_all():
+            with open(path, "rb") as f:
+                while f.read(1 << 20):
+                    pass
+
+        probe_ms = best_of(lambda: probe(path))
+        read_ms = best_of(read_all)
+        peaks_ms = best_of(lambda: compute_peaks(path, path + ".dat", args.points))
+        print(
+            f"{minutes:3} min ({size_mb:6.1f} MiB): probe {probe_ms:7.3f} ms | full read {read_ms:8.1f} ms | "
+            f"peaks {peaks_ms:8.1f} ms ({os.path.getsize(path + '.dat')} B)"
+        )
+        os.remove(path)
+        os.remove(path + ".dat")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Authenticated requests per second with the verified-token cache on and off.
+
+Measures `ExternalJWTAuthentication.authenticate()` on its own and a full
+request to a trivial authenticated endpoint, cycling through `--tokens`
+distinct tokens the way a pool of active clients would.
+"""
+import argparse
+import time
+
+from ._setup import bearer, setup_django
+
+
+def rate(fn, seconds: float) -> float:
+    calls = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        fn()
+        calls += 1
+    return calls / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    setup_django()
+    from itertools import cycle
+
+    from rest_framework.permissions import IsAuthenticated
+    from rest_framework.response import Response
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.views import APIView
+
+    from backend_server.authentication import ExternalJWTAuthentication, token_cache
+
+    class Ping(APIView):
+        permission_classes = [IsAuthenticated]
+
+        def get(self, request):
+            return Response({"id": request.user.id})
+
+    factory = APIRequestFactory()
+    requests = [factory.get("/ping/", HTTP_AUTHORIZATION=bearer(i)) for i in range(1, args.tokens + 1)]
+    auth = ExternalJWTAuthentication()
+    view = Ping.as_view()
+
+    for label, size in (("cache off", 0), ("cache on", 10000)):
+        token_cache.max_size = size
+        token_cache.clear()
+        reqs = cycle(requests)
+        auth_rate = rate(lambda: auth.authenticate(next(reqs)), args.seconds)
+        reqs = cycle(requests)
+        view_rate = rate(lambda: view(next(reqs)), args.seconds)
+        print(f"{label:9}: authenticate() {auth_rate:10.0f}/s | full request {view_rate:8.0f}/s | {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Per-file vs batch endpoints for syncing and cleaning up many small images.
+
+Uploads `--files` distinct small images one request at a time, then the
+same number in a single `upload/image/batch/` request. It then deletes
+them one `delete/<id>/` at a time versus one `delete/batch/` call. The
+timings are wall time for the whole set, in-process through the Django
+test client, so they include auth and the DB work but not the network.
+Over a real network, the per-request round trips add to the per-file
+numbers.
+"""
+import argparse
+import os
+import time
+
+from ._setup import bearer, setup_django
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--size", type=int, default=64 * 1024, help="Bytes per image.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import Client
+    from mediafiles.models import MediaFile
+
+    client = Client()
+    auth = bearer("42")
+
+    def images():
+        return [SimpleUploadedFile(f"img{i}.png", os.urandom(args.size), "image/png") for i in range(args.files)]
+
+    def timed(label: str, fn) -> None:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        print(f"{label:28} {elapsed * 1000:8.1f} ms total  {elapsed * 1000 / args.files:6.2f} ms/file")
+
+    def upload_each():
+        for upload in images():
+            assert client.post("/api/media/upload/image/", {"file": upload}, HTTP_AUTHORIZATION=auth).status_code == 201
+
+    def upload_batch():
+        resp = client.post("/api/media/upload/image/batch/", {"files": images()}, HTTP_AUTHORIZATION=auth)
+        assert all(r["status"] == 201 for r in resp.json()["results"]), resp.content
+
+    def delete_each():
+        for pk in MediaFile.objects.values_list("id", flat=True):
+            assert client.delete(f"/api/media/delete/{pk}/", HTTP_AUTHORIZATION=auth).status_code == 204
+
+    def delete_batch():
+        ids = list(MediaFile.objects.values_list("id", flat=True))
+        resp = client.post("/api/media/delete/batch/", {"ids": ids}, content_type="application/json", HTTP_AUTHORIZATION=auth)
+        assert all(r["status"] == 204 for r in resp.json()["results"]), resp.content
+
+    timed(f"upload x{args.files} (one each)", upload_each)
+    timed("delete (one each)", delete_each)
+    timed(f"upload x{args.files} (batch)", upload_batch)
+    timed("delete (batch)", delete_batch)
+
+
+if __name__ == "__main__":
+    main()
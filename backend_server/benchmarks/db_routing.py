@@ -0,0 +1,113 @@
+"""Read-replica routing, against SQLite files standing in for a primary and its replica.
+
+"Replication" is a backup of the primary file onto the replica file, run
+only when the script says so. In between, the replica lags, as a real one
+would. With the list cache off (MEDIA_LIST_CACHE_TTL=0) this reports:
+- where the queries of `--requests` list calls by `--owners` owners go,
+  with no replica configured and with one;
+- what each reader sees straight after owner 1 uploads: the same client,
+  owner 1 on another device, and another owner, then owner 1 again once
+  the sticky window has passed, before and after the replica catches up;
+- list latency with and without the router, which is its whole overhead.
+
+Pooling needs PostgreSQL (BENCH_DATABASE_URL plus DATABASE_POOL=true) and
+isn't exercised here. The routing rules themselves are asserted in
+backend_server/tests/test_dbrouter.py (`python manage.py test`).
+
+    python -m benchmarks.db_routing --requests 500
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from ._setup import bearer, setup_django, summarize, timeit
+
+STICKY_SECONDS = 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200, help="Files per owner.")
+    parser.add_argument("--owners", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    replica_path = Path(tempfile.mkdtemp(prefix="bench-replica-")) / "replica.db"
+    os.environ["DATABASE_REPLICA_URLS"] = f"sqlite:///{replica_path.as_posix()}"
+    os.environ["DATABASE_REPLICA_STICKY_SECONDS"] = str(STICKY_SECONDS)
+    os.environ["MEDIA_LIST_CACHE_TTL"] = "0"
+    workdir = setup_django()
+    from django.conf import settings
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.db import connections
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    from mediafiles.models import MediaFile
+
+    MediaFile.objects.bulk_create(
+        (
+            MediaFile(owner_id=str(owner), file=f"images/bench/{owner}-{i}.jpg", file_type="image",
+                      original_filename=f"{i}.jpg", content_type="image/jpeg", size=1024 + i)
+            for owner in range(1, args.owners + 1)
+            for i in range(args.rows)
+        ),
+        batch_size=5000,
+    )
+
+    def replicate() -> None:
+        connections["replica1"].close()
+        source = sqlite3.connect(workdir / "bench.db")
+        target = sqlite3.connect(replica_path)
+        source.backup(target)
+        source.close()
+        target.close()
+
+    replicate()
+
+    def list_ids(client: Client, owner: int) -> set:
+        response = client.get("/api/media/list/", {"page_size": 10}, HTTP_AUTHORIZATION=bearer(owner))
+        assert response.status_code == 200, response.content
+        return {row["id"] for row in response.json()["results"]}
+
+    def count_queries(label: str, client: Client) -> None:
+        with CaptureQueriesContext(connections["default"]) as primary, CaptureQueriesContext(connections["replica1"]) as replica:
+            for n in range(args.requests):
+                list_ids(client, n % args.owners + 1)
+        print(f"{label:20} {args.requests} list calls: {len(primary):5} queries on the primary, {len(replica):5} on the replica")
+
+    # Each Client loads the middleware afresh, so this one never sees the replica.
+    replicas = settings.DATABASE_REPLICAS
+    settings.DATABASE_REPLICAS = []
+    plain = Client()
+    count_queries("no replica", plain)
+    settings.DATABASE_REPLICAS = replicas
+    routed = Client()
+    count_queries("one replica", routed)
+
+    upload = SimpleUploadedFile("new.png", os.urandom(1024), "image/png")
+    response = routed.post("/api/media/upload/image/", {"file": upload}, HTTP_AUTHORIZATION=bearer(1))
+    assert response.status_code == 201, response.content
+    new_id = response.json()["id"]
+
+    def sees(label: str, client: Client, owner: int) -> None:
+        print(f"  {label:44} {'sees it' if new_id in list_ids(client, owner) else 'does not see it yet'}")
+
+    print("owner 1 uploads a file, the replica hasn't caught up:")
+    sees("owner 1, same client", routed, 1)
+    sees("owner 1, another device", Client(), 1)
+    time.sleep(STICKY_SECONDS + 0.1)
+    sees(f"owner 1, after the {STICKY_SECONDS}s sticky window", routed, 1)
+    replicate()
+    sees("owner 1, once the replica has caught up", routed, 1)
+
+    print("list latency:")
+    print(f"  {'no replica':18} {summarize(timeit(lambda: list_ids(plain, 2), 100))}")
+    print(f"  {'routed':18} {summarize(timeit(lambda: list_ids(routed, 2), 100))}")
+
+
+if __name__ == "__main__":
+    main()
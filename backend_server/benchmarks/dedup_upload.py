@@ -0,0 +1,55 @@
+"""Upload throughput and disk usage on a heavily duplicated corpus.
+
+Uploads `--files` images drawn from only `--unique` distinct payloads, as one
+owner re-sending the same avatars would, and reports uploads/s plus the
+logical bytes accepted versus the bytes actually kept under MEDIA_ROOT.
+"""
+import argparse
+import os
+import random
+import time
+
+from ._setup import bearer, setup_django
+
+
+def disk_usage(root) -> int:
+    total = 0
+    for dirpath, _dirs, files in os.walk(root):
+        total += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--unique", type=int, default=25)
+    parser.add_argument("--size-kb", type=int, default=256)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import Client
+    from mediafiles.models import MediaBlob, MediaFile
+
+    rng = random.Random(1)
+    payloads = [rng.randbytes(args.size_kb * 1024) for _ in range(args.unique)]
+    client = Client()
+    auth = bearer("42")
+
+    start = time.perf_counter()
+    for i in range(args.files):
+        upload = SimpleUploadedFile(f"avatar{i % 7}.jpg", rng.choice(payloads), "image/jpeg")
+        resp = client.post("/api/media/upload/image/", {"file": upload}, HTTP_AUTHORIZATION=auth)
+        assert resp.status_code == 201, resp.content
+    elapsed = time.perf_counter() - start
+
+    logical = args.files * args.size_kb * 1024
+    stored = disk_usage(settings.MEDIA_ROOT)
+    print(f"uploads: {args.files} ({args.unique} unique) in {elapsed:.2f}s -> {args.files / elapsed:.1f} uploads/s")
+    print(f"rows: {MediaFile.objects.count()} files, {MediaBlob.objects.count()} blobs")
+    print(f"logical bytes: {logical / 2**20:.1f} MiB, on disk: {stored / 2**20:.1f} MiB ({logical / max(stored, 1):.1f}x saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Delete latency on slow storage, garbage-collection throughput, and reconcile memory.
+
+Uploads `--files` distinct images, then makes every storage delete sleep
+`--delay-ms` to stand in for a slow or remote store. It reports:
+- DELETE request latency, which no longer waits on storage;
+- how fast `collect_garbage` drains the tombstones, one per transaction
+  versus in batches of `--batch`;
+- the peak Python memory of `reconcile_storage` over `--orphans`
+  unreferenced files. Both sides are streamed, so this is bounded by the
+  largest single directory and the lookup chunk, not by the totals.
+
+    python -m benchmarks.deferred_deletes --files 300 --delay-ms 20
+"""
+import argparse
+import io
+import os
+import time
+import tracemalloc
+
+from ._setup import bearer, setup_django, summarize
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--delay-ms", type=float, default=20.0, help="Added to every storage delete.")
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--orphans", type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.files.storage import FileSystemStorage
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.core.management import call_command
+    from django.test import Client
+    from mediafiles.models import MediaFile, StorageTombstone
+
+    client = Client()
+    auth = bearer("42")
+
+    def upload_all() -> None:
+        for start in range(0, args.files, settings.MEDIA_BATCH_MAX_FILES):
+            count = min(settings.MEDIA_BATCH_MAX_FILES, args.files - start)
+            files = [SimpleUploadedFile(f"img{i}.png", os.urandom(4096), "image/png") for i in range(count)]
+            resp = client.post("/api/media/upload/image/batch/", {"files": files}, HTTP_AUTHORIZATION=auth)
+            assert resp.status_code == 207, resp.content
+
+    real_delete = FileSystemStorage.delete
+
+    def slow_delete(self, name):
+        time.sleep(args.delay_ms / 1000)
+        return real_delete(self, name)
+
+    FileSystemStorage.delete = slow_delete
+
+    for label, batch in (("one per transaction", 1), (f"batches of {args.batch}", args.batch)):
+        upload_all()
+        samples = []
+        for pk in list(MediaFile.objects.values_list("id", flat=True)):
+            start = time.perf_counter()
+            assert client.delete(f"/api/media/delete/{pk}/", HTTP_AUTHORIZATION=auth).status_code == 204
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"DELETE with {args.delay_ms:.0f} ms storage: {summarize(samples)}")
+        start = time.perf_counter()
+        call_command("collect_garbage", "--once", "--batch", str(batch), stdout=io.StringIO())
+        elapsed = time.perf_counter() - start
+        assert not StorageTombstone.objects.exists()
+        print(f"collect_garbage, {label:20}: {args.files / elapsed:8.1f} files/s")
+
+    FileSystemStorage.delete = real_delete
+    orphan_dir = settings.MEDIA_ROOT / "images" / "2020" / "01" / "01"
+    orphan_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(args.orphans):
+        (orphan_dir / f"orphan{i}.png").write_bytes(b"x")
+    tracemalloc.start()
+    start = time.perf_counter()
+    out = io.StringIO()
+    call_command("reconcile_storage", "--min-age-hours", "0", stdout=out)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"reconcile_storage: {out.getvalue().splitlines()[-1]} in {elapsed:.2f}s, peak {peak / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Image upload latency with variant generation queued, and worker render throughput.
+
+Uploads `--images` distinct photos (camera-sized JPEGs). The upload only
+enqueues a DerivativeJob, so its latency shouldn't depend on how many
+variants are configured. The script then drains the queue with
+`process_derivatives --once` at each `--workers` count and reports
+images/s.
+"""
+import argparse
+import io
+import random
+import time
+
+from ._setup import bearer, setup_django, summarize
+
+
+def photo(rng: random.Random, width: int, height: int) -> bytes:
+    from PIL import Image
+
+    # Noise on a gradient compresses roughly like a real photo; a flat colour would be unrealistically cheap.
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.frombytes("RGB", (width // 8, height // 8), rng.randbytes(width // 8 * height // 8 * 3)).resize((width, height))
+    out = io.BytesIO()
+    Image.blend(image, noise, 0.3).save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated process counts to compare.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.core.management import call_command
+    from django.test import Client
+    from mediafiles.models import DerivativeJob, ImageVariant
+
+    rng = random.Random(1)
+    photos = [photo(rng, args.width, args.height) for _ in range(args.images)]
+    client = Client()
+    auth = bearer("42")
+
+    samples = []
+    for i, data in enumerate(photos):
+        upload = SimpleUploadedFile(f"photo{i}.jpg", data, "image/jpeg")
+        start = time.perf_counter()
+        resp = client.post("/api/media/upload/image/", {"file": upload}, HTTP_AUTHORIZATION=auth)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 201, resp.content
+    print(f"upload ({len(data) // 1024} KiB JPEG, variants queued): {summarize(samples)}")
+
+    for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+        ImageVariant.objects.all().delete()
+        DerivativeJob.objects.update(status=DerivativeJob.STATUS_PENDING, attempts=0)
+        start = time.perf_counter()
+        call_command("process_derivatives", "--once", "--workers", str(workers), stdout=io.StringIO())
+        elapsed = time.perf_counter() - start
+        done = DerivativeJob.objects.filter(status=DerivativeJob.STATUS_DONE).count()
+        print(f"render with {workers} process(es): {done} images in {elapsed:.2f}s -> {done / elapsed:.1f} images/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Proxied upload vs presigned direct upload, against a local S3 stand-in.
+
+Starts moto's S3 server (from requirements-dev.txt) and points the
+backend at it with MEDIA_STORAGE_BACKEND=s3. Each file is uploaded two
+ways and the script reports time per upload plus the bytes the app
+process had to carry:
+- proxied: multipart POST to `/api/media/upload/audio/`. The app receives
+  the body, then sends it on to the store.
+- direct: POST `/api/media/direct-uploads/`, PUT the bytes straight to the
+  presigned URL, then POST `complete/`.
+moto doesn't keep SHA-256 checksums, so `complete` reads the object back
+once to hash it. Against a store that does (AWS S3, recent MinIO), the app
+carries none of the bytes.
+
+    python -m benchmarks.direct_upload --size-mb 32 --files 5
+"""
+import argparse
+import hashlib
+import http.client
+import os
+import time
+from urllib.parse import urlsplit
+
+from ._setup import bearer, setup_django
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--files", type=int, default=5)
+    parser.add_argument("--port", type=int, default=18105)
+    args = parser.parse_args()
+
+    from mediafiles.tests.s3_server import StandInS3
+
+    stand_in = StandInS3(args.port)
+    os.environ.update(stand_in.settings("bench-media"), MEDIA_MAX_AUDIO_MB=str(args.size_mb + 1))
+    try:
+        run(args)
+    finally:
+        stand_in.stop()
+
+
+def run(args) -> None:
+    setup_django()
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import Client
+    from mediafiles import objectstore
+
+    objectstore.ensure_bucket()
+    carried = count_s3_traffic()
+    client = Client()
+    auth = bearer("42")
+    size = args.size_mb * 2**20
+
+    proxied, direct = [], []
+    proxied_bytes = direct_bytes = 0
+    for _ in range(args.files):
+        body = os.urandom(size)
+
+        carried[0] = 0
+        start = time.perf_counter()
+        upload = SimpleUploadedFile("track.wav", body, "audio/wav")
+        resp = client.post("/api/media/upload/audio/", {"file": upload}, HTTP_AUTHORIZATION=auth)
+        assert resp.status_code == 201, resp.content
+        proxied.append(time.perf_counter() - start)
+        # The request body in, plus what went on to the store.
+        proxied_bytes += size + carried[0]
+
+        body = os.urandom(size)
+        carried[0] = 0
+        start = time.perf_counter()
+        resp = client.post(
+            "/api/media/direct-uploads/",
+            {"filename": "track.wav", "content_type": "audio/wav", "size": size, "sha256": hashlib.sha256(body).hexdigest()},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=auth,
+        )
+        assert resp.status_code == 201, resp.content
+        ticket = resp.json()
+        put(ticket["url"], ticket["headers"], body)
+        resp = client.post(f"/api/media/direct-uploads/{ticket['id']}/complete/", HTTP_AUTHORIZATION=auth)
+        assert resp.status_code == 201, resp.content
+        direct.append(time.perf_counter() - start)
+        direct_bytes += carried[0]
+
+    mib = args.files * size / 2**20
+    for label, times, through_app in (("proxied", proxied, proxied_bytes), ("direct", direct, direct_bytes)):
+        print(
+            f"{label:8} {args.files} x {args.size_mb} MiB: {sum(times) / len(times) * 1000:8.1f} ms/upload  "
+            f"{mib / sum(times):7.1f} MiB/s  through the app: {through_app / 2**20:8.1f} MiB"
+        )
+
+
+def put(url: str, headers: dict, body: bytes) -> None:
+    # The client's own PUT; it doesn't touch the app process.
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=120)
+    conn.request("PUT", f"{parts.path}?{parts.query}", body=body, headers={**headers, "Content-Length": str(len(body))})
+    resp = conn.getresponse()
+    payload = resp.read()
+    assert resp.status == 200, payload
+
+
+def count_s3_traffic() -> list:
+    """Count body bytes the backend's S3 client sends or receives; returns a one-item list to reset/read."""
+    from mediafiles import objectstore
+
+    carried = [0]
+
+    def sent(request, **kwargs):
+        carried[0] += int(request.headers.get("Content-Length") or 0)
+
+    def received(parsed, **kwargs):
+        carried[0] += parsed.get("ContentLength", 0)
+
+    from django.core.files.storage import default_storage
+
+    for events in (objectstore.client().meta.events, default_storage.connection.meta.client.meta.events):
+        events.register("before-send.s3", sent)
+        events.register("after-call.s3.GetObject", received)
+    return carried
+
+
+if __name__ == "__main__":
+    main()
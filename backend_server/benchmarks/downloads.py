@@ -0,0 +1,147 @@
+"""Download throughput and server memory per concurrent download, WSGI vs ASGI.
+
+Starts the backend under gunicorn once per mode and uploads one large
+audio file. It then runs `--clients` concurrent downloads of that file
+through `/api/media/download/<id>/`, a few times over, and reports:
+- aggregate MB/s;
+- the peak RSS of the gunicorn process tree over its idle baseline,
+  per download in flight.
+Under WSGI the body goes out through `sendfile()`, so it never passes
+through Python. Under ASGI it streams in fixed-size blocks. Either way
+the RSS per download should be a few blocks, not the file size.
+`--ranged` requests the second half of the file instead, which exercises
+the 206 path.
+
+    python -m benchmarks.downloads --size-mb 64 --clients 16
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from .slow_clients import BOUNDARY, serve, stop, token, wait_for_port
+
+
+def tree_rss(pid: int) -> int:
+    """Resident bytes of `pid` and its descendants (Linux /proc)."""
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pending.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            continue
+    return total
+
+
+def upload(port: int, size: int) -> int:
+    body = (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="big.wav"\r\n'
+        "Content-Type: audio/wav\r\n\r\n"
+    ).encode() + os.urandom(size) + f"\r\n--{BOUNDARY}--\r\n".encode()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    conn.request(
+        "POST",
+        "/api/media/upload/audio/",
+        body=body,
+        headers={"Authorization": f"Bearer {token(1)}", "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+    )
+    resp = conn.getresponse()
+    payload = resp.read()
+    assert resp.status == 201, payload
+    return json.loads(payload)["id"]
+
+
+async def download(port: int, pk: int, byte_range: str) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        (
+            f"GET /api/media/download/{pk}/ HTTP/1.1\r\n"
+            f"Host: 127.0.0.1:{port}\r\n"
+            f"Authorization: Bearer {token(1)}\r\n"
+            + (f"Range: {byte_range}\r\n" if byte_range else "")
+            + "Connection: close\r\n\r\n"
+        ).encode()
+    )
+    await writer.drain()
+    received = 0
+    while chunk := await reader.read(256 * 1024):
+        received += len(chunk)
+    writer.close()
+    return received
+
+
+def measure(port: int, pid: int, pk: int, args) -> dict:
+    byte_range = f"bytes={args.size_mb * 2**20 // 2}-" if args.ranged else ""
+    baseline = tree_rss(pid)
+    peak = [baseline]
+    stop_sampling = threading.Event()
+
+    def sample() -> None:
+        while not stop_sampling.is_set():
+            peak[0] = max(peak[0], tree_rss(pid))
+            time.sleep(0.02)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+
+    async def run() -> int:
+        total = 0
+        for _ in range(args.rounds):
+            received = await asyncio.gather(*(download(port, pk, byte_range) for _ in range(args.clients)))
+            total += sum(received)
+        return total
+
+    start = time.perf_counter()
+    received = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    stop_sampling.set()
+    sampler.join()
+    return {
+        "mbps": received / 2**20 / elapsed,
+        "rss_per_download": (peak[0] - baseline) / args.clients,
+        "baseline": baseline,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="wsgi,asgi")
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent downloads.")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--ranged", action="store_true", help="Request the second half of the file (206).")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--port", type=int, default=18103)
+    args = parser.parse_args()
+    args.seconds = 60.0  # gunicorn worker timeout is derived from it
+
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        workdir = Path(tempfile.mkdtemp(prefix=f"bench-dl-{mode}-"))
+        os.environ["MEDIA_MAX_AUDIO_MB"] = str(args.size_mb + 1)
+        proc = serve(mode, args.port, workdir, args)
+        try:
+            wait_for_port(args.port)
+            pk = upload(args.port, args.size_mb * 2**20)
+            r = measure(args.port, proc.pid, pk, args)
+        finally:
+            stop(proc)
+        print(
+            f"{mode:5} {args.clients} x {args.size_mb} MiB{' (ranged)' if args.ranged else ''}: "
+            f"{r['mbps']:8.1f} MiB/s  peak RSS +{r['rss_per_download'] / 2**10:8.0f} KiB per download "
+            f"(idle {r['baseline'] / 2**20:.0f} MiB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
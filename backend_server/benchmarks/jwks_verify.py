@@ -0,0 +1,76 @@
+"""Token verification against a local stand-in JWKS server.
+
+Starts an in-process HTTP server that publishes EdDSA and RS256 public keys
+the way the auth server's `/.well-known/jwks.json` does. It then measures
+`ExternalJWTAuthentication.verify()` throughput per algorithm (the token
+cache is bypassed) and walks through a key rotation: a token signed with a
+key published after start-up is accepted after exactly one extra JWKS
+fetch. The same checks, asserted, are in backend_server/tests/test_jwks.py
+(`python manage.py test`).
+"""
+import argparse
+import os
+import time
+
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+from backend_server.tests.jwks_server import StandInJWKS, sign
+
+
+def rate(fn, seconds: float) -> float:
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn()
+        calls += 1
+    return calls / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    stand_in = StandInJWKS()
+    ed_key = ed25519.Ed25519PrivateKey.generate()
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    stand_in.publish(ed_key, "EdDSA", "ed-1")
+    stand_in.publish(rsa_key, "RS256", "rsa-1")
+    os.environ["JWT_JWKS_URL"] = stand_in.url
+
+    from ._setup import setup_django
+
+    setup_django()
+    from rest_framework.exceptions import AuthenticationFailed
+
+    from backend_server.authentication import ExternalJWTAuthentication, jwks_cache
+
+    auth = ExternalJWTAuthentication()
+    for algorithm, key, kid in (("EdDSA", ed_key, "ed-1"), ("RS256", rsa_key, "rsa-1")):
+        token = sign(key, algorithm, kid, 1)
+        print(f"{algorithm:6} verify(): {rate(lambda: auth.verify(token), args.seconds):9.0f}/s")
+    print(f"JWKS fetches so far: {stand_in.fetches}")
+
+    # Rotation: the auth server starts signing with a key we haven't seen yet.
+    new_key = ed25519.Ed25519PrivateKey.generate()
+    token = sign(new_key, "EdDSA", "ed-2", 1)
+    jwks_cache._fetched_at -= jwks_cache.min_refetch_interval  # pretend the rate limit window has passed
+    try:
+        auth.verify(token)
+        raise SystemExit("token with unpublished kid accepted")
+    except AuthenticationFailed as exc:
+        print(f"before publishing ed-2: rejected ({exc.detail}); fetches: {stand_in.fetches}")
+    stand_in.publish(new_key, "EdDSA", "ed-2")
+    jwks_cache._fetched_at -= jwks_cache.min_refetch_interval
+    user, _ = auth.verify(token)
+    print(f"after publishing ed-2: accepted user {user.id}; fetches: {stand_in.fetches}")
+
+    forged = sign(ed25519.Ed25519PrivateKey.generate(), "EdDSA", "ed-2", 1)
+    try:
+        auth.verify(forged)
+        raise SystemExit("forged token accepted")
+    except AuthenticationFailed as exc:
+        print(f"forged token with a known kid: rejected ({exc.detail})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Cost of a repeat GET /api/media/list/ with the per-owner list cache.
+
+Fills one owner's library with `--rows` files, then times the first page
+four ways and counts the SQL queries of each:
+- uncached (MEDIA_LIST_CACHE_TTL=0);
+- a cache hit;
+- a revalidation with `If-None-Match`, which gets a 304 and no body;
+- the first request after an upload, which has to rebuild the page because
+  the upload bumped the owner's generation.
+
+    python -m benchmarks.list_cache --rows 10000
+"""
+import argparse
+import os
+
+from ._setup import bearer, setup_django, summarize, timeit
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from mediafiles import listcache
+    from mediafiles.models import MediaFile
+
+    owner = "42"
+    auth = bearer(owner)
+    client = Client()
+    MediaFile.objects.bulk_create(
+        (
+            MediaFile(owner_id=owner, file=f"images/bench/{i}.jpg", file_type="image", original_filename=f"{i}.jpg",
+                      content_type="image/jpeg", size=1024 + i)
+            for i in range(args.rows)
+        ),
+        batch_size=5000,
+    )
+    listcache.bump_now(owner)
+    query = {"page_size": args.page_size}
+
+    def get(**headers):
+        return client.get("/api/media/list/", query, HTTP_AUTHORIZATION=auth, **headers)
+
+    def queries(fn) -> int:
+        with CaptureQueriesContext(connection) as ctx:
+            fn()
+        return len(ctx.captured_queries)
+
+    def report(label: str, fn) -> None:
+        count = queries(fn)
+        print(f"{label:26} {summarize(timeit(fn, args.repeat))}  {count} queries")
+
+    ttl = settings.MEDIA_LIST_CACHE_TTL
+    settings.MEDIA_LIST_CACHE_TTL = 0
+    report("uncached", get)
+    settings.MEDIA_LIST_CACHE_TTL = ttl
+
+    etag = get()["ETag"]
+    assert get(HTTP_IF_NONE_MATCH=etag).status_code == 304
+    report("cache hit", get)
+    report("If-None-Match -> 304", lambda: get(HTTP_IF_NONE_MATCH=etag))
+
+    def upload_then_list():
+        upload = SimpleUploadedFile("new.png", os.urandom(1024), "image/png")
+        assert client.post("/api/media/upload/image/", {"file": upload}, HTTP_AUTHORIZATION=auth).status_code == 201
+        assert get(HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    upload_then_list()
+    print("after an upload: the old ETag gets a 200 with the new page (invalidation is one cache incr)")
+
+
+if __name__ == "__main__":
+    main()
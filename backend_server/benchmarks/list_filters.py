@@ -0,0 +1,149 @@
+"""Filtered listings and admin search on a large media table.
+
+Seeds `--rows` files (10M for the full-size run) over `--owners` owners,
+with one owner holding `--owner-share` of them. Filenames are
+`<word>_<n>.<ext>` and types, sizes and dates are spread realistically.
+Then it reports:
+- `GET /api/media/list/` for that owner with each filter, with the
+  migration 0011 indexes;
+- the admin changelist (search by owner id, filename search, no filter),
+  configured as before (icontains on both columns, `-created_at` order,
+  full COUNT(*)s) and as now (filters.admin_search, `-id` order,
+  EstimatedCountPaginator);
+- the list API again with the 0011 indexes dropped.
+
+    python -m benchmarks.list_filters --rows 10000000
+
+Seeding goes through executemany in 10k-row batches. Expect a few
+minutes per million rows on SQLite; point BENCH_DATABASE_URL at Postgres
+to see the trigram index and the estimated counts at work.
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from ._setup import bearer, setup_django, summarize, timeit
+
+WORDS = [
+    "sunset", "beach", "invoice", "meeting", "podcast", "interview", "family", "holiday", "receipt", "scan",
+    "portrait", "concert", "lecture", "draft", "screenshot", "wedding", "garden", "studio", "voice", "demo",
+]
+# (file_type, content_type, extension, weight)
+TYPES = [
+    ("image", "image/jpeg", "jpg", 50), ("image", "image/png", "png", 25), ("image", "image/webp", "webp", 8),
+    ("image", "image/gif", "gif", 2), ("audio", "audio/mpeg", "mp3", 10), ("audio", "audio/wav", "wav", 3),
+    ("audio", "audio/flac", "flac", 2),
+]
+OWNER = "42"
+
+
+def seed(rows: int, owners: int, owner_share: float) -> None:
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from mediafiles.models import MediaFile
+
+    rng = random.Random(7)
+    weights = [t[3] for t in TYPES]
+    table = MediaFile._meta.db_table
+    sql = (
+        f"INSERT INTO {table} (owner_id, file, file_type, original_filename, content_type, size, sha256, created_at) "
+        "VALUES (%s, %s, %s, %s, %s, %s, '', %s)"
+    )
+    start = timezone.now() - timedelta(days=730)
+    step = timedelta(days=730) / rows
+    batch = []
+    began = time.perf_counter()
+    for i in range(rows):
+        owner = OWNER if rng.random() < owner_share else str(rng.randrange(1000, 1000 + owners))
+        file_type, content_type, ext, _ = rng.choices(TYPES, weights)[0]
+        name = f"{rng.choice(WORDS)}_{rng.randrange(100000)}.{ext}"
+        size = int(rng.lognormvariate(13, 1.5)) + 1
+        created_at = connection.ops.adapt_datetimefield_value(start + step * i)
+        batch.append((owner, f"{file_type}/seed/{i}.{ext}", file_type, name, content_type, size, created_at))
+        if len(batch) == 10000 or i == rows - 1:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+            batch = []
+            if (i + 1) % 1_000_000 == 0:
+                print(f"  seeded {i + 1} rows ({time.perf_counter() - began:.0f}s)")
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    print(f"seeded {rows} rows in {time.perf_counter() - began:.0f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--owners", type=int, default=10000)
+    parser.add_argument("--owner-share", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib import admin
+    from django.contrib.auth import get_user_model
+    from django.core.paginator import Paginator
+    from django.db import connection
+    from django.test import Client
+    from django.utils import timezone
+
+    from mediafiles.admin import MediaFileAdmin
+
+    settings.MEDIA_LIST_CACHE_TTL = 0
+    seed(args.rows, args.owners, args.owner_share)
+
+    client = Client()
+    auth = bearer(OWNER)
+    # One day in the middle of the seeded range.
+    mid = timezone.now() - timedelta(days=365)
+    cases = {
+        "no filter": {},
+        "file_type=audio": {"file_type": "audio"},
+        "content_type=image/gif": {"content_type": "image/gif"},
+        "created in one day": {"created_after": (mid - timedelta(days=1)).isoformat(), "created_before": mid.isoformat()},
+        "size 5-6 MB": {"min_size": 5_000_000, "max_size": 6_000_000},
+        "filename=sunset_12": {"filename": "sunset_12"},
+        "search=set_12": {"search": "set_12"},
+    }
+
+    def run_api(label: str) -> None:
+        print(f"GET /api/media/list/ for an owner with ~{int(args.rows * args.owner_share)} files, {label}:")
+        for name, params in cases.items():
+            samples = timeit(lambda: client.get("/api/media/list/", params, HTTP_AUTHORIZATION=auth), args.repeat)
+            count = len(client.get("/api/media/list/", params, HTTP_AUTHORIZATION=auth).json()["results"])
+            print(f"  {name:24} {count:3} rows  {summarize(samples)}")
+
+    run_api("with the filter indexes")
+
+    get_user_model().objects.create_superuser("bench-admin", "admin@example.com", "bench-admin-pass")
+    client.login(username="bench-admin", password="bench-admin-pass")
+    searches = {"no filter": {}, f"owner id {OWNER}": {"q": OWNER}, "filename sunset_12": {"q": "sunset_12"}}
+    new = {name: getattr(MediaFileAdmin, name) for name in ("ordering", "paginator", "show_full_result_count", "get_search_results")}
+    old = {
+        "ordering": ("-created_at",),
+        "paginator": Paginator,
+        "show_full_result_count": True,
+        "get_search_results": admin.ModelAdmin.get_search_results,
+    }
+    repeat = max(args.repeat // 3, 2)
+    for label, config in (("before (icontains, COUNT(*))", old), ("now", new)):
+        for name, value in config.items():
+            setattr(MediaFileAdmin, name, value)
+        print(f"admin changelist, {label}:")
+        for name, params in searches.items():
+            samples = timeit(lambda: client.get("/admin/mediafiles/mediafile/", params), repeat)
+            assert client.get("/admin/mediafiles/mediafile/", params).status_code == 200
+            print(f"  {name:24} {summarize(samples)}")
+
+    with connection.cursor() as cursor:
+        for index in ("media_owner_type_created_idx", "media_owner_ctype_created_idx", "media_owner_filename_prefix_idx", "media_filename_trgm_idx"):
+            cursor.execute(f"DROP INDEX IF EXISTS {index}")
+        cursor.execute("ANALYZE")
+    run_api("without them")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Per-request cost of MetricsMiddleware and the cost of a /metrics scrape.
+
+Times `--requests` authenticated GETs of `/api/media/usage/` (auth, one
+query, JSON rendering) with the middleware off, on, and on with the
+Server-Timing header, and prints the difference per request. The JWT
+cache is on, as in production, so the request itself is cheap and the
+overhead stands out as much as it can. Then renders /metrics after
+traffic on `--routes` distinct routes.
+
+    python -m benchmarks.metrics_overhead --requests 3000
+"""
+import argparse
+import statistics
+import time
+
+from ._setup import bearer, setup_django
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--routes", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import Client
+
+    from worknomads_common import metrics
+
+    auth = bearer("42")
+    modes = {"off": (False, False), "on": (True, False), "on + Server-Timing": (True, True)}
+    clients = {}
+    for label, (enabled, timing) in modes.items():
+        # The middleware chain is built on a client's first request, so each client keeps its mode.
+        settings.METRICS_ENABLED = enabled
+        clients[label] = Client()
+        assert clients[label].get("/api/media/usage/", HTTP_AUTHORIZATION=auth).status_code == 200
+
+    # One request per mode in turn, so drift (GC, CPU frequency) hits every mode alike.
+    samples = {label: [] for label in modes}
+    for _ in range(args.requests):
+        for label, (enabled, timing) in modes.items():
+            settings.METRICS_SERVER_TIMING = timing
+            start = time.perf_counter()
+            resp = clients[label].get("/api/media/usage/", HTTP_AUTHORIZATION=auth)
+            samples[label].append((time.perf_counter() - start) * 1e6)
+            assert ("Server-Timing" in resp) == timing, resp.headers
+
+    base = statistics.median(samples["off"])
+    for label, values in samples.items():
+        median = statistics.median(values)
+        print(f"{label:20} median {median:8.1f} us/request  overhead {median - base:+7.1f} us ({(median - base) / base:+6.1%})")
+    print(f"Server-Timing: {resp['Server-Timing']}")
+
+    stats = metrics.RequestStats()
+    stats.queries = 3
+    stats.phases = {"auth": 0.0004, "db": 0.002, "render": 0.0003}
+    calls = 100_000
+    start = time.perf_counter()
+    for i in range(calls):
+        metrics.registry.started()
+        metrics.registry.finished("GET", "api/media/list/", 200, 0.012, stats, 0)
+    print(f"registry.started() + finished(): {(time.perf_counter() - start) / calls * 1e6:.2f} us/request")
+
+    for i in range(args.routes):
+        for status in (200, 404):
+            metrics.registry.started()
+            metrics.registry.finished("POST", f"api/bench/{i}/", status, 0.02, stats, 2**20)
+    series = sum(len(values) for values in metrics.registry.snapshot().values())
+    scrape = [0.0] * 20
+    for n in range(len(scrape)):
+        start = time.perf_counter()
+        resp = clients["off"].get("/metrics")
+        scrape[n] = (time.perf_counter() - start) * 1000
+    print(f"/metrics with {series} series: median {statistics.median(scrape):.2f} ms, {len(resp.content) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
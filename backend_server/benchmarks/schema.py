@@ -0,0 +1,64 @@
+"""GET /api/schema/ live against the cached document.
+
+Times:
+- the live view (API_SCHEMA_CACHE off), which introspects every view on each call;
+- the cached view's first request, both generating the document and
+  reading it from API_SCHEMA_FILE (as written by `build_schema`);
+- repeat requests for YAML and JSON, gzipped, and a revalidation with
+  If-None-Match that gets a 304.
+
+    python -m benchmarks.schema --repeat 20
+"""
+import argparse
+import time
+
+from ._setup import setup_django, summarize, timeit
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.test import Client
+
+    from worknomads_common.schema import schema_cache
+
+    client = Client()
+    settings.API_SCHEMA_FILE = str(workdir / "openapi-schema.json")
+
+    def get(**headers):
+        response = client.get("/api/schema/", **headers)
+        assert response.status_code in (200, 304), response.status_code
+        return response
+
+    def once(label: str) -> None:
+        start = time.perf_counter()
+        response = get()
+        print(f"{label:34} {(time.perf_counter() - start) * 1000:8.2f} ms  {len(response.content):6} bytes")
+
+    settings.API_SCHEMA_CACHE = False
+    print(f"{'live':34} {summarize(timeit(get, args.repeat))}  {len(get().content):6} bytes")
+
+    settings.API_SCHEMA_CACHE = True
+    schema_cache.clear()
+    once("cached, first request (generates)")
+    call_command("build_schema")
+    schema_cache.clear()
+    once("cached, first request (from file)")
+
+    etag = get()["ETag"]
+    gzipped = get(HTTP_ACCEPT_ENCODING="gzip")
+    assert gzipped["Content-Encoding"] == "gzip"
+    print(f"{'cached YAML':34} {summarize(timeit(get, args.repeat))}")
+    print(f"{'cached JSON':34} {summarize(timeit(lambda: get(HTTP_ACCEPT='application/json'), args.repeat))}")
+    print(f"{'cached YAML, gzip':34} {summarize(timeit(lambda: get(HTTP_ACCEPT_ENCODING='gzip'), args.repeat))}  {len(gzipped.content):6} bytes")
+    assert get(HTTP_IF_NONE_MATCH=etag).status_code == 304
+    print(f"{'If-None-Match -> 304':34} {summarize(timeit(lambda: get(HTTP_IF_NONE_MATCH=etag), args.repeat))}")
+
+
+if __name__ == "__main__":
+    main()
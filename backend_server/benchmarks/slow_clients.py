@@ -0,0 +1,194 @@
+"""List latency while slow clients trickle uploads, WSGI (gthread) vs ASGI.
+
+Starts the backend under gunicorn once per mode, with the same small
+worker/thread budget. It then opens `--slow` connections that each send
+a multipart image upload a few hundred bytes at a time. While those are in
+flight, it times `GET /api/media/list/` from a handful of fast clients.
+Under gthread every trickling upload holds a worker thread until its body
+is complete. Under ASGI the body is buffered on the event loop, so the
+list requests keep flowing.
+
+    python -m benchmarks.slow_clients --slow 32 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import jwt
+
+ROOT = Path(__file__).resolve().parent.parent
+SIGNING_KEY = "slow-clients-bench-key"
+BOUNDARY = "benchboundary"
+
+
+def token(user_id: int) -> str:
+    return jwt.encode({"user_id": user_id, "username": f"user{user_id}", "exp": int(time.time()) + 3600}, SIGNING_KEY, algorithm="HS256")
+
+
+def upload_request(port: int, size: int) -> bytes:
+    body = (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="slow.png"\r\n'
+        "Content-Type: image/png\r\n\r\n"
+    ).encode() + os.urandom(size) + f"\r\n--{BOUNDARY}--\r\n".encode()
+    head = (
+        "POST /api/media/upload/image/ HTTP/1.1\r\n"
+        f"Host: 127.0.0.1:{port}\r\n"
+        f"Authorization: Bearer {token(1)}\r\n"
+        f"Content-Type: multipart/form-data; boundary={BOUNDARY}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode()
+    return head + body
+
+
+async def read_status(reader: asyncio.StreamReader) -> int:
+    line = await reader.readline()
+    try:
+        return int(line.split()[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+async def slow_upload(port: int, size: int, chunk: int, delay: float, done: list) -> None:
+    # Stagger the finishes so SQLite isn't asked for a dozen write locks in the same millisecond.
+    await asyncio.sleep(random.uniform(0, 1))
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        payload = upload_request(port, size)
+        for i in range(0, len(payload), chunk):
+            writer.write(payload[i : i + chunk])
+            await writer.drain()
+            await asyncio.sleep(delay)
+        done.append(await read_status(reader))
+        writer.close()
+    except OSError:
+        done.append(0)
+
+
+async def fast_lists(port: int, deadline: float, latencies: list, failures: list) -> None:
+    request = (
+        "GET /api/media/list/ HTTP/1.1\r\n"
+        f"Host: 127.0.0.1:{port}\r\n"
+        f"Authorization: Bearer {token(2)}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            await writer.drain()
+            status = await asyncio.wait_for(read_status(reader), timeout=max(deadline - time.perf_counter(), 0.1))
+            await reader.read()
+            writer.close()
+        except (OSError, asyncio.TimeoutError):
+            status = 0
+        if status == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            failures.append(1)
+
+
+async def measure(port: int, args) -> dict:
+    deadline = time.perf_counter() + args.seconds
+    latencies, failures, uploaded = [], [], []
+    # Spread each upload over the whole run.
+    delay = args.seconds / max((args.size // args.chunk), 1) * 0.8
+    slow = [asyncio.create_task(slow_upload(port, args.size, args.chunk, delay, uploaded)) for _ in range(args.slow)]
+    await asyncio.sleep(0.5)
+    await asyncio.gather(*(fast_lists(port, deadline, latencies, failures) for _ in range(args.fast)))
+    await asyncio.wait(slow, timeout=args.seconds)
+    for task in slow:
+        task.cancel()
+    latencies.sort()
+    return {
+        "lists": len(latencies),
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p95": latencies[int(len(latencies) * 0.95)] if latencies else float("nan"),
+        "failed": len(failures),
+        "rps": len(latencies) / (args.seconds - 0.5),
+        "max": latencies[-1] if latencies else float("nan"),
+        "uploads": dict(Counter(uploaded)),
+    }
+
+
+def wait_for_port(port: int, timeout: float = 60) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"nothing listening on :{port} after {timeout}s")
+
+
+def serve(mode: str, port: int, workdir: Path, args) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "SERVER_MODE": mode,
+        "PORT": str(port),
+        "DATABASE_URL": os.getenv("BENCH_DATABASE_URL", f"sqlite:///{(workdir / 'bench.db').as_posix()}"),
+        "MEDIA_ROOT": str(workdir / "media"),
+        "SIMPLE_JWT_SIGNING_KEY": SIGNING_KEY,
+        "DJANGO_ALLOWED_HOSTS": "*",
+        "WEB_CONCURRENCY": str(args.workers),
+        "GUNICORN_THREADS": str(args.threads),
+        "GUNICORN_TIMEOUT": str(int(args.seconds * 3)),
+        "GUNICORN_ACCESS_LOG": "",
+    }
+    subprocess.run([sys.executable, "manage.py", "migrate", "--noinput", "-v0"], cwd=ROOT, env=env, check=True)
+    app = "backend_server.asgi:application" if mode == "asgi" else "backend_server.wsgi:application"
+    log = open(workdir / f"{mode}.log", "wb")
+    return subprocess.Popen(
+        ["gunicorn", app, "-c", "python:worknomads_common.gunicorn_conf"], cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True
+    )
+
+
+def stop(proc: subprocess.Popen) -> None:
+    os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="wsgi,asgi")
+    parser.add_argument("--slow", type=int, default=32, help="Concurrent trickling uploads.")
+    parser.add_argument("--fast", type=int, default=4, help="Concurrent list clients.")
+    parser.add_argument("--size", type=int, default=64 * 1024, help="Bytes per slow upload.")
+    parser.add_argument("--chunk", type=int, default=512)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--port", type=int, default=18102)
+    args = parser.parse_args()
+
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        workdir = Path(tempfile.mkdtemp(prefix=f"bench-slow-{mode}-"))
+        proc = serve(mode, args.port, workdir, args)
+        try:
+            wait_for_port(args.port)
+            r = asyncio.run(measure(args.port, args))
+        finally:
+            stop(proc)
+        print(
+            f"{mode:5} {args.slow} slow uploads: list {r['rps']:7.1f} req/s  p50 {r['p50']:8.1f} ms  p95 {r['p95']:8.1f} ms  "
+            f"max {r['max']:8.1f} ms  {r['failed']:4} failed | upload statuses {r['uploads']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Storage naming: the old per-day layout against the sharded one, and relocating old files.
+
+Saves `--files` small files through the default (local) storage twice:
+- with the old `upload_to` naming, `images/YYYY/MM/DD/<client filename>`,
+  where clients mostly send a few common names (`image.jpg`, ...);
+- with the current `upload_to`, unique sharded keys.
+
+For each layout it reports saves per second, `exists()` probes per save,
+the largest directory and how long listing it takes. Then it records the
+old-layout files as pre-blob MediaFile rows and times `relocate_media`,
+which moves them into the content-addressed blob layout.
+
+    python -m benchmarks.storage_layout --files 50000
+"""
+import argparse
+import io
+import os
+import random
+import time
+
+from ._setup import setup_django
+
+COMMON_NAMES = ["image.jpg", "photo.jpg", "IMG_0001.jpg", "screenshot.png", "recording.m4a", "audio.mp3"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--common", type=float, default=0.8, help="Share of uploads with a common client filename.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from mediafiles.models import MediaBlob, MediaFile, upload_to
+
+    rng = random.Random(3)
+    names = [rng.choice(COMMON_NAMES) if rng.random() < args.common else f"upload_{i}.jpg" for i in range(args.files)]
+    probes = [0]
+    exists = default_storage.exists
+
+    def counting_exists(name):
+        probes[0] += 1
+        return exists(name)
+
+    default_storage.exists = counting_exists
+
+    def old_upload_to(filename: str) -> str:
+        return f"images/{timezone.now().strftime('%Y/%m/%d')}/{filename}"
+
+    row = MediaFile(file_type=MediaFile.TYPE_IMAGE)
+    saved = {}
+    for label, name_for in (("per-day, client names", old_upload_to), ("sharded, unique keys", lambda f: upload_to(row, f))):
+        probes[0] = 0
+        stored = []
+        start = time.perf_counter()
+        for i, filename in enumerate(names):
+            stored.append(default_storage.save(name_for(filename), ContentFile(f"file {i}".encode())))
+        elapsed = time.perf_counter() - start
+        saved[label] = stored
+        sizes = {}
+        for name in stored:
+            directory = os.path.dirname(name)
+            sizes[directory] = sizes.get(directory, 0) + 1
+        biggest = max(sizes, key=sizes.get)
+        start = time.perf_counter()
+        for _ in range(5):
+            os.listdir(default_storage.path(biggest))
+        listing = (time.perf_counter() - start) / 5 * 1000
+        print(
+            f"{label:24} {len(names) / elapsed:8.0f} saves/s  {probes[0] / len(names):4.2f} exists()/save  "
+            f"{len(sizes):6} dirs, largest {sizes[biggest]:6} files, listed in {listing:6.2f} ms"
+        )
+    default_storage.exists = exists
+
+    MediaFile.objects.bulk_create(
+        MediaFile(owner_id="1", file=name, file_type="image", original_filename=os.path.basename(name),
+                  content_type="image/jpeg", size=default_storage.size(name))
+        for name in saved["per-day, client names"]
+    )
+    start = time.perf_counter()
+    call_command("relocate_media", stdout=io.StringIO())
+    elapsed = time.perf_counter() - start
+    assert not MediaFile.objects.filter(blob__isnull=True).exists()
+    print(
+        f"relocate_media: {args.files} files in {elapsed:.1f}s ({args.files / elapsed:.0f}/s), "
+        f"{MediaBlob.objects.count()} blob(s) after dedup"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Reading an owner's storage usage as their library grows: SUM over MediaFile vs OwnerUsage.
+
+At 1k, 10k and 100k files it times:
+- the old `SUM(size)` aggregate per file type;
+- `usage_for()`, which reads at most one OwnerUsage row per type;
+- GET /api/media/usage/ end to end.
+The last two should stay flat.
+"""
+import argparse
+
+from ._setup import bearer, setup_django, summarize, timeit
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models import Count, Sum
+    from django.test import Client
+    from mediafiles.models import MediaFile
+    from mediafiles.usage import rebuild, usage_for
+
+    client = Client()
+    owner = "42"
+    auth = bearer(owner)
+    total = 0
+    for size in [int(s) for s in args.sizes.split(",")]:
+        MediaFile.objects.bulk_create(
+            (
+                MediaFile(owner_id=owner, file=f"images/bench/{i}.jpg", file_type="image" if i % 3 else "audio",
+                          original_filename=f"{i}.jpg", content_type="image/jpeg", size=1024 + i)
+                for i in range(total, size)
+            ),
+            batch_size=5000,
+        )
+        total = size
+        rebuild(owner)
+
+        def scan():
+            return list(MediaFile.objects.filter(owner_id=owner).values("file_type").annotate(total=Sum("size"), count=Count("id")).order_by())
+
+        assert {r["file_type"]: r["total"] for r in scan()} == {t: u["bytes"] for t, u in usage_for(owner).items()}
+        summed = timeit(scan, args.repeat)
+        table = timeit(lambda: usage_for(owner), args.repeat)
+        endpoint = timeit(lambda: client.get("/api/media/usage/", HTTP_AUTHORIZATION=auth), args.repeat)
+        print(f"{size:>7} files | SUM(size) {summarize(summed)} | OwnerUsage {summarize(table)} | GET usage/ {summarize(endpoint)}")
+
+
+if __name__ == "__main__":
+    main()
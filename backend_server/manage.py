@@ -4,7 +4,8 @@ import sys
 
 
 def main() -> None:
-    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend_server.settings")
+    test = sys.argv[1:2] == ["test"]
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend_server.test_settings" if test else "backend_server.settings")
     from django.core.management import execute_from_command_line
 
     execute_from_command_line(sys.argv)
@@ -1,11 +1,118 @@
 from typing import List
 from django.contrib import admin
-from .models import MediaFile
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from . import filters
+from .models import DerivativeJob, ImageVariant, MediaBlob, MediaFile, OwnerUsage, StorageTombstone
+
+
+class EstimatedCountPaginator(Paginator):
+    """Never runs COUNT(*) over the whole table.
+
+    On PostgreSQL it takes the planner's row estimate. Elsewhere, or when
+    the estimate is small, it counts exactly, but stops at COUNT_LIMIT
+    rows, so at most that many pages' worth are listed.
+    """
+
+    COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self) -> int:
+        estimate = filters.estimated_count(self.object_list)
+        if estimate is not None:
+            return estimate
+        return self.object_list[: self.COUNT_LIMIT].count()
+
+
+class ContentTypeFilter(admin.SimpleListFilter):
+    # Fixed choices: listing the distinct values would itself scan the table.
+    title = "content type"
+    parameter_name = "content_type"
+    CHOICES = ["image/jpeg", "image/png", "image/webp", "image/gif", "audio/mpeg", "audio/wav", "audio/flac", "audio/ogg", "audio/mp4"]
+
+    def lookups(self, request, model_admin):
+        return [(value, value) for value in self.CHOICES]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(content_type=self.value())
+        return queryset
+
+
+class SizeFilter(admin.SimpleListFilter):
+    title = "size"
+    parameter_name = "size"
+    MB = 1024 * 1024
+    BUCKETS = {"lt1": (None, MB), "1-10": (MB, 10 * MB), "10-100": (10 * MB, 100 * MB), "gte100": (100 * MB, None)}
+
+    def lookups(self, request, model_admin):
+        return [("lt1", "under 1 MB"), ("1-10", "1-10 MB"), ("10-100", "10-100 MB"), ("gte100", "100 MB and over")]
+
+    def queryset(self, request, queryset):
+        if self.value() not in self.BUCKETS:
+            return queryset
+        low, high = self.BUCKETS[self.value()]
+        if low is not None:
+            queryset = queryset.filter(size__gte=low)
+        if high is not None:
+            queryset = queryset.filter(size__lt=high)
+        return queryset
 
 
 @admin.register(MediaFile)
 class MediaFileAdmin(admin.ModelAdmin):
     list_display = ("id", "owner_id", "file_type", "original_filename", "size", "created_at")
-    list_filter = ("file_type", "created_at")
+    list_filter = ("file_type", ContentTypeFilter, SizeFilter, "created_at")
+    # Searches an exact owner id or a filename (see filters.admin_search); both are indexed.
     search_fields = ("owner_id", "original_filename")
+    search_help_text = "An exact owner id, or part of a filename (its start, except on PostgreSQL)."
+    # Newest first by primary key: ids grow with created_at, and the pk index serves the order.
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    # Don't count the whole table next to every filtered result.
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        return filters.admin_search(queryset, search_term), False
+
+
+class ImageVariantInline(admin.TabularInline):
+    model = ImageVariant
+    extra = 0
+    fields = ("name", "width", "height", "content_type", "size", "file")
+    readonly_fields = fields
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ("id", "sha256", "size", "ref_count", "created_at")
+    search_fields = ("sha256",)
+    ordering = ("-created_at",)
+    inlines = [ImageVariantInline]
+
+
+@admin.register(DerivativeJob)
+class DerivativeJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "blob", "status", "attempts", "run_after", "updated_at")
+    list_filter = ("status",)
+    search_fields = ("blob__sha256",)
+    readonly_fields = ("blob", "attempts", "error", "locked_at", "created_at", "updated_at")
     ordering = ("-created_at",)
+
+
+@admin.register(StorageTombstone)
+class StorageTombstoneAdmin(admin.ModelAdmin):
+    list_display = ("id", "media_file", "attempts", "run_after", "created_at")
+    search_fields = ("media_file__owner_id",)
+    readonly_fields = ("media_file", "attempts", "error", "locked_at", "created_at")
+    ordering = ("run_after",)
+
+
+@admin.register(OwnerUsage)
+class OwnerUsageAdmin(admin.ModelAdmin):
+    list_display = ("owner_id", "file_type", "file_count", "bytes_used", "updated_at")
+    list_filter = ("file_type",)
+    search_fields = ("owner_id",)
+    # Maintained by uploads and deletes; fix drift with `manage.py rebuild_usage`.
+    readonly_fields = ("owner_id", "file_type", "file_count", "bytes_used", "updated_at")
+    ordering = ("-bytes_used",)
@@ -0,0 +1,119 @@
+"""Async variants of the upload, list and delete endpoints (single and batch) for ASGI deployments.
+
+Under ASGI, Django buffers the request body on the event loop before the
+view runs, so a slow client costs a coroutine instead of a worker thread.
+These views then keep blocking work off the loop: multipart parsing and
+storage writes run in a worker thread, the list is read with async ORM
+iteration, and the short transactional steps (blob refcounts, row locks)
+run via `sync_to_async`, because Django has no async transactions.
+
+They're wired in place of the sync views when MEDIA_ASYNC_VIEWS is on, which
+it is by default with SERVER_MODE=asgi.
+"""
+from typing import Any
+
+from adrf.views import APIView as AsyncAPIView
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework import status
+from rest_framework.response import Response
+
+from .serializers import MediaFileSerializer
+from .serializers import BatchDeleteSerializer
+from .views import (
+    BatchDeleteFilesView,
+    BatchUploadAudioView,
+    BatchUploadImagesView,
+    DeleteFileView,
+    ListFilesView,
+    UploadAudioView,
+    UploadImageView,
+    batch_delete_schema,
+    delete_file_schema,
+    list_files_schema,
+    upload_audio_batch_schema,
+    upload_audio_schema,
+    upload_image_schema,
+    upload_images_schema,
+)
+
+
+class AsyncUploadMixin:
+    async def post(self, request, *args: Any, **kwargs: Any):
+        rejected = self.check_content_length(request)
+        if rejected:
+            return rejected
+        # Parsing streams the file to disk; don't let that block the event loop.
+        up_file, handler, rejected = await sync_to_async(self.receive_file, thread_sensitive=False)(request)
+        if rejected:
+            return rejected
+        instance = await sync_to_async(self.store)(request, up_file, handler)
+        data = MediaFileSerializer(instance, context={"request": request}).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class AsyncUploadImageView(AsyncUploadMixin, UploadImageView, AsyncAPIView):
+    @upload_image_schema
+    async def post(self, request, *args, **kwargs):
+        return await super().post(request, *args, **kwargs)
+
+
+class AsyncUploadAudioView(AsyncUploadMixin, UploadAudioView, AsyncAPIView):
+    @upload_audio_schema
+    async def post(self, request, *args, **kwargs):
+        return await super().post(request, *args, **kwargs)
+
+
+class AsyncBatchUploadMixin:
+    async def post(self, request, *args: Any, **kwargs: Any):
+        rejected = self.check_content_length(request)
+        if rejected:
+            return rejected
+        handler, rejected = await sync_to_async(self.receive_files, thread_sensitive=False)(request)
+        if rejected:
+            return rejected
+        results = await sync_to_async(self.store_batch)(request, handler)
+        return self.batch_response(request, results)
+
+
+class AsyncBatchUploadImagesView(AsyncBatchUploadMixin, BatchUploadImagesView, AsyncAPIView):
+    @upload_images_schema
+    async def post(self, request, *args, **kwargs):
+        return await super().post(request, *args, **kwargs)
+
+
+class AsyncBatchUploadAudioView(AsyncBatchUploadMixin, BatchUploadAudioView, AsyncAPIView):
+    @upload_audio_batch_schema
+    async def post(self, request, *args, **kwargs):
+        return await super().post(request, *args, **kwargs)
+
+
+class AsyncListFilesView(ListFilesView, AsyncAPIView):
+    @list_files_schema
+    async def get(self, request, *args: Any, **kwargs: Any):
+        cached = await sync_to_async(self.cached_response)(request)
+        if cached is not None:
+            return cached
+        page = await self.paginator.apaginate_queryset(self.get_queryset(), request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return await sync_to_async(self.remember)(self.get_paginated_response(serializer.data))
+
+
+class AsyncDeleteFileView(DeleteFileView, AsyncAPIView):
+    @delete_file_schema
+    async def delete(self, request, pk: int, *args: Any, **kwargs: Any):
+        owner_id = str(getattr(request.user, "id", ""))
+        # Row lock + refcount + unlink have to share one transaction, so this part stays sync.
+        if not await sync_to_async(self.remove)(pk, owner_id):
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AsyncBatchDeleteFilesView(BatchDeleteFilesView, AsyncAPIView):
+    @batch_delete_schema
+    async def post(self, request, *args: Any, **kwargs: Any):
+        serializer = BatchDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        owner_id = str(getattr(request.user, "id", ""))
+        results = await sync_to_async(self.remove_many)(serializer.validated_data["ids"], owner_id)
+        return Response({"results": results}, status=status.HTTP_207_MULTI_STATUS)
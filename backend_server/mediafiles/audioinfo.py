@@ -0,0 +1,333 @@
+"""Duration, sample rate, channels and bitrate straight from audio container headers.
+
+Only headers are read: a few KB at the start of the file, plus the tail for
+Ogg or the `moov` box for MP4, wherever it sits. Nothing is decoded, so
+probing a 200 MB upload costs about the same as probing a 200 KB one.
+Covers WAV, MP3 (Xing/Info/VBRI or constant bitrate), FLAC, Ogg
+Vorbis/Opus and MP4/M4A. `probe()` returns None for anything it doesn't
+recognise.
+
+Stdlib only, so the derivative worker processes can import it too.
+"""
+import os
+import struct
+from typing import BinaryIO, NamedTuple, Optional
+
+
+class AudioInfo(NamedTuple):
+    duration: float  # seconds
+    sample_rate: int
+    channels: int
+    bitrate: int  # bits per second, averaged over the whole file
+
+
+class WavLayout(NamedTuple):
+    format_tag: int  # 1 = integer PCM, 3 = IEEE float
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    data_offset: int
+    data_size: int
+
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def probe(path: str) -> Optional[AudioInfo]:
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(12)
+        try:
+            if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+                return _probe_wav(f, size)
+            if head[:4] == b"OggS":
+                return _probe_ogg(f, size)
+            if head[4:8] == b"ftyp":
+                return _probe_mp4(f, size)
+            start = _id3v2_size(head, f)
+            f.seek(start)
+            if f.read(4) == b"fLaC":
+                return _probe_flac(f, size)
+            return _probe_mp3(f, size, start)
+        except (OSError, struct.error, ValueError, ZeroDivisionError):
+            # Truncated or malformed headers: report nothing rather than nonsense.
+            return None
+
+
+def audio_metadata(path: str) -> dict:
+    """`probe()` as MediaFile field values; empty if the format isn't recognised."""
+    info = probe(path)
+    return info._asdict() if info is not None else {}
+
+
+def wav_layout(f: BinaryIO) -> Optional[WavLayout]:
+    """Locate the sample data of a PCM/float WAV file (`f` positioned anywhere)."""
+    f.seek(0)
+    head = f.read(12)
+    if head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return None
+    fmt = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk)
+        if chunk_id == b"fmt ":
+            body = f.read(chunk_size)
+            format_tag, channels, sample_rate, _byte_rate, _align, bits = struct.unpack("<HHIIHH", body[:16])
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                # The real format is the first two bytes of the SubFormat GUID.
+                format_tag = struct.unpack("<H", body[24:26])[0]
+            fmt = (format_tag, channels, sample_rate, bits)
+            if chunk_size % 2:
+                f.seek(1, os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            return WavLayout(*fmt, data_offset=f.tell(), data_size=chunk_size)
+        else:
+            # Chunks are padded to an even length.
+            f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+def _probe_wav(f: BinaryIO, size: int) -> Optional[AudioInfo]:
+    layout = wav_layout(f)
+    if layout is None:
+        return None
+    # Streaming writers leave 0 or 0xFFFFFFFF in the data size; trust the file size then.
+    data_size = min(layout.data_size, size - layout.data_offset) or size - layout.data_offset
+    byte_rate = layout.sample_rate * layout.channels * layout.bits_per_sample // 8
+    return AudioInfo(data_size / byte_rate, layout.sample_rate, layout.channels, byte_rate * 8)
+
+
+def _id3v2_size(head: bytes, f: BinaryIO) -> int:
+    if head[:3] != b"ID3":
+        return 0
+    f.seek(0)
+    header = f.read(10)
+    # Tag size is "syncsafe": 7 significant bits per byte.
+    tag_size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + tag_size + footer
+
+
+def _probe_flac(f: BinaryIO, size: int) -> Optional[AudioInfo]:
+    block_header = f.read(4)
+    if block_header[0] & 0x7F != 0:  # STREAMINFO must come first
+        return None
+    streaminfo = f.read(34)
+    packed = int.from_bytes(streaminfo[10:18], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    if not sample_rate or not total_samples:
+        return None
+    duration = total_samples / sample_rate
+    return AudioInfo(duration, sample_rate, channels, int(size * 8 / duration))
+
+
+# kbit/s by [version is MPEG-1][layer]; index 0 is "free format", 15 is invalid.
+MP3_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+class Mp3Frame(NamedTuple):
+    mpeg1: bool
+    layer: int
+    bitrate: int  # bits per second
+    sample_rate: int
+    channels: int
+    length: int  # bytes, including the header
+    samples: int
+
+
+def _mp3_frame(header: bytes) -> Optional[Mp3Frame]:
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x3
+    layer = 4 - ((header[1] >> 1) & 0x3)
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 0x1
+    channels = 1 if header[3] >> 6 == 3 else 2
+    if layer == 1:
+        samples, length = 384, (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if mpeg1 or layer == 2 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return Mp3Frame(mpeg1, layer, bitrate, sample_rate, channels, length, samples)
+
+
+def _probe_mp3(f: BinaryIO, size: int, start: int) -> Optional[AudioInfo]:
+    f.seek(start)
+    window = f.read(64 * 1024)
+    for pos in range(len(window) - 4):
+        if window[pos] != 0xFF:
+            continue
+        frame = _mp3_frame(window[pos : pos + 4])
+        if frame is None:
+            continue
+        # A real frame is followed by another one; random 0xFF bytes mostly aren't.
+        following = window[pos + frame.length : pos + frame.length + 4]
+        if len(following) == 4 and _mp3_frame(following) is None:
+            continue
+        break
+    else:
+        return None
+
+    audio_start = start + pos
+    audio_bytes = size - audio_start
+    f.seek(size - 128)
+    if f.read(3) == b"TAG":  # ID3v1 trailer
+        audio_bytes -= 128
+
+    frame_count = _mp3_vbr_frames(window[pos : pos + frame.length], frame)
+    if frame_count:
+        duration = frame_count * frame.samples / frame.sample_rate
+        bitrate = int(audio_bytes * 8 / duration)
+    else:
+        # Constant bitrate: the first frame speaks for all of them.
+        duration = audio_bytes * 8 / frame.bitrate
+        bitrate = frame.bitrate
+    return AudioInfo(duration, frame.sample_rate, frame.channels, bitrate)
+
+
+def _mp3_vbr_frames(first: bytes, frame: Mp3Frame) -> int:
+    """Frame count from a Xing/Info or VBRI header in the first frame, or 0."""
+    side_info = (32 if frame.channels == 2 else 17) if frame.mpeg1 else (17 if frame.channels == 2 else 9)
+    xing = 4 + side_info
+    if first[xing : xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", first[xing + 4 : xing + 8])[0]
+        if flags & 0x1:
+            return struct.unpack(">I", first[xing + 8 : xing + 12])[0]
+    if first[36:40] == b"VBRI":
+        return struct.unpack(">I", first[50:54])[0]
+    return 0
+
+
+def _probe_ogg(f: BinaryIO, size: int) -> Optional[AudioInfo]:
+    f.seek(0)
+    page = f.read(27 + 255)
+    segments = page[26]
+    packet = page[27 + segments :]
+    if len(packet) < 19:
+        f.seek(27 + segments)
+        packet = f.read(64)
+    if packet[:7] == b"\x01vorbis":
+        channels, sample_rate = struct.unpack("<BI", packet[11:16])
+        granule_rate, pre_skip = sample_rate, 0
+    elif packet[:8] == b"OpusHead":
+        channels, pre_skip, sample_rate = struct.unpack("<BHI", packet[9:16])
+        # Opus granule positions always count 48 kHz samples, whatever the input rate was.
+        granule_rate = 48000
+        sample_rate = sample_rate or 48000
+    else:
+        return None
+
+    f.seek(max(size - 64 * 1024, 0))
+    tail = f.read()
+    last = tail.rfind(b"OggS")
+    if last < 0 or last + 14 > len(tail):
+        return None
+    granule = struct.unpack("<q", tail[last + 6 : last + 14])[0]
+    duration = (granule - pre_skip) / granule_rate
+    if duration <= 0:
+        return None
+    return AudioInfo(duration, sample_rate, channels, int(size * 8 / duration))
+
+
+# Boxes we descend into on the way to the audio track's headers.
+MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+# Refuse absurd `moov` boxes instead of reading them into memory.
+MP4_MAX_MOOV = 16 * 1024 * 1024
+
+
+def _mp4_boxes(data: bytes, offset: int = 0, end: Optional[int] = None):
+    end = len(data) if end is None else end
+    while offset + 8 <= end:
+        box_size, box_type = struct.unpack(">I4s", data[offset : offset + 8])
+        header = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", data[offset + 8 : offset + 16])[0]
+            header = 16
+        elif box_size == 0:
+            box_size = end - offset
+        if box_size < header:
+            return
+        yield box_type, offset + header, min(offset + box_size, end)
+        offset += box_size
+
+
+def _probe_mp4(f: BinaryIO, size: int) -> Optional[AudioInfo]:
+    # Walk top-level boxes by seeking, so a `moov` at the end of a big file is cheap to reach.
+    offset = 0
+    moov = None
+    while offset + 8 <= size:
+        f.seek(offset)
+        box_size, box_type = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif box_size == 0:
+            box_size = size - offset
+        if box_size < header:
+            return None
+        if box_type == b"moov":
+            if box_size > MP4_MAX_MOOV:
+                return None
+            moov = f.read(box_size - header)
+            break
+        offset += box_size
+    if moov is None:
+        return None
+
+    for trak_type, trak_start, trak_end in _mp4_boxes(moov):
+        if trak_type != b"trak":
+            continue
+        info = _mp4_audio_track(moov, trak_start, trak_end)
+        if info is not None:
+            timescale, duration_units, sample_rate, channels = info
+            duration = duration_units / timescale
+            return AudioInfo(duration, sample_rate, channels, int(size * 8 / duration))
+    return None
+
+
+def _mp4_audio_track(data: bytes, start: int, end: int):
+    found = {}
+
+    def walk(offset: int, stop: int) -> None:
+        for box_type, body, box_end in _mp4_boxes(data, offset, stop):
+            if box_type in MP4_CONTAINERS:
+                walk(body, box_end)
+            elif box_type == b"mdhd":
+                if data[body] == 1:
+                    found["timescale"], found["duration"] = struct.unpack(">IQ", data[body + 20 : body + 32])
+                else:
+                    found["timescale"], found["duration"] = struct.unpack(">II", data[body + 12 : body + 20])
+            elif box_type == b"hdlr":
+                found["handler"] = data[body + 8 : body + 12]
+            elif box_type == b"stsd":
+                # First sample entry (8-byte box header) then the AudioSampleEntry fields.
+                entry = body + 8 + 8
+                found["channels"] = struct.unpack(">H", data[entry + 16 : entry + 18])[0]
+                found["sample_rate"] = struct.unpack(">I", data[entry + 24 : entry + 28])[0] >> 16
+
+    walk(start, end)
+    if found.get("handler") != b"soun" or not found.get("timescale") or not found.get("duration"):
+        return None
+    return found["timescale"], found["duration"], found.get("sample_rate", 0), found.get("channels", 0)
@@ -0,0 +1,191 @@
+"""Content-addressed blob store behind MediaFile.
+
+Uploads are streamed to a staging name first (the hash isn't known until the
+last byte), then either moved into place as a new blob or dropped in
+favour of the existing blob with the same digest, so a duplicate upload
+never adds to what's kept in storage.
+
+Staging is always on local disk (MEDIA_ROOT). Blobs live in the default
+storage. With local storage that is the same filesystem, so "moving" is a
+rename. With object storage (MEDIA_STORAGE_BACKEND=s3) it's an upload,
+and bytes a client PUT straight to the store are moved with a
+server-side copy (`commit_object`).
+"""
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from worknomads_common import metrics
+
+from . import objectstore
+from .models import MediaBlob, blob_upload_to, derivative_dir
+
+STAGING_DIR = "blobs/incoming"
+
+
+def blob_storage():
+    return MediaBlob._meta.get_field("file").storage
+
+
+def staging_storage() -> FileSystemStorage:
+    """Node-local scratch space under MEDIA_ROOT, whatever the blob storage is."""
+    storage = blob_storage()
+    return storage if is_local(storage) else FileSystemStorage()
+
+
+def is_local(storage) -> bool:
+    return isinstance(storage, FileSystemStorage)
+
+
+def stored(storage, name: str) -> bool:
+    """Whether `name` exists. Not storage.exists(): S3Storage answers False for everything when it may overwrite."""
+    if is_local(storage):
+        return os.path.exists(storage.path(name))
+    return objectstore.head(name) is not None
+
+
+def staging_name() -> str:
+    return f"{STAGING_DIR}/{uuid.uuid4().hex}"
+
+
+def commit_blob(staging: str, sha256: str, size: int) -> MediaBlob:
+    """Take one reference on the blob for `sha256`, consuming the staged upload.
+
+    Call inside a transaction; the blob row stays locked until it commits.
+    """
+    return take_blob(sha256, size, place=lambda name: store_staged(staging, name), drop=lambda: staging_storage().delete(staging))
+
+
+def commit_object(key: str, etag: str, sha256: str, size: int) -> MediaBlob:
+    """`commit_blob` for bytes a client already uploaded to object storage under `key` (as version `etag`)."""
+
+    def place(name: str) -> None:
+        with metrics.phase("storage"):
+            objectstore.copy(key, name, etag=etag)
+            objectstore.delete(key)
+
+    return take_blob(sha256, size, place=place, drop=lambda: objectstore.delete(key))
+
+
+def store_staged(staging: str, name: str) -> None:
+    storage = blob_storage()
+    with metrics.phase("storage"):
+        if is_local(storage):
+            target = storage.path(name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(storage.path(staging), target)
+            return
+        scratch = staging_storage()
+        with scratch.open(staging, "rb") as f:
+            storage.save(name, f)
+        scratch.delete(staging)
+
+
+def take_blob(sha256: str, size: int, *, place: Callable[[str], None], drop: Callable[[], None]) -> MediaBlob:
+    """Reference the existing blob (and `drop()` the new bytes) or `place(name)` them as a new one."""
+    blob = MediaBlob.objects.select_for_update().filter(sha256=sha256).first()
+    if blob is not None:
+        MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+        if stored(blob_storage(), blob.file.name):
+            drop()
+        else:
+            # A release of the previous row with these bytes unlinked them after this row was
+            # created (see `unlink_released`); ours are the same bytes, so put them back.
+            place(blob.file.name)
+        return blob
+
+    blob = MediaBlob(sha256=sha256, size=size, ref_count=1)
+    blob.file.name = blob_upload_to(blob, "")
+    place(blob.file.name)
+    try:
+        with transaction.atomic():
+            blob.save()
+    except IntegrityError:
+        # A concurrent upload of the same bytes created the row first; the file we
+        # just renamed over theirs is byte-identical, so share their row.
+        MediaBlob.objects.filter(sha256=sha256).update(ref_count=F("ref_count") + 1)
+        blob = MediaBlob.objects.get(sha256=sha256)
+    return blob
+
+
+def release_blob(blob_id: int) -> bool:
+    """Drop one reference; if it was the last, delete the row. Returns True if deleted.
+
+    Call inside a transaction. The bytes are unlinked once it commits, so a
+    rollback never leaves a row whose file is gone.
+    """
+    blob = MediaBlob.objects.select_for_update().get(pk=blob_id)
+    if blob.ref_count > 1:
+        MediaBlob.objects.filter(pk=blob_id).update(ref_count=F("ref_count") - 1)
+        return False
+    blob.delete()
+    transaction.on_commit(lambda: unlink_released([blob]), robust=True)
+    return True
+
+
+def release_blobs(counts: Dict[int, int]) -> int:
+    """Drop `counts[blob_id]` references from each blob; returns how many blobs were unlinked.
+
+    The bulk form of `release_blob`, with the same locking. Rows are
+    updated and deleted in a few queries, and once the transaction commits
+    the files of blobs that reached zero are unlinked concurrently.
+    """
+    doomed = []
+    for blob in MediaBlob.objects.select_for_update().filter(pk__in=counts).order_by("pk"):
+        if blob.ref_count > counts[blob.pk]:
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") - counts[blob.pk])
+        else:
+            doomed.append(blob)
+    if doomed:
+        MediaBlob.objects.filter(pk__in=[blob.pk for blob in doomed]).delete()
+        transaction.on_commit(lambda: unlink_released(doomed), robust=True)
+    return len(doomed)
+
+
+def unlink_released(blobs: List[MediaBlob]) -> None:
+    """Unlink the bytes of blobs whose rows were deleted, after that commit.
+
+    Bytes an upload has already created a new row for are kept. An upload
+    can still create one between this check and the unlink; `take_blob`
+    puts the bytes back when the next copy of them arrives. With
+    on_commit(robust=True) a failed unlink is logged and leaves an orphan,
+    which `manage.py reconcile_storage` finds.
+    """
+    reused = set(MediaBlob.objects.filter(sha256__in=[blob.sha256 for blob in blobs]).values_list("sha256", flat=True))
+    run_concurrently(unlink_blob, [blob for blob in blobs if blob.sha256 not in reused])
+
+
+def unlink_blob(blob: MediaBlob) -> None:
+    storage = blob_storage()
+    storage.delete(blob.file.name)
+    # Rendered image variants; their rows went with the blob (CASCADE).
+    delete_dir(storage, derivative_dir(blob.sha256))
+
+
+def delete_dir(storage, name: str) -> None:
+    """Remove everything under `name` (one level deep, which is all derivative dirs have)."""
+    if is_local(storage):
+        shutil.rmtree(storage.path(name), ignore_errors=True)
+        return
+    _, files = storage.listdir(name)
+    for filename in files:
+        storage.delete(f"{name}/{filename}")
+
+
+def run_concurrently(fn: Callable, items: Iterable) -> None:
+    """Call `fn` on every item from a pool of MEDIA_STORAGE_IO_WORKERS threads; re-raises the first error."""
+    items = list(items)
+    if len(items) <= 1:
+        for item in items:
+            fn(item)
+        return
+    with ThreadPoolExecutor(max_workers=min(settings.MEDIA_STORAGE_IO_WORKERS, len(items))) as pool:
+        for _ in pool.map(fn, items):
+            pass
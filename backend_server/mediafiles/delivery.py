@@ -0,0 +1,181 @@
+"""Conditional, ranged file responses for the media download endpoint.
+
+A 200 or 206 goes out one of three ways:
+
+- Under WSGI, as a `FileResponse` over the open file. Gunicorn turns that
+  into `wsgi.file_wrapper` plus `sendfile()`, so the kernel copies straight
+  from page cache to the socket. Gunicorn starts at the file's current OS
+  offset and sends `Content-Length` bytes, which is all a byte range
+  needs.
+- Under ASGI, as an async generator of `BLOCK_SIZE` reads. Django would
+  otherwise collect a sync FileResponse into one list before sending it,
+  which means the whole file in memory for every download.
+- As an empty response carrying `X-Accel-Redirect` (nginx) or `X-Sendfile`
+  (Apache/lighttpd) when MEDIA_SENDFILE_HEADER is set. The proxy then
+  serves the bytes, Range included, and the app worker is free at once.
+
+Conditional requests (`If-None-Match`, `If-Modified-Since`, `If-Match`,
+`If-Unmodified-Since`) are answered before any file is opened for
+streaming.
+"""
+import os
+import re
+from typing import Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+# Bigger than FileResponse's 4 KB default: fewer sync->async hops per MB under ASGI.
+BLOCK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeFile:
+    """Read-only view of `length` bytes of `f` from its current position.
+
+    Exposes `fileno()` so gunicorn can `sendfile()` it, and no `tell()`/`seek()`,
+    so FileResponse leaves the Content-Length we set alone.
+    """
+
+    def __init__(self, f, length: int):
+        self._f = f
+        self._remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b""
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._f.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self._f.fileno()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) inclusive for a single `bytes=` range; None to ignore the header.
+
+    Raises ValueError if the range can't be satisfied (-> 416). Multi-range
+    requests are answered with the whole file, which RFC 9110 allows.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+def if_range_matches(request, etag: str, last_modified: int) -> bool:
+    """Whether an `If-Range` precondition (if any) lets the Range header apply."""
+    value = request.META.get("HTTP_IF_RANGE")
+    if not value:
+        return True
+    if value.startswith('"') or value.startswith("W/"):
+        # Only a strong, exact match counts for If-Range.
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def serve_file(
+    request, path: str, *, content_type: str, etag: Optional[str] = None, filename: str = "", storage_name: str = ""
+):
+    """Respond with the file at `path`, honouring conditional and Range headers.
+
+    `etag` is the unquoted strong validator for the bytes (e.g. their SHA-256);
+    without one, size and mtime stand in. `storage_name` is the path relative
+    to MEDIA_ROOT, used for proxy hand-off.
+    """
+    stat = os.stat(path)
+    last_modified = int(stat.st_mtime)
+    etag = quote_etag(etag or f"{stat.st_size:x}-{stat.st_mtime_ns:x}")
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return with_validators(response, etag, last_modified)
+
+    size = stat.st_size
+    byte_range = None
+    if "HTTP_RANGE" in request.META and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META["HTTP_RANGE"], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return with_validators(response, etag, last_modified)
+
+    if settings.MEDIA_SENDFILE_HEADER:
+        response = proxy_handoff(storage_name or path)
+        response["Content-Type"] = content_type
+    else:
+        start, end = byte_range if byte_range is not None else (0, size - 1)
+        length = end - start + 1
+        f = open(path, "rb")
+        f.seek(start)
+        if "wsgi.version" in request.META:
+            response = FileResponse(RangeFile(f, length), content_type=content_type)
+            response.block_size = BLOCK_SIZE
+        else:
+            response = StreamingHttpResponse(read_chunks(f, length), content_type=content_type)
+        response["Content-Length"] = str(length)
+        if byte_range is not None:
+            response.status_code = 206
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Accept-Ranges"] = "bytes"
+    if filename:
+        response["Content-Disposition"] = content_disposition_header(False, filename)
+    # Revalidate every time; the ETag makes that a cheap 304.
+    response["Cache-Control"] = "private, no-cache"
+    return with_validators(response, etag, last_modified)
+
+
+async def read_chunks(f, remaining: int):
+    read = sync_to_async(f.read, thread_sensitive=False)
+    try:
+        while remaining > 0:
+            chunk = await read(min(BLOCK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def proxy_handoff(storage_name: str) -> HttpResponse:
+    # The proxy computes the length and answers any Range itself.
+    response = HttpResponse()
+    header = settings.MEDIA_SENDFILE_HEADER
+    if header.lower() == "x-accel-redirect":
+        # nginx: an `internal` location that aliases MEDIA_ROOT.
+        response[header] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + storage_name.lstrip("/")
+    else:
+        response[header] = os.path.join(str(settings.MEDIA_ROOT), storage_name)
+    return response
+
+
+def with_validators(response, etag: str, last_modified: int):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
+
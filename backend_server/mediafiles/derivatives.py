@@ -0,0 +1,148 @@
+"""DB-backed job queue for derived files: image variants and audio waveforms.
+
+An upload only inserts a DerivativeJob row, in the same transaction as its
+MediaFile, so the request never waits on Pillow or on decoding audio.
+`manage.py process_derivatives` claims pending jobs and runs them on a
+process pool (both jobs are CPU-bound, so threads would just queue on the
+GIL). It records an ImageVariant per image rendition, or writes the
+waveform peaks file for audio. Everything is keyed by blob, so re-uploading
+the same content reuses what was already derived.
+
+With object storage the renderers still work on local paths: the source
+is fetched into a scratch directory under MEDIA_ROOT, and what they write
+there is uploaded when the job completes.
+"""
+import os
+import shutil
+import uuid
+from datetime import timedelta
+from typing import List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import listcache
+from .blobs import blob_storage, is_local, staging_storage
+from .models import DerivativeJob, ImageVariant, MediaBlob, MediaFile, derivative_dir
+
+# A running job whose worker hasn't reported back within this long is assumed dead and handed out again.
+LOCK_TIMEOUT = timedelta(minutes=10)
+RETRY_DELAY = timedelta(seconds=30)
+WAVEFORM_NAME = "waveform.dat"
+SCRATCH_DIR = "derivatives/scratch"
+
+
+def enqueue(blob: MediaBlob, kind: str) -> None:
+    """Ask for the derivatives of `blob`; a no-op if they were already requested. Call inside the upload's transaction."""
+    DerivativeJob.objects.get_or_create(blob=blob, defaults={"kind": kind})
+
+
+def waveform_name(sha256: str) -> str:
+    return f"{derivative_dir(sha256)}/{WAVEFORM_NAME}"
+
+
+def claimable(now) -> Q:
+    return Q(status=DerivativeJob.STATUS_PENDING, run_after__lte=now) | Q(
+        status=DerivativeJob.STATUS_RUNNING, locked_at__lt=now - LOCK_TIMEOUT
+    )
+
+
+def claim_jobs(limit: int) -> List[DerivativeJob]:
+    """Mark up to `limit` due jobs as running for this worker and return them."""
+    now = timezone.now()
+    candidates = DerivativeJob.objects.filter(claimable(now)).order_by("run_after").values_list("pk", flat=True)[:limit]
+    claimed = []
+    for pk in list(candidates):
+        # Conditional UPDATE: if another worker got there first this matches nothing.
+        taken = DerivativeJob.objects.filter(claimable(now), pk=pk).update(
+            status=DerivativeJob.STATUS_RUNNING, locked_at=now, attempts=F("attempts") + 1
+        )
+        if taken:
+            claimed.append(pk)
+    return list(DerivativeJob.objects.filter(pk__in=claimed).select_related("blob"))
+
+
+def task(job: DerivativeJob):
+    """(function, args) to run in a pool process for `job`; both only touch files."""
+    # Imported here so web processes, which only enqueue, never load Pillow/numpy for this.
+    from .imaging import render_variants
+    from .waveform import compute_peaks
+
+    storage = blob_storage()
+    if is_local(storage):
+        source = storage.path(job.blob.file.name)
+        target_dir = storage.path(derivative_dir(job.blob.sha256))
+    else:
+        scratch = staging_storage()
+        job.scratch = f"{SCRATCH_DIR}/{uuid.uuid4().hex}"
+        source = scratch.path(f"{job.scratch}/source")
+        target_dir = scratch.path(f"{job.scratch}/out")
+        os.makedirs(os.path.dirname(source), exist_ok=True)
+        with storage.open(job.blob.file.name, "rb") as remote, open(source, "wb") as local:
+            shutil.copyfileobj(remote, local, 1024 * 1024)
+    if job.kind == MediaFile.TYPE_AUDIO:
+        return compute_peaks, (source, os.path.join(target_dir, WAVEFORM_NAME), settings.MEDIA_WAVEFORM_POINTS)
+    return render_variants, (source, target_dir, settings.MEDIA_IMAGE_VARIANTS)
+
+
+def complete_job(job: DerivativeJob, result) -> None:
+    """Record what the task produced and close the job."""
+    storage = blob_storage()
+    # render_variants returns one dict per variant, compute_peaks a single dict.
+    rendered = result if isinstance(result, list) else [result]
+    names = [f"{derivative_dir(job.blob.sha256)}/{r['filename']}" for r in rendered]
+    if getattr(job, "scratch", ""):
+        try:
+            scratch = staging_storage()
+            for variant, name in zip(rendered, names):
+                with scratch.open(f"{job.scratch}/out/{variant['filename']}", "rb") as f:
+                    storage.save(name, f)
+        finally:
+            discard_scratch(job)
+    with transaction.atomic():
+        # Locking the blob serializes us with release_blob(): either it's still
+        # there and the variants are attached, or it's gone and we clean up.
+        if not MediaBlob.objects.select_for_update().filter(pk=job.blob_id).exists():
+            for name in names:
+                if not ImageVariant.objects.filter(file=name).exists():
+                    storage.delete(name)
+            return
+        if job.kind == MediaFile.TYPE_IMAGE:
+            for variant, name in zip(rendered, names):
+                ImageVariant.objects.update_or_create(
+                    blob_id=job.blob_id,
+                    name=variant["name"],
+                    defaults={
+                        "file": name,
+                        "width": variant["width"],
+                        "height": variant["height"],
+                        "content_type": variant["content_type"],
+                        "size": variant["size"],
+                    },
+                )
+            # `?variant=` listings of every file with these bytes now point at the renditions.
+            for owner_id in MediaFile.objects.filter(blob_id=job.blob_id).values_list("owner_id", flat=True).order_by().distinct():
+                listcache.bump(owner_id)
+        DerivativeJob.objects.filter(pk=job.pk).update(
+            status=DerivativeJob.STATUS_DONE, error="", locked_at=None, updated_at=timezone.now()
+        )
+
+
+def fail_job(job: DerivativeJob, exc: BaseException, permanent: bool = False) -> None:
+    """Put the job back in the queue with a growing delay, or give up on it."""
+    discard_scratch(job)
+    now = timezone.now()
+    error = f"{type(exc).__name__}: {exc}"[:2000]
+    if permanent or job.attempts >= settings.MEDIA_DERIVATIVE_MAX_ATTEMPTS:
+        updates = {"status": DerivativeJob.STATUS_FAILED}
+    else:
+        updates = {"status": DerivativeJob.STATUS_PENDING, "run_after": now + RETRY_DELAY * 2 ** (job.attempts - 1)}
+    DerivativeJob.objects.filter(pk=job.pk).update(error=error, locked_at=None, updated_at=now, **updates)
+
+
+def discard_scratch(job: DerivativeJob) -> None:
+    if getattr(job, "scratch", ""):
+        shutil.rmtree(staging_storage().path(job.scratch), ignore_errors=True)
+        job.scratch = ""
@@ -0,0 +1,64 @@
+"""Direct uploads: the client PUTs the bytes to object storage itself.
+
+Initiating one records a DirectUpload with the declared size, type and
+SHA-256, and signs those into a presigned PUT for `uploads/direct/<id>`,
+so the app servers never carry the body. Completing it checks what
+actually landed before it becomes a blob. The SHA-256 is the blob's
+identity, so an unchecked digest would let one client's bytes pass as
+another's. If the store kept a checksum for the object it is compared
+directly; otherwise (stores without checksum support) the object is read
+back once and hashed. Either way the object is pinned to the ETag that
+was checked, so a second PUT to the same URL can't swap the bytes before
+they're copied.
+"""
+from datetime import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import objectstore
+from .models import DirectUpload
+
+DIRECT_DIR = "uploads/direct"
+
+
+def object_key(upload: DirectUpload) -> str:
+    return f"{DIRECT_DIR}/{upload.id}"
+
+
+class UploadMismatch(Exception):
+    pass
+
+
+def verify(upload: DirectUpload) -> str:
+    """ETag of the uploaded object; raises UploadMismatch unless it's exactly what was declared.
+
+    May raise objectstore.ObjectChanged if the object is replaced meanwhile.
+    """
+    key = object_key(upload)
+    info = objectstore.head(key)
+    if info is None:
+        raise UploadMismatch("Nothing has been uploaded yet.")
+    if info.size != upload.size:
+        raise UploadMismatch(f"Uploaded {info.size} bytes, expected {upload.size}.")
+    sha256 = info.sha256 or objectstore.read_sha256(key, info.etag)
+    if sha256 != upload.sha256:
+        raise UploadMismatch("Uploaded bytes don't match the declared SHA-256.")
+    return info.etag
+
+
+def discard(upload: DirectUpload) -> None:
+    key = object_key(upload)  # delete() clears the pk the key is made from
+    upload.delete()
+    objectstore.delete(key)
+
+
+def expire_direct_uploads(now: Optional[datetime] = None) -> int:
+    """Delete direct uploads not completed within MEDIA_UPLOAD_SESSION_TTL, with any object they left."""
+    cutoff = (now or timezone.now()) - settings.MEDIA_UPLOAD_SESSION_TTL
+    removed = 0
+    for upload in DirectUpload.objects.filter(created_at__lt=cutoff):
+        discard(upload)
+        removed += 1
+    return removed
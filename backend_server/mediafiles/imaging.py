@@ -0,0 +1,78 @@
+"""Pillow rendering for image variants; runs inside the derivative worker's process pool.
+
+Nothing here touches Django or the database: it takes file paths in and
+hands plain dicts back, so it pickles cleanly and works with any
+multiprocessing start method.
+"""
+import os
+import uuid
+from typing import Dict, List
+
+from PIL import Image, ImageOps
+
+# Pillow format -> (file extension, content type)
+FORMATS = {
+    "WEBP": ("webp", "image/webp"),
+    "JPEG": ("jpg", "image/jpeg"),
+}
+SAVE_OPTIONS = {
+    "WEBP": {"quality": 80, "method": 4},
+    "JPEG": {"quality": 85, "optimize": True, "progressive": True},
+}
+
+# Errors that won't go away on retry: the upload isn't an image Pillow can decode.
+PERMANENT_ERRORS = (Image.UnidentifiedImageError, Image.DecompressionBombError)
+
+
+def render_variants(source: str, target_dir: str, variants: Dict[str, dict]) -> List[dict]:
+    """Write every variant of `source` into `target_dir`.
+
+    Returns one dict per variant with the file name (relative to
+    `target_dir`), dimensions, content type and byte size. Renders the
+    largest variant first and downsamples each smaller one from the previous
+    result instead of from the full-size original.
+    """
+    results = []
+    with Image.open(source) as original:
+        os.makedirs(target_dir, exist_ok=True)
+        largest = max(spec["size"] for spec in variants.values())
+        scale = largest / max(original.size)
+        if scale < 1:
+            # For JPEG sources this lets the decoder scale down by up to 8x while it
+            # reads the file, which is much cheaper than a full-size decode plus resize.
+            # Ask for the size the largest variant will actually have, not a square box,
+            # or the landscape/portrait short edge forces a bigger decode than needed.
+            original.draft("RGB", (round(original.width * scale), round(original.height * scale)))
+        # Always a copy, which the loop below shrinks in place.
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+
+        for name, spec in sorted(variants.items(), key=lambda item: -item[1]["size"]):
+            image.thumbnail((spec["size"], spec["size"]), Image.Resampling.LANCZOS)
+            results.append(save_variant(image, target_dir, name, spec["format"]))
+    return results
+
+
+def save_variant(image: Image.Image, target_dir: str, name: str, fmt: str) -> dict:
+    extension, content_type = FORMATS[fmt]
+    out = image.convert("RGB") if fmt == "JPEG" and image.mode != "RGB" else image
+    filename = f"{name}.{extension}"
+    path = os.path.join(target_dir, filename)
+    # Write then rename, so a reader never sees a half-written variant.
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        out.save(tmp, fmt, **SAVE_OPTIONS[fmt])
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return {
+        "name": name,
+        "filename": filename,
+        "width": out.width,
+        "height": out.height,
+        "content_type": content_type,
+        "size": os.path.getsize(path),
+    }
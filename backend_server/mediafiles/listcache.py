@@ -0,0 +1,85 @@
+"""Per-owner cache of `/api/media/list/` pages, invalidated by generation.
+
+Each owner has a generation number in the "media_list" cache. Page keys
+and ETags include it, so a write only has to bump one counter (`bump`,
+called from `usage.add`, which every upload and delete goes through) and
+every cached page and ETag of that owner is stale at once. Old pages are
+never looked up again and simply expire.
+
+A generation that's missing (first use, eviction, a cache restart) starts
+again from the current time in microseconds. That is larger than any
+value handed out before, so a client's old ETag can't match by accident.
+
+With object storage the listing holds presigned URLs, so pages and ETags
+also roll over every half MEDIA_PRESIGNED_URL_TTL. That way a cached or
+revalidated page never hands out URLs that have expired.
+"""
+import hashlib
+import time
+from typing import Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from . import objectstore
+
+CACHE_ALIAS = "media_list"
+
+
+def enabled() -> bool:
+    return settings.MEDIA_LIST_CACHE_TTL > 0
+
+
+def cache():
+    return caches[CACHE_ALIAS]
+
+
+def generation_key(owner_id: str) -> str:
+    return f"media-list-gen:{owner_id}"
+
+
+def generation(owner_id: str) -> int:
+    key = generation_key(owner_id)
+    value = cache().get(key)
+    if value is None:
+        # add(): if another request just started the generation, keep theirs.
+        cache().add(key, time.time_ns() // 1000, timeout=None)
+        value = cache().get(key)
+    return value
+
+
+def bump(owner_id: str) -> None:
+    """Invalidate every cached page of `owner_id`; takes effect when the current transaction commits."""
+    if enabled():
+        transaction.on_commit(lambda: bump_now(owner_id))
+
+
+def bump_now(owner_id: str) -> None:
+    try:
+        cache().incr(generation_key(owner_id))
+    except ValueError:
+        # No generation yet, or it was evicted: the next read starts a fresh (higher) one.
+        pass
+
+
+def url_epoch() -> str:
+    if not objectstore.enabled():
+        return ""
+    return str(int(time.time()) // max(settings.MEDIA_PRESIGNED_URL_TTL // 2, 1))
+
+
+def ttl() -> int:
+    if objectstore.enabled():
+        return min(settings.MEDIA_LIST_CACHE_TTL, max(settings.MEDIA_PRESIGNED_URL_TTL // 2, 1))
+    return settings.MEDIA_LIST_CACHE_TTL
+
+
+def page_key(request, owner_id: str) -> Tuple[str, str]:
+    """(cache key, unquoted ETag) for the page of `owner_id`'s files that `request` asks for."""
+    # Links and URLs in the page are absolute, so the host is part of what's cached.
+    query = "&".join(sorted(f"{k}={v}" for k, values in request.query_params.lists() for v in values))
+    digest = hashlib.blake2b(f"{request.scheme}://{request.get_host()}?{query}".encode(), digest_size=12).hexdigest()
+    epoch = url_epoch()
+    version = f"{generation(owner_id)}.{epoch}" if epoch else str(generation(owner_id))
+    return f"media-list:{owner_id}:{version}:{digest}", f"{version}-{digest}"
@@ -0,0 +1,12 @@
+from django.core.management import call_command
+
+from mediafiles import objectstore
+from worknomads_common.bootstrap import BootstrapCommand
+
+
+class Command(BootstrapCommand):
+    help = BootstrapCommand.help + " With object storage, also creates the bucket."
+
+    def service_steps(self) -> None:
+        if objectstore.enabled():
+            call_command("ensure_media_bucket", stdout=self.stdout)
@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from mediafiles.direct import expire_direct_uploads
+from mediafiles.sessions import expire_sessions
+from mediafiles.tombstones import claim, collect
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove deleted files' rows and stored bytes from the StorageTombstone queue, and expire abandoned "
+        "upload sessions and direct uploads (runs until stopped)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=settings.MEDIA_GC_BATCH_SIZE, help="Files removed per transaction.")
+        parser.add_argument("--poll", type=float, default=5.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument(
+            "--expire-every", type=float, default=300.0,
+            help="Seconds between runs of expire_upload_sessions' work (0 = never).",
+        )
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit.")
+
+    def handle(self, *args, **options):
+        removed = failed = 0
+        next_expiry = 0.0
+        while True:
+            close_old_connections()
+            if options["expire_every"] > 0 and time.monotonic() >= next_expiry:
+                self.expire_uploads()
+                next_expiry = time.monotonic() + options["expire_every"]
+            batch = claim(max(options["batch"], 1))
+            if not batch:
+                if options["once"]:
+                    break
+                time.sleep(options["poll"])
+                continue
+            done, errors = collect(batch)
+            removed += done
+            failed += errors
+        self.stdout.write(f"Removed {removed} file(s); {failed} attempt(s) failed.")
+
+    def expire_uploads(self) -> None:
+        # Storage errors are retried on the next run; they mustn't stop the collector.
+        try:
+            sessions, direct = expire_sessions(), expire_direct_uploads()
+        except Exception as exc:
+            self.stderr.write(f"Expiring uploads failed: {type(exc).__name__}: {exc}")
+            return
+        if sessions or direct:
+            self.stdout.write(f"Expired {sessions} upload session(s) and {direct} direct upload(s).")
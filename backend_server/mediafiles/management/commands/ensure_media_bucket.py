@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mediafiles import objectstore
+
+
+class Command(BaseCommand):
+    help = "Create the MEDIA_S3_BUCKET bucket if it doesn't exist yet (object storage only)."
+
+    def handle(self, *args, **options):
+        if not objectstore.enabled():
+            self.stdout.write("MEDIA_STORAGE_BACKEND isn't s3; nothing to do.")
+            return
+        created = objectstore.ensure_bucket()
+        self.stdout.write(f"{'Created' if created else 'Found'} bucket {settings.MEDIA_S3_BUCKET}.")
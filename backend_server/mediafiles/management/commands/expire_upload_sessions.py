@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from mediafiles.direct import expire_direct_uploads
+from mediafiles.sessions import expire_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete multi-part upload sessions idle longer than MEDIA_UPLOAD_SESSION_TTL, along with their parts, "
+        "and direct uploads not completed within it."
+    )
+
+    def handle(self, *args, **options):
+        removed = expire_sessions()
+        direct = expire_direct_uploads()
+        self.stdout.write(f"Expired {removed} upload session(s) and {direct} direct upload(s).")
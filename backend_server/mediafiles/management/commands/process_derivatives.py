@@ -0,0 +1,62 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from mediafiles.derivatives import claim_jobs, complete_job, fail_job, task
+from mediafiles.imaging import PERMANENT_ERRORS
+from mediafiles.waveform import WaveformUnavailable
+
+
+class Command(BaseCommand):
+    help = "Render image variants and audio waveforms from the DerivativeJob queue (runs until stopped)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=settings.MEDIA_DERIVATIVE_WORKERS, help="Render processes.")
+        parser.add_argument("--poll", type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit.")
+
+    def handle(self, *args, **options):
+        workers = max(options["workers"], 1)
+        # Don't hand open DB sockets to the forked render processes; they never use the DB.
+        connections.close_all()
+        done = failed = 0
+        in_flight = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                close_old_connections()
+                # Top up to one running plus one queued job per process, so none sits idle between batches.
+                free = workers * 2 - len(in_flight)
+                if free > 0:
+                    for job in claim_jobs(free):
+                        try:
+                            fn, fn_args = task(job)
+                        except Exception as exc:
+                            # Fetching the source from object storage failed; retry later.
+                            fail_job(job, exc)
+                            failed += 1
+                            continue
+                        in_flight[pool.submit(fn, *fn_args)] = job
+                if not in_flight:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll"])
+                    continue
+
+                finished, _ = wait(in_flight, timeout=options["poll"], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except (*PERMANENT_ERRORS, WaveformUnavailable) as exc:
+                        fail_job(job, exc, permanent=True)
+                        failed += 1
+                    except Exception as exc:
+                        fail_job(job, exc)
+                        failed += 1
+                    else:
+                        complete_job(job, result)
+                        done += 1
+        self.stdout.write(f"Processed {done} job(s); {failed} attempt(s) failed.")
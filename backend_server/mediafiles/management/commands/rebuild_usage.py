@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from mediafiles.usage import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute per-owner storage usage (OwnerUsage) from the MediaFile table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", help="Only rebuild this owner's totals.")
+
+    def handle(self, *args, **options):
+        rows = rebuild(options["owner"])
+        self.stdout.write(f"Rebuilt {rows} usage row(s).")
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from mediafiles.blobs import blob_storage
+from mediafiles.reconcile import missing, still_unreferenced, unreferenced
+
+
+class Command(BaseCommand):
+    help = (
+        "Report stored files no row references, and rows whose bytes are missing from storage. "
+        "Streams both sides, so memory stays flat however much is stored."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--delete", action="store_true", help="Delete the unreferenced files instead of only listing them.")
+        parser.add_argument(
+            "--min-age-hours", type=float, default=24.0, help="Leave files younger than this alone (uploads in flight)."
+        )
+
+    def handle(self, *args, **options):
+        min_age = timedelta(hours=options["min_age_hours"])
+        storage = blob_storage()
+        orphans = deleted = 0
+        for name in unreferenced(min_age):
+            orphans += 1
+            if options["delete"] and still_unreferenced(name, min_age):
+                storage.delete(name)
+                deleted += 1
+                self.stdout.write(f"deleted {name}")
+            else:
+                self.stdout.write(f"unreferenced {name}")
+        lost = 0
+        for row in missing():
+            lost += 1
+            self.stdout.write(f"missing {row.model} {row.pk} {row.name}")
+        self.stdout.write(f"{orphans} unreferenced file(s), {deleted} deleted; {lost} row(s) with missing bytes.")
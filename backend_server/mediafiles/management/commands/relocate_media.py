@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+from mediafiles.relocation import DEDUPLICATED, MISSING, MOVED, SKIPPED, legacy_files, relocate
+
+
+class Command(BaseCommand):
+    help = (
+        "Move files uploaded before dedup out of the per-day directories and into the sharded blob layout. "
+        "Resumable: run it again after an interruption and it carries on with the files still left."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Files moved per transaction.")
+        parser.add_argument("--limit", type=int, help="Stop after this many files.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many files are left to move.")
+
+    def handle(self, *args, **options):
+        left = legacy_files().aggregate(files=Count("pk"), bytes=Sum("size"))
+        self.stdout.write(f"{left['files']} file(s), {left['bytes'] or 0} bytes, in the legacy layout.")
+        if options["dry_run"]:
+            return
+        counts = {MOVED: 0, DEDUPLICATED: 0, MISSING: 0, SKIPPED: 0}
+        for n, result in enumerate(relocate(max(options["batch_size"], 1), options["limit"]), 1):
+            counts[result.outcome] += 1
+            if result.outcome == MISSING:
+                self.stderr.write(f"missing {result.pk} {result.old_name}")
+            if n % 1000 == 0:
+                self.stdout.write(f"{n} file(s) done")
+        self.stdout.write(
+            f"Moved {counts[MOVED]} file(s) into new blobs, {counts[DEDUPLICATED]} into existing ones; "
+            f"{counts[MISSING]} missing from storage, {counts[SKIPPED]} changed meanwhile."
+        )
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:30
+
+import mediafiles.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner_id', models.CharField(db_index=True, max_length=64)),
+                ('file', models.FileField(upload_to=mediafiles.models.upload_to)),
+                ('file_type', models.CharField(choices=[('image', 'Image'), ('audio', 'Audio')], max_length=10)),
+                ('original_filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(max_length=100)),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediafiles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mediafile',
+            index=models.Index(fields=['owner_id', '-created_at', '-id'], name='media_owner_created_idx'),
+        ),
+    ]
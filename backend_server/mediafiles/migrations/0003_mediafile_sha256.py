@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediafiles', '0002_owner_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
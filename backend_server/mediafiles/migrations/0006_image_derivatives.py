@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:48
+
+import django.db.models.deletion
+import django.utils.timezone
+import mediafiles.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediafiles', '0005_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DerivativeJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('blob', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='derivative_job', to='mediafiles.mediablob')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='derivjob_status_run_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32)),
+                ('file', models.FileField(upload_to=mediafiles.models.variant_upload_to)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('content_type', models.CharField(max_length=100)),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='mediafiles.mediablob')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('blob', 'name'), name='imagevariant_blob_name_uniq')],
+            },
+        ),
+    ]
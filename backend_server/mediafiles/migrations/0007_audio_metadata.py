@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediafiles', '0006_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='derivativejob',
+            name='kind',
+            field=models.CharField(choices=[('image', 'Image'), ('audio', 'Audio')], default='image', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='bitrate',
+            field=models.PositiveIntegerField(blank=True, help_text='Bits per second', null=True),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='channels',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='duration',
+            field=models.FloatField(blank=True, help_text='Seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='sample_rate',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
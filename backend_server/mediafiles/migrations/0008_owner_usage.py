@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:01
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill(apps, schema_editor):
+    MediaFile = apps.get_model("mediafiles", "MediaFile")
+    OwnerUsage = apps.get_model("mediafiles", "OwnerUsage")
+    totals = MediaFile.objects.values("owner_id", "file_type").annotate(total=Sum("size"), count=Count("id")).order_by()
+    OwnerUsage.objects.bulk_create(
+        [OwnerUsage(owner_id=t["owner_id"], file_type=t["file_type"], bytes_used=t["total"], file_count=t["count"]) for t in totals.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediafiles', '0007_audio_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnerUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner_id', models.CharField(max_length=64)),
+                ('file_type', models.CharField(choices=[('image', 'Image'), ('audio', 'Audio')], max_length=10)),
+                ('bytes_used', models.BigIntegerField(default=0)),
+                ('file_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('owner_id', 'file_type'), name='ownerusage_owner_type_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
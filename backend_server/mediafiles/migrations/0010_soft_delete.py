@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediafiles', '0009_direct_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='StorageTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('run_after', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('media_file', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='tombstone', to='mediafiles.mediafile')),
+            ],
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:47
+"""Indexes for the list API's filters and filename search (mediafiles.filters).
+
+The filename indexes depend on the database, so they're created with SQL:
+- PostgreSQL: (owner_id, UPPER(original_filename) text_pattern_ops) for
+  prefix search, and a pg_trgm GIN index on UPPER(original_filename) for
+  substring search (`icontains` compares UPPER(col::text), so the
+  expressions match). Both are built CONCURRENTLY. If pg_trgm can't be
+  installed, that one index is skipped and substring search scans the
+  owner's rows.
+- SQLite: (owner_id, original_filename COLLATE NOCASE), which SQLite uses
+  for case-insensitive LIKE 'prefix%'.
+- Others: (owner_id, original_filename); MySQL's default collations are
+  case-insensitive already.
+"""
+import logging
+
+from django.db import DatabaseError, migrations, models
+
+logger = logging.getLogger(__name__)
+
+PREFIX_INDEX = "media_owner_filename_prefix_idx"
+TRIGRAM_INDEX = "media_filename_trgm_idx"
+
+
+def create_filename_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    table = schema_editor.quote_name(apps.get_model("mediafiles", "MediaFile")._meta.db_table)
+    if vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {PREFIX_INDEX} "
+            f"ON {table} (owner_id, UPPER(original_filename::text) text_pattern_ops)"
+        )
+        try:
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError as exc:
+            logger.warning("pg_trgm is not available (%s); filename substring search won't be indexed.", exc)
+            return
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {TRIGRAM_INDEX} "
+            f"ON {table} USING gin (UPPER(original_filename::text) gin_trgm_ops)"
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {PREFIX_INDEX} ON {table} (owner_id, original_filename COLLATE NOCASE)")
+    else:
+        schema_editor.execute(f"CREATE INDEX {PREFIX_INDEX} ON {table} (owner_id, original_filename)")
+
+
+def drop_filename_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor in ("postgresql", "sqlite"):
+        for name in (TRIGRAM_INDEX, PREFIX_INDEX):
+            schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+    else:
+        table = schema_editor.quote_name(apps.get_model("mediafiles", "MediaFile")._meta.db_table)
+        schema_editor.execute(f"DROP INDEX {PREFIX_INDEX} ON {table}")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('mediafiles', '0010_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mediafile',
+            index=models.Index(fields=['owner_id', 'file_type', '-created_at', '-id'], name='media_owner_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mediafile',
+            index=models.Index(fields=['owner_id', 'content_type', '-created_at', '-id'], name='media_owner_ctype_created_idx'),
+        ),
+        migrations.RunPython(create_filename_indexes, drop_filename_indexes, elidable=False),
+    ]
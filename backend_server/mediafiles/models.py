@@ -1,14 +1,74 @@
+import os
+import re
+import uuid
+
 from django.db import models
 from django.utils import timezone
 
+SAFE_EXTENSION = re.compile(r"^\.[a-z0-9]{1,10}$")
+
 
 def upload_to(instance: "MediaFile", filename: str) -> str:
-    # Keep uploads under a type-based folder; keep the original filename.
+    """A random key sharded over 256 x 256 directories, keeping only the file's extension.
+
+    Unique by construction, so storage never has to search for a free name
+    (one `exists()` check, never a retry loop), and ten million files make
+    about 150 per directory. The client's filename is kept in
+    `original_filename`. Uploads normally go through the blob store instead
+    (`blob_upload_to`); files stored under the old per-day layout are moved
+    by `manage.py relocate_media`.
+    """
+    key = uuid.uuid4().hex
     subdir = "images" if instance.file_type == MediaFile.TYPE_IMAGE else "audio"
-    return f"{subdir}/{timezone.now().strftime('%Y/%m/%d')}/{filename}"
+    ext = os.path.splitext(filename)[1].lower()
+    return f"{subdir}/{key[:2]}/{key[2:4]}/{key}{ext if SAFE_EXTENSION.match(ext) else ''}"
+
+
+def blob_upload_to(instance: "MediaBlob", filename: str) -> str:
+    # Content-addressed: the name depends only on the bytes, never on the client's filename.
+    return f"blobs/{instance.sha256[:2]}/{instance.sha256[2:4]}/{instance.sha256}"
+
+
+def derivative_dir(sha256: str) -> str:
+    return f"derivatives/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def variant_upload_to(instance: "ImageVariant", filename: str) -> str:
+    # Next to the blob's other renditions, so they can all be removed with it.
+    return f"{derivative_dir(instance.blob.sha256)}/{filename}"
+
+
+class MediaBlob(models.Model):
+    """Stored bytes, shared by every MediaFile with the same SHA-256.
+
+    `ref_count` is the number of MediaFile rows pointing here; the physical
+    file is unlinked when the last one goes away.
+    """
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to=blob_upload_to)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.sha256} x{self.ref_count}"
+
+
+class LiveMediaFileManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
 
 
 class MediaFile(models.Model):
+    """An owner's file, backed by a shared MediaBlob (or, for old uploads, its own file).
+
+    Deleting one only sets `deleted_at`; the row and its bytes are removed
+    later through its StorageTombstone. `objects` sees live files only,
+    `all_objects` soft-deleted ones too.
+    """
+
     TYPE_IMAGE = "image"
     TYPE_AUDIO = "audio"
     TYPE_CHOICES = [
@@ -24,11 +84,219 @@ class MediaFile(models.Model):
     original_filename = models.CharField(max_length=255)
     content_type = models.CharField(max_length=100)
     size = models.PositiveIntegerField()
+    # Hex SHA-256 of the stored bytes, computed while the upload streams in.
+    sha256 = models.CharField(max_length=64, blank=True, default="")
+    # Shared content; null for files uploaded before dedup, which own their `file` outright.
+    blob = models.ForeignKey(MediaBlob, null=True, blank=True, on_delete=models.PROTECT, related_name="files")
+    # Audio only, read from the container headers at upload time; null when unknown.
+    duration = models.FloatField(null=True, blank=True, help_text="Seconds")
+    sample_rate = models.PositiveIntegerField(null=True, blank=True)
+    channels = models.PositiveSmallIntegerField(null=True, blank=True)
+    bitrate = models.PositiveIntegerField(null=True, blank=True, help_text="Bits per second")
 
     created_at = models.DateTimeField(auto_now_add=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = LiveMediaFileManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Serves the owner's listing and its (created_at, id) keyset cursor.
+            models.Index(fields=["owner_id", "-created_at", "-id"], name="media_owner_created_idx"),
+            # The same, narrowed by ?file_type= or ?content_type= (mediafiles.filters). The filename
+            # indexes are database-specific and created by migration 0011.
+            models.Index(fields=["owner_id", "file_type", "-created_at", "-id"], name="media_owner_type_created_idx"),
+            models.Index(fields=["owner_id", "content_type", "-created_at", "-id"], name="media_owner_ctype_created_idx"),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover
         return f"{self.file_type}:{self.original_filename} ({self.owner_id})"
+
+
+class ImageVariant(models.Model):
+    """A resized rendition of an image blob (see MEDIA_IMAGE_VARIANTS).
+
+    Variants hang off the blob rather than the MediaFile, so every upload of
+    the same bytes shares them.
+    """
+
+    blob = models.ForeignKey(MediaBlob, on_delete=models.CASCADE, related_name="variants")
+    name = models.CharField(max_length=32)
+    file = models.FileField(upload_to=variant_upload_to)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveIntegerField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["blob", "name"], name="imagevariant_blob_name_uniq"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.name} {self.width}x{self.height} of {self.blob_id}"
+
+
+class DerivativeJob(models.Model):
+    """Queue row asking the derivative worker to process one blob.
+
+    Images get their resized variants (ImageVariant rows); audio gets a
+    waveform peaks file next to the blob's other derivatives.
+
+    Workers claim a job by flipping it from pending to running with a
+    conditional UPDATE, so several `process_derivatives` processes can share
+    the table without a broker.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    blob = models.OneToOneField(MediaBlob, on_delete=models.CASCADE, related_name="derivative_job")
+    kind = models.CharField(max_length=10, choices=MediaFile.TYPE_CHOICES, default=MediaFile.TYPE_IMAGE)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    # Not picked up before this time; pushed back after a failed attempt.
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="derivjob_status_run_idx"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"derivatives of {self.blob_id} ({self.status})"
+
+
+class StorageTombstone(models.Model):
+    """Queue row for a soft-deleted MediaFile whose row and bytes are still to be removed.
+
+    Written in the delete request's transaction; `manage.py collect_garbage`
+    claims rows the same way the derivative worker does, drops the file's
+    blob reference (unlinking the bytes with the last one) and deletes the
+    row, which takes the tombstone with it. A failed attempt is retried
+    with a growing delay.
+    """
+
+    media_file = models.OneToOneField(MediaFile, on_delete=models.CASCADE, related_name="tombstone")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    # Not picked up before this time; pushed back after a failed attempt.
+    run_after = models.DateTimeField(default=timezone.now, db_index=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"tombstone for {self.media_file_id} (attempt {self.attempts})"
+
+
+class OwnerUsage(models.Model):
+    """Running totals of an owner's files per type, kept in step with MediaFile.
+
+    Updated in the same transaction as each upload and delete, so reading
+    an owner's usage (and checking their quota) is an index lookup instead
+    of a SUM over all their files. `manage.py rebuild_usage` recomputes it
+    from MediaFile if it ever drifts.
+    """
+
+    owner_id = models.CharField(max_length=64)
+    file_type = models.CharField(max_length=10, choices=MediaFile.TYPE_CHOICES)
+    # Logical bytes: a file shared through a deduplicated blob counts for every owner who uploaded it.
+    bytes_used = models.BigIntegerField(default=0)
+    file_count = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner_id", "file_type"], name="ownerusage_owner_type_uniq"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.owner_id} {self.file_type}: {self.file_count} files, {self.bytes_used} bytes"
+
+
+class UploadSession(models.Model):
+    """A resumable multi-part upload that hasn't been completed yet.
+
+    Parts are kept as separate files under `uploads/sessions/<id>/` so they can
+    arrive concurrently and in any order; `complete` stitches them into a
+    single MediaFile.
+    """
+
+    STATUS_OPEN = "open"
+    STATUS_COMPLETING = "completing"
+    STATUS_CHOICES = [
+        (STATUS_OPEN, "Open"),
+        (STATUS_COMPLETING, "Completing"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner_id = models.CharField(max_length=64, db_index=True)
+    file_type = models.CharField(max_length=10, choices=MediaFile.TYPE_CHOICES)
+    original_filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=STATUS_OPEN)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by every part upload; stale sessions are garbage-collected on this.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"session {self.id} ({self.owner_id}, {self.status})"
+
+
+class UploadPart(models.Model):
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name="parts")
+    number = models.PositiveIntegerField()
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64)
+
+    created_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["number"]
+        constraints = [
+            models.UniqueConstraint(fields=["session", "number"], name="uploadpart_session_number_uniq"),
+        ]
+
+
+class DirectUpload(models.Model):
+    """A presigned PUT handed to a client, waiting for it to report back.
+
+    The client uploads straight to object storage under
+    `uploads/direct/<id>` with the size, type and SHA-256 declared here
+    signed into the URL. Completing it checks the object against those and
+    moves it to its blob name.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner_id = models.CharField(max_length=64, db_index=True)
+    file_type = models.CharField(max_length=10, choices=MediaFile.TYPE_CHOICES)
+    original_filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64)
+
+    # Uploads never completed are garbage-collected on this.
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"direct upload {self.id} ({self.owner_id}, {self.size} bytes)"
@@ -0,0 +1,157 @@
+"""S3-compatible object store operations that Django's Storage API doesn't cover.
+
+The storage backend (django-storages' S3Storage, set up in settings when
+MEDIA_STORAGE_BACKEND=s3) handles saving, opening and deleting. This
+module adds what lets file bytes skip the app servers:
+- presigned GET URLs for downloads;
+- presigned PUT URLs for direct uploads, with the length, content type and
+  SHA-256 signed in, so the store itself rejects any other body;
+- HEAD, and a server-side COPY (pinned to an ETag) to move a direct
+  upload to its content-addressed name.
+
+Presigned URLs are signed for MEDIA_S3_PUBLIC_ENDPOINT_URL, the host
+clients can reach, which may differ from the one the backend talks to.
+"""
+import base64
+import binascii
+import hashlib
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.utils.http import content_disposition_header
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ObjectInfo(NamedTuple):
+    size: int
+    content_type: str
+    # Hex SHA-256 if the store kept a checksum for the object, else "".
+    sha256: str
+    etag: str
+
+
+class ObjectChanged(Exception):
+    """The object was replaced since it was looked at (an `If-Match` failed)."""
+
+
+def error_code(exc) -> str:
+    return exc.response.get("Error", {}).get("Code", "")
+
+
+def enabled() -> bool:
+    return settings.MEDIA_STORAGE_BACKEND == "s3"
+
+
+@lru_cache(maxsize=None)
+def client_for(endpoint_url: str):
+    # boto3 is only needed with MEDIA_STORAGE_BACKEND=s3.
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint_url or None,
+        region_name=settings.MEDIA_S3_REGION,
+        aws_access_key_id=settings.MEDIA_S3_ACCESS_KEY_ID or None,
+        aws_secret_access_key=settings.MEDIA_S3_SECRET_ACCESS_KEY or None,
+        config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+    )
+
+
+def client():
+    return client_for(settings.MEDIA_S3_ENDPOINT_URL)
+
+
+def public_client():
+    return client_for(settings.MEDIA_S3_PUBLIC_ENDPOINT_URL)
+
+
+def presigned_get(key: str, *, filename: str = "", content_type: str = "") -> str:
+    params = {"Bucket": settings.MEDIA_S3_BUCKET, "Key": key}
+    if content_type:
+        params["ResponseContentType"] = content_type
+    if filename:
+        params["ResponseContentDisposition"] = content_disposition_header(False, filename)
+    return public_client().generate_presigned_url("get_object", Params=params, ExpiresIn=settings.MEDIA_PRESIGNED_URL_TTL)
+
+
+def presigned_put(key: str, *, content_type: str, size: int, sha256: str) -> Tuple[str, dict]:
+    """(url, headers) for a single PUT of exactly these bytes; the client must send the headers as given."""
+    checksum = base64.b64encode(binascii.unhexlify(sha256)).decode()
+    url = public_client().generate_presigned_url(
+        "put_object",
+        Params={
+            "Bucket": settings.MEDIA_S3_BUCKET,
+            "Key": key,
+            "ContentType": content_type,
+            "ContentLength": size,
+            "ChecksumSHA256": checksum,
+        },
+        ExpiresIn=settings.MEDIA_PRESIGNED_URL_TTL,
+    )
+    return url, {"Content-Type": content_type, "x-amz-checksum-sha256": checksum}
+
+
+def head(key: str) -> Optional[ObjectInfo]:
+    from botocore.exceptions import ClientError
+
+    try:
+        meta = client().head_object(Bucket=settings.MEDIA_S3_BUCKET, Key=key, ChecksumMode="ENABLED")
+    except ClientError as exc:
+        if error_code(exc) in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    checksum = meta.get("ChecksumSHA256") or ""
+    # Multipart uploads report a checksum of part checksums ("...-N"), which isn't the file's digest.
+    sha256 = base64.b64decode(checksum).hex() if checksum and "-" not in checksum else ""
+    return ObjectInfo(meta["ContentLength"], meta.get("ContentType", ""), sha256, meta.get("ETag", ""))
+
+
+def read_sha256(key: str, etag: str) -> str:
+    """Hash an object by reading it through. Only for stores that don't keep checksums."""
+    from botocore.exceptions import ClientError
+
+    try:
+        body = client().get_object(Bucket=settings.MEDIA_S3_BUCKET, Key=key, IfMatch=etag)["Body"]
+    except ClientError as exc:
+        if error_code(exc) in ("412", "PreconditionFailed"):
+            raise ObjectChanged(key) from exc
+        raise
+    hasher = hashlib.sha256()
+    for chunk in iter(lambda: body.read(CHUNK_SIZE), b""):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def copy(source: str, target: str, *, etag: str) -> None:
+    """Server-side copy within the bucket, of the `etag` version of `source` only; the bytes never leave the store."""
+    from botocore.exceptions import ClientError
+
+    bucket = settings.MEDIA_S3_BUCKET
+    try:
+        client().copy_object(Bucket=bucket, Key=target, CopySource={"Bucket": bucket, "Key": source}, CopySourceIfMatch=etag)
+    except ClientError as exc:
+        if error_code(exc) in ("412", "PreconditionFailed"):
+            raise ObjectChanged(source) from exc
+        raise
+
+
+def delete(key: str) -> None:
+    client().delete_object(Bucket=settings.MEDIA_S3_BUCKET, Key=key)
+
+
+def ensure_bucket() -> bool:
+    """Create MEDIA_S3_BUCKET if it doesn't exist; returns True if it was created."""
+    from botocore.exceptions import ClientError
+
+    try:
+        client().head_bucket(Bucket=settings.MEDIA_S3_BUCKET)
+        return False
+    except ClientError:
+        options = {}
+        if settings.MEDIA_S3_REGION != "us-east-1":
+            options["CreateBucketConfiguration"] = {"LocationConstraint": settings.MEDIA_S3_REGION}
+        client().create_bucket(Bucket=settings.MEDIA_S3_BUCKET, **options)
+        return True
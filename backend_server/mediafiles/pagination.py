@@ -0,0 +1,118 @@
+import base64
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CreatedAtKeysetPagination(BasePagination):
+    """Keyset pagination over (created_at, id), newest first.
+
+    The cursor is the (created_at, id) of the last row on the page, so the next
+    page is a plain range read on the (owner_id, -created_at, -id) index no
+    matter how deep the client has scrolled. No COUNT(*) and no OFFSET.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 50
+    max_page_size = 500
+    ordering = ("-created_at", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        window = self.page_window(queryset, request)
+        return self.set_page(list(window))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Same as `paginate_queryset`, fetching the rows with async iteration."""
+        window = self.page_window(queryset, request)
+        return self.set_page([obj async for obj in window])
+
+    def page_window(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            created_at, pk = position
+            # Equivalent to (created_at, id) < (c, pk); the leading range keeps it an index seek.
+            queryset = queryset.filter(created_at__lte=created_at).filter(Q(created_at__lt=created_at) | Q(id__lt=pk))
+
+        # Fetch one extra row to learn whether there is a next page.
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def decode_cursor(self, request) -> Optional[Tuple[datetime, int]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii")
+            stamp, pk = raw.rsplit("|", 1)
+            created_at = parse_datetime(stamp)
+            if created_at is None:
+                raise ValueError(stamp)
+            return created_at, int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound("Invalid cursor.")
+
+    def encode_cursor(self, obj) -> str:
+        raw = f"{obj.created_at.isoformat()}|{obj.pk}"
+        return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii")
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([("next", self.get_next_link()), ("results", data)]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Opaque cursor taken from the previous page's `next` link.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Number of results per page (max {self.max_page_size}).",
+                "schema": {"type": "integer"},
+            },
+        ]
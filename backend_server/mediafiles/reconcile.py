@@ -0,0 +1,104 @@
+"""Find where storage and the database disagree, in bounded memory.
+
+Neither side is ever loaded whole:
+- `unreferenced()` walks storage one directory at a time and looks that
+  directory's names up in chunks. It yields files no row points at: blobs
+  without a MediaBlob, derivatives of blobs that are gone (or variants no
+  longer rendered), and pre-blob uploads without a MediaFile.
+- `missing()` streams MediaBlob, ImageVariant and pre-blob MediaFile rows
+  in chunks and yields those whose bytes aren't in storage.
+
+Scratch areas (upload staging, session parts, direct uploads, derivative
+scratch) are skipped, since their own expiry cleans them up. So are files
+younger than `min_age`: an upload puts its bytes in place just before it
+commits the row that references them.
+"""
+from datetime import timedelta
+from typing import Iterator, List, NamedTuple, Set, Tuple
+
+from django.utils import timezone
+
+from .blobs import STAGING_DIR, blob_storage, stored
+from .derivatives import SCRATCH_DIR, WAVEFORM_NAME
+from .direct import DIRECT_DIR
+from .models import ImageVariant, MediaBlob, MediaFile
+from .sessions import SESSION_DIR
+
+SKIP_DIRS = (STAGING_DIR, SESSION_DIR, DIRECT_DIR, SCRATCH_DIR)
+CHUNK_SIZE = 1000
+
+
+class Missing(NamedTuple):
+    model: str
+    pk: int
+    name: str
+
+
+def walk(storage, path: str = "") -> Iterator[Tuple[str, List[str]]]:
+    """(directory, file names) for every directory under `path`, depth first, one listing at a time."""
+    dirs, files = storage.listdir(path)
+    yield path, sorted(files)
+    for name in sorted(dirs):
+        child = f"{path}/{name}" if path else name
+        if child not in SKIP_DIRS:
+            yield from walk(storage, child)
+
+
+def chunks(items: List[str]) -> Iterator[List[str]]:
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start : start + CHUNK_SIZE]
+
+
+def referenced(directory: str, names: List[str]) -> Set[str]:
+    """The subset of `names` (full storage names, all in `directory`) some row points at."""
+    found = set()
+    parts = directory.split("/")
+    for chunk in chunks(names):
+        if parts[0] == "blobs":
+            shas = {name.rsplit("/", 1)[1]: name for name in chunk}
+            found.update(shas[sha] for sha in MediaBlob.objects.filter(sha256__in=shas).values_list("sha256", flat=True))
+        elif parts[0] == "derivatives" and len(parts) == 4:
+            # derivatives/ab/cd/<sha>/<file>
+            sha = parts[3]
+            if WAVEFORM_NAME in {name.rsplit("/", 1)[1] for name in chunk} and MediaBlob.objects.filter(sha256=sha).exists():
+                found.add(f"{directory}/{WAVEFORM_NAME}")
+            found.update(ImageVariant.objects.filter(blob__sha256=sha, file__in=chunk).values_list("file", flat=True))
+        else:
+            found.update(MediaFile.all_objects.filter(file__in=chunk).values_list("file", flat=True))
+    return found
+
+
+def unreferenced(min_age: timedelta) -> Iterator[str]:
+    storage = blob_storage()
+    cutoff = timezone.now() - min_age
+    for directory, files in walk(storage):
+        names = [f"{directory}/{name}" if directory else name for name in files]
+        keep = referenced(directory, names)
+        for name in names:
+            if name not in keep and storage.get_modified_time(name) < cutoff:
+                yield name
+
+
+def missing() -> Iterator[Missing]:
+    storage = blob_storage()
+    sources = (
+        (MediaBlob.objects.all(), "blob"),
+        (ImageVariant.objects.all(), "variant"),
+        (MediaFile.all_objects.filter(blob__isnull=True), "file"),
+    )
+    for queryset, label in sources:
+        for row in queryset.only("id", "file").order_by("pk").iterator(chunk_size=CHUNK_SIZE):
+            # Re-check the row: the garbage collector may have removed both since the chunk was read.
+            if not stored(storage, row.file.name) and queryset.filter(pk=row.pk).exists():
+                yield Missing(label, row.pk, row.file.name)
+
+
+def still_unreferenced(name: str, min_age: timedelta) -> bool:
+    """Re-check one name right before deleting it; an upload may have claimed it since the walk."""
+    storage = blob_storage()
+    directory = name.rsplit("/", 1)[0] if "/" in name else ""
+    return (
+        not referenced(directory, [name])
+        and stored(storage, name)
+        and storage.get_modified_time(name) < timezone.now() - min_age
+    )
@@ -0,0 +1,122 @@
+"""Moving pre-blob uploads into the content-addressed blob layout.
+
+Files uploaded before dedup sit where the old `upload_to` put them:
+`images|audio/YYYY/MM/DD/<client's filename>`. That is one flat directory
+per day, and each file owns its bytes. `relocate()` turns each of them into
+a reference to the MediaBlob for its SHA-256. Its bytes move to
+`blobs/ab/cd/<sha256>` (65,536 directories, names unique by construction),
+or are dropped if another file already has the same bytes. The row's
+`original_filename` is unchanged; it was only ever metadata.
+
+Rows are taken in primary-key order, a batch at a time, and each batch is
+one transaction holding only its rows' locks. A relocated row has a blob,
+so it no longer matches `legacy_files()`: an interrupted run simply
+starts again where it stopped. Old files are deleted once their batch
+commits. If the process dies in between, `reconcile_storage` reports the
+leftovers as unreferenced.
+"""
+import hashlib
+import os
+import uuid
+from typing import Iterator, List, NamedTuple, Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+from . import objectstore
+from .blobs import blob_storage, is_local, stored, take_blob
+from .derivatives import enqueue as enqueue_derivatives
+from .models import MediaFile
+
+MOVED = "moved"
+DEDUPLICATED = "deduplicated"
+MISSING = "missing"
+SKIPPED = "skipped"
+
+
+class Relocated(NamedTuple):
+    pk: int
+    old_name: str
+    new_name: str
+    outcome: str
+
+
+def legacy_files() -> QuerySet:
+    """Live files that still own their bytes. Soft-deleted ones are left to the garbage collector."""
+    return MediaFile.objects.filter(blob__isnull=True).exclude(file="")
+
+
+def relocate(batch_size: int = 100, limit: Optional[int] = None) -> Iterator[Relocated]:
+    """Relocate legacy files in primary-key order, one transaction per batch, yielding one result per row."""
+    last = 0
+    done = 0
+    while limit is None or done < limit:
+        size = batch_size if limit is None else min(batch_size, limit - done)
+        pks = list(legacy_files().filter(pk__gt=last).order_by("pk").values_list("pk", flat=True)[:size])
+        if not pks:
+            return
+        yield from relocate_batch(pks)
+        last = pks[-1]
+        done += len(pks)
+
+
+def relocate_batch(pks: List[int]) -> List[Relocated]:
+    storage = blob_storage()
+    results = []
+    with transaction.atomic():
+        rows = {row.pk: row for row in legacy_files().select_for_update().filter(pk__in=pks).order_by("pk")}
+        for pk in pks:
+            row = rows.get(pk)
+            if row is None:
+                # Deleted, or relocated by another run, since the batch was read.
+                results.append(Relocated(pk, "", "", SKIPPED))
+            else:
+                results.append(relocate_row(storage, row))
+    return results
+
+
+def relocate_row(storage, row: MediaFile) -> Relocated:
+    """Point `row` at the blob for its bytes. Call inside the batch's transaction."""
+    old_name = row.file.name
+    if not stored(storage, old_name):
+        return Relocated(row.pk, old_name, "", MISSING)
+    sha256 = row.sha256 or file_sha256(storage, old_name)
+    placed = []
+
+    def place(name: str) -> None:
+        copy_within(storage, old_name, name)
+        placed.append(name)
+
+    # The old file is only deleted after commit, so there's nothing to drop here.
+    blob = take_blob(sha256, row.size, place=place, drop=lambda: None)
+    enqueue_derivatives(blob, row.file_type)
+    MediaFile.all_objects.filter(pk=row.pk).update(blob=blob, file=blob.file.name, sha256=sha256)
+    transaction.on_commit(lambda: storage.delete(old_name))
+    return Relocated(row.pk, old_name, blob.file.name, MOVED if placed else DEDUPLICATED)
+
+
+def file_sha256(storage, name: str) -> str:
+    digest = hashlib.sha256()
+    with storage.open(name, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_within(storage, source: str, target: str) -> None:
+    """Give `target` the bytes of `source`, leaving `source` in place until the row commits."""
+    if not is_local(storage):
+        info = objectstore.head(source)
+        objectstore.copy(source, target, etag=info.etag)
+        return
+    path = storage.path(target)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A hard link costs no copying; the temporary name makes replacing an existing target atomic.
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.link(storage.path(source), tmp)
+    except OSError:
+        with storage.open(source, "rb") as src, open(tmp, "wb") as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                dst.write(chunk)
+    os.replace(tmp, path)
@@ -1,5 +1,8 @@
+from typing import Iterable, List, Optional
+from django.conf import settings
 from rest_framework import serializers
-from .models import MediaFile
+from . import objectstore
+from .models import MediaFile, UploadPart, UploadSession
 
 
 class FileUploadSerializer(serializers.Serializer):
@@ -8,8 +11,19 @@ class FileUploadSerializer(serializers.Serializer):
 
 
 class MediaFileSerializer(serializers.ModelSerializer):
+    """Media file row as returned by the API.
+
+    Pass `fields=[...]` to emit only a subset of the declared fields; unknown
+    names are ignored. `model_columns()` tells the view which DB columns that
+    subset needs so it can `.only()` the queryset. With a `variant` in the
+    context, `url` points at that rendition when one has been rendered.
+    """
+
     url = serializers.SerializerMethodField()
 
+    # Serializer fields that read something other than the column of the same name.
+    COLUMN_SOURCES = {"url": "file"}
+
     class Meta:
         model = MediaFile
         fields = [
@@ -18,12 +32,139 @@ class MediaFileSerializer(serializers.ModelSerializer):
             "original_filename",
             "content_type",
             "size",
+            "sha256",
+            "duration",
+            "sample_rate",
+            "channels",
+            "bitrate",
             "created_at",
             "url",
         ]
 
+    def __init__(self, *args, fields: Optional[Iterable[str]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            keep = set(fields)
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+    @classmethod
+    def parse_fields(cls, raw: Optional[str]) -> Optional[List[str]]:
+        """Turn a `?fields=a,b` value into a list of known field names (or None for all)."""
+        if not raw:
+            return None
+        wanted = [f.strip() for f in raw.split(",") if f.strip()]
+        known = [f for f in wanted if f in cls.Meta.fields]
+        return known or None
+
+    @classmethod
+    def model_columns(cls, fields: Iterable[str]) -> List[str]:
+        return sorted({cls.COLUMN_SOURCES.get(f, f) for f in fields})
+
     def get_url(self, obj: MediaFile) -> str:
+        stored = obj.file
+        variant = self.context.get("variant")
+        if variant and obj.blob_id is not None:
+            # Filtered in Python so a prefetched `blob__variants` is reused as-is.
+            rendition = next((v for v in obj.blob.variants.all() if v.name == variant), None)
+            if rendition is not None:
+                stored = rendition.file
+        if objectstore.enabled():
+            # Signed for the endpoint clients can reach, not the one the backend uses.
+            return objectstore.presigned_get(stored.name)
         request = self.context.get("request")
         if request:
-            return request.build_absolute_uri(obj.file.url)
-        return obj.file.url
+            return request.build_absolute_uri(stored.url)
+        return stored.url
+
+
+class MediaListFilterSerializer(serializers.Serializer):
+    """Query parameters that narrow `/api/media/list/`; all optional, combined with AND (see `filters`)."""
+
+    file_type = serializers.ChoiceField(choices=MediaFile.TYPE_CHOICES, required=False)
+    content_type = serializers.CharField(
+        max_length=1000, required=False, help_text="Exact content type, e.g. `image/png`; comma-separate several"
+    )
+    created_after = serializers.DateTimeField(required=False, help_text="Uploaded at or after (ISO 8601)")
+    created_before = serializers.DateTimeField(required=False, help_text="Uploaded before (ISO 8601)")
+    min_size = serializers.IntegerField(min_value=0, required=False, help_text="Bytes, inclusive")
+    max_size = serializers.IntegerField(min_value=0, required=False, help_text="Bytes, inclusive")
+    filename = serializers.CharField(max_length=255, required=False, help_text="Filename starts with this (any case)")
+    search = serializers.CharField(max_length=255, required=False, help_text="Filename contains this (any case)")
+
+    def validate_content_type(self, value: str) -> List[str]:
+        types = [t.strip() for t in value.split(",") if t.strip()]
+        if len(types) > 20:
+            raise serializers.ValidationError("At most 20 content types.")
+        return types
+
+    def validate(self, attrs):
+        if attrs.get("min_size") is not None and attrs.get("max_size") is not None and attrs["min_size"] > attrs["max_size"]:
+            raise serializers.ValidationError({"max_size": "Must not be less than min_size."})
+        after, before = attrs.get("created_after"), attrs.get("created_before")
+        if after is not None and before is not None and after >= before:
+            raise serializers.ValidationError({"created_before": "Must be later than created_after."})
+        return attrs
+
+
+class BatchUploadResultSerializer(serializers.Serializer):
+    index = serializers.IntegerField()
+    filename = serializers.CharField()
+    status = serializers.IntegerField(help_text="201 if stored, otherwise the error status for this file")
+    file = MediaFileSerializer(required=False)
+    detail = serializers.CharField(required=False)
+
+
+class BatchDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=settings.MEDIA_BATCH_MAX_DELETE
+    )
+
+
+class BatchDeleteResultSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.IntegerField(help_text="204 if deleted, 404 if there's no such file of yours")
+
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.CharField(max_length=100)
+
+
+class DirectUploadCreateSerializer(serializers.Serializer):
+    filename = serializers.CharField(max_length=255)
+    content_type = serializers.CharField(max_length=100)
+    size = serializers.IntegerField(min_value=1)
+    sha256 = serializers.RegexField(r"^[0-9a-f]{64}$", help_text="Hex SHA-256 of the file, lowercase")
+
+
+class DirectUploadTicketSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    method = serializers.CharField()
+    url = serializers.URLField()
+    headers = serializers.DictField(child=serializers.CharField(), help_text="Send exactly these with the PUT")
+    expires_in = serializers.IntegerField(help_text="Seconds the URL stays valid")
+
+
+class UploadPartSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadPart
+        fields = ["number", "size", "sha256"]
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    parts = UploadPartSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            "id",
+            "file_type",
+            "original_filename",
+            "content_type",
+            "status",
+            "created_at",
+            "updated_at",
+            "parts",
+        ]
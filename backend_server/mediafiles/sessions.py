@@ -0,0 +1,102 @@
+"""Part storage for resumable multi-part uploads.
+
+Each part is streamed to its own file under `uploads/sessions/<id>/` in
+local staging storage, so concurrent PUTs never touch the same file.
+Completing a session reads the parts back in order and writes them out
+once, hashing as it goes, to a blob staging name that `commit_blob()` then
+takes over.
+"""
+import hashlib
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .blobs import staging_name, staging_storage
+from .models import UploadPart, UploadSession
+
+SESSION_DIR = "uploads/sessions"
+CHUNK_SIZE = 256 * 1024
+
+
+class PartTooLarge(Exception):
+    pass
+
+
+def session_dir(session_id) -> str:
+    return f"{SESSION_DIR}/{session_id}"
+
+
+def part_name(session_id, number: int) -> str:
+    return f"{session_dir(session_id)}/{number:05d}"
+
+
+def write_part(stream, session_id, number: int, max_size: int) -> Tuple[int, str]:
+    """Stream a request body into the part file; returns (size, sha256).
+
+    The body goes to a private temp name first and is renamed over the part,
+    so a retried PUT racing the original can't interleave bytes.
+    """
+    storage = staging_storage()
+    target = storage.path(part_name(session_id, number))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp, "wb") as out:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > max_size:
+                    raise PartTooLarge()
+                hasher.update(chunk)
+                out.write(chunk)
+        os.replace(tmp, target)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return size, hasher.hexdigest()
+
+
+def assemble(session: UploadSession, parts: Iterable[UploadPart]) -> Tuple[str, int, str]:
+    """Concatenate the parts into a fresh blob staging file; returns (name, size, sha256)."""
+    storage = staging_storage()
+    name = staging_name()
+    target = storage.path(name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(target, "wb") as out:
+            for part in parts:
+                with open(storage.path(part_name(session.pk, part.number)), "rb") as src:
+                    for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                        size += len(chunk)
+                        hasher.update(chunk)
+                        out.write(chunk)
+    except BaseException:
+        storage.delete(name)
+        raise
+    return name, size, hasher.hexdigest()
+
+
+def remove_session_files(session_id) -> None:
+    shutil.rmtree(staging_storage().path(session_dir(session_id)), ignore_errors=True)
+
+
+def expire_sessions(now: Optional[datetime] = None) -> int:
+    """Delete sessions idle for longer than MEDIA_UPLOAD_SESSION_TTL, with their parts."""
+    cutoff = (now or timezone.now()) - settings.MEDIA_UPLOAD_SESSION_TTL
+    removed = 0
+    stale = list(UploadSession.objects.filter(updated_at__lt=cutoff).values_list("pk", flat=True))
+    for session_id in stale:
+        # Re-check the cutoff: a part may have landed since the scan started.
+        if UploadSession.objects.filter(pk=session_id, updated_at__lt=cutoff).delete()[0]:
+            remove_session_files(session_id)
+            removed += 1
+    return removed
@@ -0,0 +1,53 @@
+"""A local S3 stand-in (moto's server, from requirements-dev.txt), shared by the tests and benchmarks/direct_upload.py."""
+import logging
+import socket
+from typing import Optional
+
+S3_OPTIONS = {
+    "signature_version": "s3v4",
+    "addressing_style": "path",
+    "file_overwrite": True,
+    "default_acl": None,
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StandInS3:
+    def __init__(self, port: Optional[int] = None):
+        from moto.server import ThreadedMotoServer
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        port = port or free_port()
+        self.server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+        self.server.start()
+        self.endpoint = f"http://127.0.0.1:{port}"
+
+    def settings(self, bucket: str) -> dict:
+        """Settings that point the backend at this server, as MEDIA_STORAGE_BACKEND=s3 would."""
+        return {
+            "MEDIA_STORAGE_BACKEND": "s3",
+            "MEDIA_S3_BUCKET": bucket,
+            "MEDIA_S3_ENDPOINT_URL": self.endpoint,
+            "MEDIA_S3_PUBLIC_ENDPOINT_URL": self.endpoint,
+            "MEDIA_S3_ACCESS_KEY_ID": "stand-in",
+            "MEDIA_S3_SECRET_ACCESS_KEY": "stand-in",
+        }
+
+    def storages(self, base: dict, bucket: str) -> dict:
+        options = {
+            **S3_OPTIONS,
+            "bucket_name": bucket,
+            "endpoint_url": self.endpoint,
+            "region_name": "us-east-1",
+            "access_key": "stand-in",
+            "secret_key": "stand-in",
+        }
+        return {**base, "default": {"BACKEND": "storages.backends.s3.S3Storage", "OPTIONS": options}}
+
+    def stop(self) -> None:
+        self.server.stop()
@@ -0,0 +1,61 @@
+import hashlib
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from mediafiles import blobs
+from mediafiles.blobs import blob_storage, commit_blob, release_blob, staging_name, staging_storage, stored
+from mediafiles.models import MediaBlob
+
+BODY = b"the same bytes"
+
+
+class ReleaseBlobTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        patcher = override_settings(MEDIA_ROOT=media_root.name)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.blob = self.upload()
+
+    def upload(self) -> MediaBlob:
+        staging = staging_storage().save(staging_name(), ContentFile(BODY))
+        with transaction.atomic():
+            return commit_blob(staging, hashlib.sha256(BODY).hexdigest(), len(BODY))
+
+    def test_bytes_are_unlinked_after_the_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(release_blob(self.blob.pk))
+            self.assertTrue(stored(blob_storage(), self.blob.file.name))
+        self.assertFalse(stored(blob_storage(), self.blob.file.name))
+
+    def test_failed_unlink_is_logged_and_leaves_an_orphan(self):
+        with mock.patch.object(blobs, "unlink_blob", side_effect=OSError("storage unavailable")):
+            with self.assertLogs(level="ERROR"), self.captureOnCommitCallbacks(execute=True):
+                release_blob(self.blob.pk)
+        self.assertFalse(MediaBlob.objects.filter(pk=self.blob.pk).exists())
+        self.assertTrue(stored(blob_storage(), self.blob.file.name))
+
+    def test_rollback_keeps_the_bytes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    release_blob(self.blob.pk)
+                    raise RuntimeError("caller failed")
+            except RuntimeError:
+                pass
+        self.assertTrue(MediaBlob.objects.filter(pk=self.blob.pk).exists())
+        self.assertTrue(stored(blob_storage(), self.blob.file.name))
+
+    def test_upload_puts_back_bytes_a_late_unlink_removed(self):
+        blob_storage().delete(self.blob.file.name)
+
+        again = self.upload()
+
+        self.assertEqual(again.pk, self.blob.pk)
+        with blob_storage().open(again.file.name, "rb") as f:
+            self.assertEqual(f.read(), BODY)
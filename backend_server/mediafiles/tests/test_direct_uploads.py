@@ -0,0 +1,178 @@
+import hashlib
+import http.client
+import os
+import tempfile
+import time
+from importlib.util import find_spec
+from io import StringIO
+from unittest import skipUnless
+from urllib.parse import urlsplit
+
+import jwt
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from mediafiles import objectstore
+from mediafiles.direct import expire_direct_uploads, object_key
+from mediafiles.models import DirectUpload, MediaFile
+
+BUCKET = "test-media"
+
+
+def bearer(user_id: str) -> str:
+    token = jwt.encode(
+        {"user_id": user_id, "exp": int(time.time()) + 3600}, settings.SIMPLE_JWT_SIGNING_KEY, algorithm=settings.SIMPLE_JWT_ALGORITHM
+    )
+    return f"Bearer {token}"
+
+
+def put(url: str, headers: dict, body: bytes) -> int:
+    """The client's own PUT to the presigned URL."""
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    try:
+        conn.request("PUT", f"{parts.path}?{parts.query}", body=body, headers={**headers, "Content-Length": str(len(body))})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+@skipUnless(find_spec("moto"), "needs moto[server] (pip install -r requirements-dev.txt)")
+class DirectUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from .s3_server import StandInS3
+
+        cls.s3 = StandInS3()
+        cls.addClassCleanup(cls.s3.stop)
+        media_root = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(
+            override_settings(
+                **cls.s3.settings(BUCKET), STORAGES=cls.s3.storages(settings.STORAGES, BUCKET), MEDIA_ROOT=media_root
+            )
+        )
+        objectstore.ensure_bucket()
+        super().setUpClass()
+
+    def setUp(self):
+        self.client.defaults["HTTP_AUTHORIZATION"] = bearer("42")
+        self.body = os.urandom(256 * 1024)
+
+    def initiate(self, body: bytes, **overrides) -> dict:
+        declared = {
+            "filename": "track.wav",
+            "content_type": "audio/wav",
+            "size": len(body),
+            "sha256": hashlib.sha256(body).hexdigest(),
+            **overrides,
+        }
+        response = self.client.post("/api/media/direct-uploads/", declared, content_type="application/json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def complete(self, ticket: dict):
+        return self.client.post(f"/api/media/direct-uploads/{ticket['id']}/complete/")
+
+    def test_presign_put_complete(self):
+        ticket = self.initiate(self.body)
+        self.assertEqual(ticket["method"], "PUT")
+
+        self.assertEqual(put(ticket["url"], ticket["headers"], self.body), 200)
+        response = self.complete(ticket)
+
+        self.assertEqual(response.status_code, 201, response.content)
+        media = MediaFile.objects.get(pk=response.json()["id"])
+        self.assertEqual((media.owner_id, media.size, media.sha256), ("42", len(self.body), hashlib.sha256(self.body).hexdigest()))
+        self.assertEqual(objectstore.head(media.blob.file.name).size, len(self.body))
+        self.assertIsNone(objectstore.head(f"uploads/direct/{ticket['id']}"))
+        self.assertFalse(DirectUpload.objects.exists())
+
+    def test_same_bytes_twice_share_one_blob(self):
+        first, second = self.initiate(self.body), self.initiate(self.body)
+        for ticket in (first, second):
+            put(ticket["url"], ticket["headers"], self.body)
+            self.assertEqual(self.complete(ticket).status_code, 201)
+
+        blobs = {media.blob_id for media in MediaFile.objects.all()}
+        self.assertEqual(len(blobs), 1)
+        self.assertIsNone(objectstore.head(f"uploads/direct/{second['id']}"))
+
+    def test_complete_before_upload(self):
+        response = self.complete(self.initiate(self.body))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], "Nothing has been uploaded yet.")
+
+    def test_complete_rejects_bytes_other_than_declared(self):
+        ticket = self.initiate(self.body)
+        # Same length, different bytes, put there without the presigned URL's checks.
+        upload = DirectUpload.objects.get(pk=ticket["id"])
+        objectstore.client().put_object(Bucket=BUCKET, Key=object_key(upload), Body=os.urandom(len(self.body)))
+
+        response = self.complete(ticket)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], "Uploaded bytes don't match the declared SHA-256.")
+        self.assertFalse(MediaFile.objects.exists())
+
+    def test_complete_rejects_other_size(self):
+        ticket = self.initiate(self.body)
+        # S3 itself refuses this PUT (the length is signed); the stand-in doesn't, so complete has to.
+        put(ticket["url"], ticket["headers"], self.body + b"x")
+
+        response = self.complete(ticket)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], f"Uploaded {len(self.body) + 1} bytes, expected {len(self.body)}.")
+
+    def test_expired_uploads_are_removed_with_their_objects(self):
+        ticket = self.initiate(self.body)
+        put(ticket["url"], ticket["headers"], self.body)
+
+        self.assertEqual(expire_direct_uploads(now=timezone.now() + settings.MEDIA_UPLOAD_SESSION_TTL * 2), 1)
+
+        self.assertFalse(DirectUpload.objects.exists())
+        self.assertIsNone(objectstore.head(f"uploads/direct/{ticket['id']}"))
+
+    def test_collector_expires_abandoned_uploads(self):
+        ticket = self.initiate(self.body)
+        put(ticket["url"], ticket["headers"], self.body)
+        DirectUpload.objects.filter(pk=ticket["id"]).update(created_at=timezone.now() - settings.MEDIA_UPLOAD_SESSION_TTL * 2)
+
+        call_command("collect_garbage", "--once", stdout=StringIO())
+
+        self.assertFalse(DirectUpload.objects.exists())
+        self.assertIsNone(objectstore.head(f"uploads/direct/{ticket['id']}"))
+
+    def test_abandon_deletes_the_object(self):
+        ticket = self.initiate(self.body)
+        put(ticket["url"], ticket["headers"], self.body)
+
+        response = self.client.delete(f"/api/media/direct-uploads/{ticket['id']}/")
+
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(objectstore.head(f"uploads/direct/{ticket['id']}"))
+        self.assertEqual(self.complete(ticket).status_code, 404)
+
+    def test_other_owners_upload_is_not_found(self):
+        ticket = self.initiate(self.body)
+        put(ticket["url"], ticket["headers"], self.body)
+
+        response = self.client.post(f"/api/media/direct-uploads/{ticket['id']}/complete/", HTTP_AUTHORIZATION=bearer("7"))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class DirectUploadWithoutObjectStorageTests(TestCase):
+    def test_needs_object_storage(self):
+        response = self.client.post(
+            "/api/media/direct-uploads/",
+            {"filename": "a.wav", "content_type": "audio/wav", "size": 1, "sha256": "0" * 64},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=bearer("42"),
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,109 @@
+import hashlib
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from mediafiles import blobs, tombstones
+from mediafiles.blobs import blob_storage, commit_blob, staging_name, staging_storage, stored
+from mediafiles.models import MediaBlob, MediaFile, StorageTombstone
+
+
+class RetryBackoffTests(TestCase):
+    def setUp(self):
+        media = MediaFile.all_objects.create(
+            owner_id="42",
+            file="media/gone.png",
+            file_type=MediaFile.TYPE_IMAGE,
+            original_filename="gone.png",
+            content_type="image/png",
+            size=1,
+            deleted_at=timezone.now(),
+        )
+        self.tombstone = StorageTombstone.objects.create(media_file=media)
+
+    def fail_at(self, attempts: int) -> timedelta:
+        """Fail a claim that was attempt number `attempts`; returns the delay until the retry."""
+        StorageTombstone.objects.filter(pk=self.tombstone.pk).update(attempts=attempts - 1)
+        [claimed] = tombstones.claim(1)
+        with mock.patch.object(tombstones, "purge", side_effect=OSError("storage unavailable")):
+            self.assertEqual(tombstones.collect([claimed]), (0, 1))
+        claimed.refresh_from_db()
+        self.assertIsNone(claimed.locked_at)
+        self.assertEqual(claimed.error, "OSError: storage unavailable")
+        # Due again right away for the next claim.
+        StorageTombstone.objects.filter(pk=claimed.pk).update(run_after=timezone.now())
+        return claimed.run_after - timezone.now()
+
+    def test_delay_doubles_with_each_attempt(self):
+        for attempts, expected in ((1, 30), (2, 60), (3, 120), (5, 480)):
+            with self.subTest(attempts=attempts):
+                self.assertAlmostEqual(self.fail_at(attempts).total_seconds(), expected, delta=5)
+
+    def test_delay_stays_at_the_cap_for_many_attempts(self):
+        for attempts in (11, 43, 1000, 32767):
+            with self.subTest(attempts=attempts):
+                self.assertAlmostEqual(self.fail_at(attempts).total_seconds(), tombstones.MAX_RETRY_DELAY.total_seconds(), delta=5)
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        patcher = override_settings(MEDIA_ROOT=media_root.name)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.tombstones = [self.bury(body) for body in (b"first", b"second")]
+
+    def bury(self, body: bytes) -> StorageTombstone:
+        staging = staging_storage().save(staging_name(), ContentFile(body))
+        with transaction.atomic():
+            blob = commit_blob(staging, hashlib.sha256(body).hexdigest(), len(body))
+        media = MediaFile.all_objects.create(
+            owner_id="42",
+            blob=blob,
+            file=blob.file.name,
+            file_type=MediaFile.TYPE_IMAGE,
+            original_filename="a.png",
+            content_type="image/png",
+            size=len(body),
+            deleted_at=timezone.now(),
+        )
+        return StorageTombstone.objects.create(media_file=media)
+
+    def names(self):
+        return [t.media_file.blob.file.name for t in self.tombstones]
+
+    def test_failed_transaction_keeps_rows_and_bytes(self):
+        names = self.names()
+        real_release = tombstones.release_blobs
+
+        def release_then_fail(counts):
+            real_release(counts)
+            raise OSError("legacy file unavailable")
+
+        with mock.patch.object(tombstones, "release_blobs", side_effect=release_then_fail):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(tombstones.collect(self.tombstones), (0, 2))
+        self.assertEqual(MediaBlob.objects.count(), 2)
+        self.assertTrue(all(stored(blob_storage(), name) for name in names))
+
+    def test_failed_unlink_after_commit_leaves_an_orphan(self):
+        names = self.names()
+        real_unlink = blobs.unlink_blob
+
+        def unlink(blob):
+            if blob.file.name == names[1]:
+                raise OSError("storage unavailable")
+            real_unlink(blob)
+
+        with mock.patch.object(blobs, "unlink_blob", side_effect=unlink), self.assertLogs(level="ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(tombstones.collect(self.tombstones), (2, 0))
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(StorageTombstone.objects.exists())
+        self.assertEqual([stored(blob_storage(), name) for name in names], [False, True])
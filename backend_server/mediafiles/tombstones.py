@@ -0,0 +1,112 @@
+"""Deferred removal of deleted files.
+
+A delete request only soft-deletes the MediaFile, takes it off the owner's
+usage and writes a StorageTombstone, all in one transaction, so it never
+waits on storage. `manage.py collect_garbage` claims tombstones in batches
+and removes the rows, then their bytes once that commits. If the
+transaction fails, the tombstone stays, records the error and is retried
+with a growing delay. A file whose unlink fails after the commit is logged
+and left for `manage.py reconcile_storage`; an orphaned file is harmless,
+while a row whose bytes are gone is not.
+"""
+from collections import Counter
+from datetime import timedelta
+from typing import Iterable, List, Tuple
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import usage
+from .blobs import release_blobs, run_concurrently
+from .models import MediaFile, StorageTombstone
+
+# A claimed tombstone whose worker hasn't reported back within this long is handed out again.
+LOCK_TIMEOUT = timedelta(minutes=10)
+RETRY_DELAY = timedelta(seconds=30)
+MAX_RETRY_DELAY = timedelta(hours=6)
+
+
+def bury(rows: Iterable[MediaFile], owner_id: str) -> None:
+    """Soft-delete `rows` (locked, all `owner_id`'s) and queue their removal. Call inside a transaction."""
+    rows = list(rows)
+    if not rows:
+        return
+    MediaFile.all_objects.filter(pk__in=[row.pk for row in rows]).update(deleted_at=timezone.now())
+    for file_type, _ in MediaFile.TYPE_CHOICES:
+        typed = [row for row in rows if row.file_type == file_type]
+        if typed:
+            usage.add(owner_id, file_type, -sum(row.size for row in typed), -len(typed))
+    StorageTombstone.objects.bulk_create([StorageTombstone(media_file_id=row.pk) for row in rows])
+
+
+def claimable(now) -> Q:
+    return Q(locked_at__isnull=True, run_after__lte=now) | Q(locked_at__lt=now - LOCK_TIMEOUT)
+
+
+def claim(limit: int) -> List[StorageTombstone]:
+    """Lock up to `limit` due tombstones for this worker and return them."""
+    now = timezone.now()
+    candidates = StorageTombstone.objects.filter(claimable(now)).order_by("run_after").values_list("pk", flat=True)[:limit]
+    claimed = [
+        pk
+        for pk in list(candidates)
+        # Conditional UPDATE: if another worker got there first this matches nothing.
+        if StorageTombstone.objects.filter(claimable(now), pk=pk).update(locked_at=now, attempts=F("attempts") + 1)
+    ]
+    return list(StorageTombstone.objects.filter(pk__in=claimed))
+
+
+def purge(tombstones: List[StorageTombstone]) -> None:
+    """Delete the files' rows and drop their blob references, unlinking bytes nobody else uses.
+
+    The rows go in one transaction, and the bytes are unlinked only after it
+    commits, so a rollback never brings back a row whose file is gone.
+    """
+    with transaction.atomic():
+        rows = list(
+            MediaFile.all_objects.select_for_update()
+            .filter(pk__in=[t.media_file_id for t in tombstones])
+            .only("id", "file", "blob")
+        )
+        # Takes the tombstones with them (CASCADE).
+        MediaFile.all_objects.filter(pk__in=[row.pk for row in rows]).delete()
+        release_blobs(Counter(row.blob_id for row in rows if row.blob_id is not None))
+        # Files stored before blobs existed aren't shared.
+        legacy_storage = MediaFile._meta.get_field("file").storage
+        legacy = [row.file.name for row in rows if row.blob_id is None and row.file.name]
+        transaction.on_commit(lambda: run_concurrently(legacy_storage.delete, legacy), robust=True)
+
+
+def collect(tombstones: List[StorageTombstone]) -> Tuple[int, int]:
+    """Purge a claimed batch; returns (removed, failed).
+
+    Tries the whole batch in one transaction first. If that fails, each
+    tombstone is retried alone so one bad row can't hold back the rest.
+    """
+    try:
+        purge(tombstones)
+        return len(tombstones), 0
+    except Exception as exc:
+        if len(tombstones) == 1:
+            fail(tombstones[0], exc)
+            return 0, 1
+    removed = failed = 0
+    for tombstone in tombstones:
+        try:
+            purge([tombstone])
+            removed += 1
+        except Exception as exc:
+            fail(tombstone, exc)
+            failed += 1
+    return removed, failed
+
+
+def fail(tombstone: StorageTombstone, exc: BaseException) -> None:
+    """Release the tombstone with the error and a delay that doubles with each attempt."""
+    now = timezone.now()
+    # The exponent is capped first: at a few dozen attempts the product would overflow timedelta.
+    delay = min(RETRY_DELAY * 2 ** min(tombstone.attempts - 1, 16), MAX_RETRY_DELAY)
+    StorageTombstone.objects.filter(pk=tombstone.pk).update(
+        error=f"{type(exc).__name__}: {exc}"[:2000], locked_at=None, run_after=now + delay
+    )
@@ -0,0 +1,212 @@
+import hashlib
+import os
+from typing import NamedTuple, Optional
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+
+# Slack for multipart boundaries and part headers when comparing Content-Length to a file size limit.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class StreamedUploadedFile(UploadedFile):
+    """An upload that is already sitting at its final storage name.
+
+    Assign `storage_name` (not the object itself) to the FileField so Django
+    doesn't copy the bytes a second time.
+    """
+
+    def __init__(self, storage_name: str, name: str, content_type: str, size: int, sha256: str, charset=None, content_type_extra=None):
+        super().__init__(None, name, content_type, size, charset, content_type_extra)
+        self.storage_name = storage_name
+        self.sha256 = sha256
+
+    def close(self) -> None:
+        # Nothing is held open; the bytes are already in storage.
+        pass
+
+
+class RejectedFile(NamedTuple):
+    name: str
+    error: str
+    status: int
+
+
+class StreamingHashUploadHandler(FileUploadHandler):
+    """Writes the `file` part straight into media storage under `name` while hashing it.
+
+    There's no in-memory or temp-file buffering and no second copy on save.
+    The SHA-256 digest and size are computed as the chunks go by. If the
+    content type is wrong or the upload grows past `max_size`, the handler
+    stops, removes the partial file and sets `error`/`error_status` for the
+    view to report. Requires a storage with a local `path()`
+    (FileSystemStorage).
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, request, *, storage, name: str, field_name: str = "file", allowed_prefix: str = "", max_size: Optional[int] = None, size_error: str = ""):
+        super().__init__(request)
+        self.storage = storage
+        self.target_name = name
+        self.target_field = field_name
+        self.allowed_prefix = allowed_prefix
+        self.max_size = max_size
+        self.size_error = size_error
+        self._out = None
+        self.storage_name = ""
+        self.error = ""
+        self.error_status = 0
+        self._hasher = None
+        self._written = 0
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        if field_name != self.target_field or self._out is not None:
+            # Only one streamed file per request; ignore anything else.
+            raise SkipFile()
+        if self.allowed_prefix and not (content_type or "").startswith(self.allowed_prefix + "/"):
+            self.reject(400, f"Invalid content type. Expected {self.allowed_prefix}/*", connection_reset=False)
+        if self.max_size is not None and content_length is not None and content_length > self.max_size:
+            self.reject(413, self.too_large_message())
+
+        self._open_target(self.target_name)
+        self._hasher = hashlib.sha256()
+        self._written = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if self._out is None:
+            return raw_data
+        self._written += len(raw_data)
+        if self.max_size is not None and self._written > self.max_size:
+            self.reject(413, self.too_large_message())
+        self._hasher.update(raw_data)
+        self._out.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self._out is None:
+            return None
+        self._out.close()
+        return StreamedUploadedFile(
+            storage_name=self.storage_name,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=self._written,
+            sha256=self._hasher.hexdigest(),
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        self.discard()
+
+    def reject(self, status_code: int, message: str, connection_reset: bool = True):
+        self.error_status = status_code
+        self.error = message
+        self.discard()
+        raise StopUpload(connection_reset=connection_reset)
+
+    def discard(self):
+        """Drop whatever has been written so far (safe to call more than once)."""
+        if self._out is not None:
+            self._out.close()
+        if self.storage_name:
+            self.storage.delete(self.storage_name)
+        self.storage_name = ""
+
+    def too_large_message(self) -> str:
+        if self.size_error:
+            return self.size_error
+        return f"File too large. Maximum size is {self.max_size} bytes."
+
+    def _open_target(self, name: str):
+        while True:
+            path = self.storage.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                # O_EXCL reserves the name against a concurrent upload that picked the same one. Staging
+                # names are random, so there's no need to ask storage for a free one first.
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+            except FileExistsError:
+                name = self.storage.get_available_name(name)
+                continue
+            break
+        if self.storage.file_permissions_mode is not None:
+            os.chmod(path, self.storage.file_permissions_mode)
+        self._out = os.fdopen(fd, "wb")
+        self.storage_name = name
+
+
+class BatchStreamingHashUploadHandler(StreamingHashUploadHandler):
+    """Streams every `field_name` part of a multipart body to its own staging name.
+
+    A file that's rejected (wrong type, over `max_size` each, over
+    `total_size` together, or past `max_files`) is skipped and recorded
+    instead of aborting the request. `items` lists every part in the order
+    it arrived, as a StreamedUploadedFile or a RejectedFile.
+    Subclasses StreamingHashUploadHandler for its write path only; each part
+    gets a fresh name from `name_factory`.
+    """
+
+    def __init__(self, request, *, name_factory, max_files: int, total_size: Optional[int] = None, total_error: str = "", **kwargs):
+        super().__init__(request, name=name_factory(), **kwargs)
+        self.name_factory = name_factory
+        self.max_files = max_files
+        self.total_size = total_size
+        self.total_error = total_error
+        self.items = []
+        self._total = 0
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        FileUploadHandler.new_file(self, field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self._out = None
+        self.storage_name = ""
+        if field_name != self.target_field:
+            raise SkipFile()
+        if len(self.items) >= self.max_files:
+            self.skip(413, f"Too many files. At most {self.max_files} per request.")
+        if self.allowed_prefix and not (content_type or "").startswith(self.allowed_prefix + "/"):
+            self.skip(400, f"Invalid content type. Expected {self.allowed_prefix}/*")
+        self._open_target(self.name_factory())
+        self._hasher = hashlib.sha256()
+        self._written = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if self._out is None:
+            return raw_data
+        self._written += len(raw_data)
+        if self.max_size is not None and self._written > self.max_size:
+            self.skip(413, self.too_large_message())
+        if self.total_size is not None and self._total + self._written > self.total_size:
+            self.skip(413, self.total_error)
+        self._hasher.update(raw_data)
+        self._out.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            self._total += uploaded.size
+            self.items.append(uploaded)
+            # Ours now; don't let a later skip() or discard() remove it.
+            self._out = None
+            self.storage_name = ""
+        return uploaded
+
+    def skip(self, status_code: int, message: str):
+        self.items.append(RejectedFile(self.file_name or "", message, status_code))
+        super().discard()
+        self._out = None
+        raise SkipFile()
+
+    def upload_interrupted(self):
+        # Django also calls this when the last part was skipped; the files before it are still good.
+        StreamingHashUploadHandler.discard(self)
+
+    def discard(self):
+        """Drop the part in progress and every staged file."""
+        super().discard()
+        for item in self.items:
+            if isinstance(item, StreamedUploadedFile):
+                self.storage.delete(item.storage_name)
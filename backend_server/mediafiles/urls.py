@@ -1,9 +1,54 @@
+from django.conf import settings
 from django.urls import path
-from .views import UploadImageView, UploadAudioView, ListFilesView, DeleteFileView
+from .views import (
+    UploadImageView,
+    UploadAudioView,
+    BatchUploadImagesView,
+    BatchUploadAudioView,
+    ListFilesView,
+    DeleteFileView,
+    BatchDeleteFilesView,
+    WaveformView,
+    UsageView,
+    DownloadView,
+    InitiateAudioUploadView,
+    UploadSessionView,
+    UploadPartView,
+    CompleteUploadView,
+    InitiateDirectUploadView,
+    DirectUploadView,
+    CompleteDirectUploadView,
+)
+
+if settings.MEDIA_ASYNC_VIEWS:
+    from .async_views import (
+        AsyncBatchDeleteFilesView as BatchDeleteFilesView,
+        AsyncBatchUploadAudioView as BatchUploadAudioView,
+        AsyncBatchUploadImagesView as BatchUploadImagesView,
+        AsyncDeleteFileView as DeleteFileView,
+        AsyncListFilesView as ListFilesView,
+        AsyncUploadAudioView as UploadAudioView,
+        AsyncUploadImageView as UploadImageView,
+    )
 
 urlpatterns = [
     path("upload/image/", UploadImageView.as_view(), name="upload-image"),
     path("upload/audio/", UploadAudioView.as_view(), name="upload-audio"),
+    path("upload/image/batch/", BatchUploadImagesView.as_view(), name="upload-image-batch"),
+    path("upload/audio/batch/", BatchUploadAudioView.as_view(), name="upload-audio-batch"),
     path("list/", ListFilesView.as_view(), name="list-files"),
     path("delete/<int:pk>/", DeleteFileView.as_view(), name="delete-file"),
+    path("delete/batch/", BatchDeleteFilesView.as_view(), name="delete-file-batch"),
+    path("usage/", UsageView.as_view(), name="storage-usage"),
+    path("download/<int:pk>/", DownloadView.as_view(), name="download-file"),
+    path("waveform/<int:pk>/", WaveformView.as_view(), name="waveform"),
+    # Resumable multi-part uploads
+    path("uploads/audio/", InitiateAudioUploadView.as_view(), name="upload-session-audio"),
+    path("uploads/<uuid:session_id>/", UploadSessionView.as_view(), name="upload-session"),
+    path("uploads/<uuid:session_id>/parts/<int:number>/", UploadPartView.as_view(), name="upload-session-part"),
+    path("uploads/<uuid:session_id>/complete/", CompleteUploadView.as_view(), name="upload-session-complete"),
+    # Presigned uploads straight to object storage
+    path("direct-uploads/", InitiateDirectUploadView.as_view(), name="direct-upload"),
+    path("direct-uploads/<uuid:upload_id>/", DirectUploadView.as_view(), name="direct-upload-detail"),
+    path("direct-uploads/<uuid:upload_id>/complete/", CompleteDirectUploadView.as_view(), name="direct-upload-complete"),
 ]
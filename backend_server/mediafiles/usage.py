@@ -0,0 +1,103 @@
+"""Per-owner storage usage and the upload quota.
+
+OwnerUsage rows are adjusted with F() updates inside the same transaction
+that creates or deletes the MediaFile. So a rolled-back upload never
+counts, and reading usage never touches the MediaFile table.
+
+MEDIA_QUOTA_BYTES (0 = unlimited) caps an owner's total across file
+types. It is checked up front from the request's declared size, and as
+the body streams in, so over-quota bytes are never written. It is checked
+again under a row lock when the upload commits, which catches concurrent
+uploads that each fit on their own.
+"""
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import listcache
+from .models import MediaFile, OwnerUsage
+
+
+class QuotaExceeded(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Storage quota exceeded."
+    default_code = "quota_exceeded"
+
+
+def quota_message(quota: int) -> str:
+    return f"Storage quota exceeded. Each account can store up to {quota} bytes."
+
+
+def usage_for(owner_id: str) -> Dict[str, Dict[str, int]]:
+    """{file_type: {"bytes": ..., "files": ...}} for every type, zeros included."""
+    usage = {file_type: {"bytes": 0, "files": 0} for file_type, _ in MediaFile.TYPE_CHOICES}
+    for file_type, used, count in OwnerUsage.objects.filter(owner_id=owner_id).values_list("file_type", "bytes_used", "file_count"):
+        usage[file_type] = {"bytes": used, "files": count}
+    return usage
+
+
+def bytes_used(owner_id: str, *, lock: bool = False) -> int:
+    rows = OwnerUsage.objects.filter(owner_id=owner_id)
+    if lock:
+        rows = rows.select_for_update()
+    return sum(rows.values_list("bytes_used", flat=True))
+
+
+def remaining(owner_id: str) -> Optional[int]:
+    """Bytes the owner can still add, or None without a quota."""
+    quota = settings.MEDIA_QUOTA_BYTES
+    if not quota:
+        return None
+    return max(quota - bytes_used(owner_id), 0)
+
+
+def add(owner_id: str, file_type: str, size: int, files: int = 1) -> None:
+    """Adjust the owner's totals by `size` bytes and `files` files (negative to subtract).
+
+    Call inside a transaction. Every upload and delete comes through here,
+    so this is also where the owner's cached listings are invalidated.
+    """
+    listcache.bump(owner_id)
+    rows = OwnerUsage.objects.filter(owner_id=owner_id, file_type=file_type)
+    if rows.update(bytes_used=F("bytes_used") + size, file_count=F("file_count") + files):
+        return
+    try:
+        with transaction.atomic():
+            OwnerUsage.objects.create(owner_id=owner_id, file_type=file_type, bytes_used=size, file_count=files)
+    except IntegrityError:
+        # A concurrent first upload created the row; add to theirs.
+        rows.update(bytes_used=F("bytes_used") + size, file_count=F("file_count") + files)
+
+
+def charge(owner_id: str, file_type: str, size: int) -> None:
+    """Count a new file against the owner, raising QuotaExceeded if it doesn't fit.
+
+    Call inside the transaction that creates the MediaFile. The owner's
+    usage rows stay locked until it commits, so concurrent uploads are
+    checked one after another.
+    """
+    quota = settings.MEDIA_QUOTA_BYTES
+    if quota and bytes_used(owner_id, lock=True) + size > quota:
+        raise QuotaExceeded(quota_message(quota))
+    add(owner_id, file_type, size)
+
+
+def rebuild(owner_id: Optional[str] = None) -> int:
+    """Recompute usage from MediaFile (everyone, or one owner). Returns the number of rows written."""
+    files = MediaFile.objects.all()
+    rows = OwnerUsage.objects.all()
+    if owner_id is not None:
+        files = files.filter(owner_id=owner_id)
+        rows = rows.filter(owner_id=owner_id)
+    totals = files.values("owner_id", "file_type").annotate(total=Sum("size"), count=Count("id")).order_by()
+    with transaction.atomic():
+        rows.delete()
+        created = OwnerUsage.objects.bulk_create(
+            [OwnerUsage(owner_id=t["owner_id"], file_type=t["file_type"], bytes_used=t["total"], file_count=t["count"]) for t in totals],
+            batch_size=1000,
+        )
+    return len(created)
@@ -1,16 +1,157 @@
-from typing import Any
+from typing import Any, List, Optional
+from django.conf import settings
 from django.utils import timezone
 from rest_framework import status, permissions, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
+from django.db import transaction
+from django.db.models import Prefetch, Sum
+from django.http import FileResponse, Http404, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
-from drf_spectacular.utils import extend_schema, OpenApiResponse, inline_serializer
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, inline_serializer
 from drf_spectacular.types import OpenApiTypes
 from rest_framework.parsers import MultiPartParser, FormParser
 
-from .models import MediaFile
-from .serializers import MediaFileSerializer, FileUploadSerializer
+from .blobs import (
+    blob_storage,
+    commit_blob,
+    commit_object,
+    is_local,
+    staging_name,
+    staging_storage,
+    stored,
+)
+from .audioinfo import audio_metadata
+from .delivery import serve_file
+from .derivatives import enqueue as enqueue_derivatives, waveform_name
+from .models import DerivativeJob, DirectUpload, ImageVariant, MediaFile, UploadPart, UploadSession
+from .pagination import CreatedAtKeysetPagination
+from .serializers import (
+    BatchDeleteResultSerializer,
+    BatchDeleteSerializer,
+    BatchUploadResultSerializer,
+    DirectUploadCreateSerializer,
+    DirectUploadTicketSerializer,
+    MediaFileSerializer,
+    MediaListFilterSerializer,
+    FileUploadSerializer,
+    UploadPartSerializer,
+    UploadSessionCreateSerializer,
+    UploadSessionSerializer,
+)
+from .sessions import PartTooLarge, assemble, remove_session_files, write_part
+from .uploadhandlers import MULTIPART_OVERHEAD, BatchStreamingHashUploadHandler, StreamedUploadedFile, StreamingHashUploadHandler
+from . import direct, filters, listcache, objectstore, tombstones, usage
+
+
+FILE_UPLOAD_REQUEST = {
+    "multipart/form-data": {
+        "type": "object",
+        "properties": {
+            "file": {"type": "string", "format": "binary"}
+        },
+        "required": ["file"],
+    }
+}
+
+def declared_length(request) -> int:
+    try:
+        return int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return 0
+
+
+# Shared with the async variants in async_views.py so both document the same contract.
+upload_image_schema = extend_schema(
+    summary="Upload image file",
+    tags=["media"],
+    request=FILE_UPLOAD_REQUEST,
+    responses={201: MediaFileSerializer},
+)
+upload_audio_schema = extend_schema(
+    summary="Upload audio file",
+    tags=["media"],
+    request=FILE_UPLOAD_REQUEST,
+    responses={201: MediaFileSerializer},
+)
+list_files_schema = extend_schema(
+    summary="List files for current user",
+    description="Filters narrow the listing; it stays newest first, and `next` links keep the filters.",
+    parameters=[
+        MediaListFilterSerializer,
+        OpenApiParameter(
+            "fields",
+            OpenApiTypes.STR,
+            description="Comma-separated subset of fields to return, e.g. `id,url,size`.",
+        ),
+        OpenApiParameter(
+            "variant",
+            OpenApiTypes.STR,
+            enum=list(settings.MEDIA_IMAGE_VARIANTS),
+            description=(
+                "Point `url` at a resized rendition of each image instead of the original. "
+                "Falls back to the original until the variant has been rendered, and for audio."
+            ),
+        ),
+    ],
+    responses={
+        200: MediaFileSerializer(many=True),
+        304: OpenApiResponse(description="Not modified since the ETag sent in If-None-Match"),
+    },
+    tags=["media"],
+)
+BATCH_UPLOAD_REQUEST = {
+    "multipart/form-data": {
+        "type": "object",
+        "properties": {
+            "files": {"type": "array", "items": {"type": "string", "format": "binary"}}
+        },
+        "required": ["files"],
+    }
+}
+BATCH_UPLOAD_RESPONSE = inline_serializer(name="BatchUploadResponse", fields={"results": BatchUploadResultSerializer(many=True)})
+batch_upload_description = (
+    "Repeat the `files` field once per file (up to MEDIA_BATCH_MAX_FILES). Each file is accepted or "
+    "rejected on its own: the response is 207 with one result per file, in request order."
+)
+upload_images_schema = extend_schema(
+    summary="Upload several image files in one request",
+    description=batch_upload_description,
+    tags=["media"],
+    request=BATCH_UPLOAD_REQUEST,
+    responses={207: BATCH_UPLOAD_RESPONSE},
+)
+upload_audio_batch_schema = extend_schema(
+    summary="Upload several audio files in one request",
+    description=batch_upload_description,
+    tags=["media"],
+    request=BATCH_UPLOAD_REQUEST,
+    responses={207: BATCH_UPLOAD_RESPONSE},
+)
+batch_delete_schema = extend_schema(
+    summary="Delete several files by id (must own them)",
+    description="Returns 207 with one result per requested id: 204 if it was deleted, 404 if there's no such file of yours.",
+    request=BatchDeleteSerializer,
+    responses={207: inline_serializer(name="BatchDeleteResponse", fields={"results": BatchDeleteResultSerializer(many=True)})},
+    tags=["media"],
+)
+delete_file_schema = extend_schema(
+    summary="Delete a file by id (must own the file)",
+    parameters=[
+        {
+            "name": "pk",
+            "in": "path",
+            "required": True,
+            "schema": {"type": "integer"},
+            "description": "ID of the media file",
+        }
+    ],
+    responses={204: OpenApiResponse(description="Deleted"), 404: OpenApiResponse(description="Not found")},
+    tags=["media"],
+)
 
 
 class UploadBaseView(APIView):
@@ -19,46 +160,97 @@ class UploadBaseView(APIView):
     allowed_prefix: str = ""
     parser_classes = [MultiPartParser, FormParser]
 
+    def get_max_size(self) -> int:
+        return settings.MEDIA_MAX_UPLOAD_BYTES[self.file_type]
+
     def post(self, request, *args: Any, **kwargs: Any):
+        rejected = self.check_content_length(request)
+        if rejected:
+            return rejected
+        up_file, handler, rejected = self.receive_file(request)
+        if rejected:
+            return rejected
+        instance = self.store(request, up_file, handler)
+        data = MediaFileSerializer(instance, context={"request": request}).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def check_content_length(self, request) -> Optional[Response]:
+        """Reject obviously oversized bodies before reading any of them."""
+        max_size = self.get_max_size()
+        if declared_length(request) > max_size + MULTIPART_OVERHEAD:
+            return Response({"detail": f"File too large. Maximum size is {max_size} bytes."}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        return None
+
+    def receive_file(self, request):
+        """Parse the body, streaming the file into blob staging. Blocking I/O.
+
+        Returns (uploaded file, handler, error response).
+        """
+        max_size, size_error = self.get_max_size(), ""
+        quota_left = usage.remaining(str(getattr(request.user, "id", "")))
+        if quota_left is not None and quota_left < max_size:
+            # Cap the stream at what still fits, so over-quota bytes are never written.
+            max_size, size_error = quota_left, usage.quota_message(settings.MEDIA_QUOTA_BYTES)
+            if declared_length(request) > max_size + MULTIPART_OVERHEAD:
+                return None, None, Response({"detail": size_error}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        handler = StreamingHashUploadHandler(
+            request._request,
+            storage=staging_storage(),
+            name=staging_name(),
+            allowed_prefix=self.allowed_prefix,
+            max_size=max_size,
+            size_error=size_error,
+        )
+        request._request.upload_handlers = [handler]
+
         up_file = request.FILES.get("file")
+        if handler.error:
+            return None, handler, Response({"detail": handler.error}, status=handler.error_status)
         if not up_file:
-            return Response({"detail": "No file provided with key 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+            return None, handler, Response({"detail": "No file provided with key 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+        return up_file, handler, None
 
-        content_type = getattr(up_file, "content_type", "") or ""
-        if not content_type.startswith(self.allowed_prefix + "/"):
-            return Response({"detail": f"Invalid content type. Expected {self.allowed_prefix}/*"}, status=status.HTTP_400_BAD_REQUEST)
+    def describe(self, up_file) -> dict:
+        """Extra MediaFile field values read from the staged file (before it moves into the blob store)."""
+        return {}
 
-        instance = MediaFile.objects.create(
-            owner_id=str(getattr(request.user, "id", "anonymous")),
-            file=up_file,
-            file_type=self.file_type,
-            original_filename=getattr(up_file, "name", "uploaded"),
-            content_type=content_type,
-            size=getattr(up_file, "size", 0),
-        )
+    def store(self, request, up_file, handler) -> MediaFile:
+        """Turn the staged upload into a blob reference plus a MediaFile row, atomically.
+
+        Derived files (image variants, audio waveform) are queued for the
+        background worker rather than produced here.
+        """
+        owner_id = str(getattr(request.user, "id", "anonymous"))
+        try:
+            metadata = self.describe(up_file)
+            with transaction.atomic():
+                # Before commit_blob: a quota rejection must not leave a renamed-in blob file behind.
+                usage.charge(owner_id, self.file_type, up_file.size)
+                blob = commit_blob(up_file.storage_name, up_file.sha256, up_file.size)
+                enqueue_derivatives(blob, self.file_type)
+                return MediaFile.objects.create(
+                    owner_id=owner_id,
+                    file=blob.file.name,
+                    blob=blob,
+                    file_type=self.file_type,
+                    original_filename=getattr(up_file, "name", "uploaded"),
+                    content_type=up_file.content_type or "",
+                    size=up_file.size,
+                    sha256=up_file.sha256,
+                    **metadata,
+                )
+        except Exception:
+            handler.discard()
+            raise
 
-        data = MediaFileSerializer(instance, context={"request": request}).data
-        return Response(data, status=status.HTTP_201_CREATED)
 
 class UploadImageView(UploadBaseView):
     file_type = MediaFile.TYPE_IMAGE
     allowed_prefix = "image"
     parser_classes = [MultiPartParser, FormParser]
 
-    @extend_schema(
-        summary="Upload image file",
-        tags=["media"],
-        request={
-            "multipart/form-data": {
-                "type": "object",
-                "properties": {
-                    "file": {"type": "string", "format": "binary"}
-                },
-                "required": ["file"],
-            }
-        },
-        responses={201: MediaFileSerializer},
-    )
+    @upload_image_schema
     def post(self, request, *args, **kwargs):
         return super().post(request, *args, **kwargs)
 
@@ -68,66 +260,680 @@ class UploadAudioView(UploadBaseView):
     allowed_prefix = "audio"
     parser_classes = [MultiPartParser, FormParser]
 
-    @extend_schema(
-        summary="Upload audio file",
-        tags=["media"],
-        request={
-            "multipart/form-data": {
-                "type": "object",
-                "properties": {
-                    "file": {"type": "string", "format": "binary"}
-                },
-                "required": ["file"],
+    @upload_audio_schema
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
+    def describe(self, up_file) -> dict:
+        # Headers only; the waveform, which needs every sample, is left to the worker.
+        return audio_metadata(staging_storage().path(up_file.storage_name))
+
+
+class BatchUploadBaseView(UploadBaseView):
+    """Many files of one type in one multipart request, stored with a single `bulk_create`.
+
+    Files are streamed to staging one after another as the body is parsed.
+    Each is then checked against the quota and committed as a blob in one
+    transaction, and all accepted rows are inserted together. A file that
+    can't be stored is reported in its slot of the result list; it doesn't
+    fail the others.
+    """
+
+    def post(self, request, *args: Any, **kwargs: Any):
+        rejected = self.check_content_length(request)
+        if rejected:
+            return rejected
+        handler, rejected = self.receive_files(request)
+        if rejected:
+            return rejected
+        results = self.store_batch(request, handler)
+        return self.batch_response(request, results)
+
+    def check_content_length(self, request) -> Optional[Response]:
+        max_files = settings.MEDIA_BATCH_MAX_FILES
+        if declared_length(request) > max_files * (self.get_max_size() + MULTIPART_OVERHEAD):
+            return Response(
+                {"detail": f"Request too large. At most {max_files} files of {self.get_max_size()} bytes each."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        return None
+
+    def receive_files(self, request):
+        """Parse the body, streaming each file into its own staging name. Blocking I/O.
+
+        Returns (handler, error response).
+        """
+        handler = BatchStreamingHashUploadHandler(
+            request._request,
+            storage=staging_storage(),
+            name_factory=staging_name,
+            field_name="files",
+            allowed_prefix=self.allowed_prefix,
+            max_size=self.get_max_size(),
+            max_files=settings.MEDIA_BATCH_MAX_FILES,
+            total_size=usage.remaining(str(getattr(request.user, "id", ""))),
+            total_error=usage.quota_message(settings.MEDIA_QUOTA_BYTES),
+        )
+        request._request.upload_handlers = [handler]
+        try:
+            request.FILES  # parses the body
+        except Exception:
+            handler.discard()
+            raise
+        if not handler.items:
+            return handler, Response({"detail": "No files provided with key 'files'."}, status=status.HTTP_400_BAD_REQUEST)
+        return handler, None
+
+    def store_batch(self, request, handler) -> List[dict]:
+        """Commit every staged file that fits the quota; one result dict per received part."""
+        owner_id = str(getattr(request.user, "id", "anonymous"))
+        quota = settings.MEDIA_QUOTA_BYTES
+        results, rows = [], []
+        try:
+            metadata = {
+                item.storage_name: self.describe(item) for item in handler.items if isinstance(item, StreamedUploadedFile)
             }
-        },
-        responses={201: MediaFileSerializer},
-    )
+            with transaction.atomic():
+                used = usage.bytes_used(owner_id, lock=True)
+                for index, item in enumerate(handler.items):
+                    result = {"index": index, "filename": item.name}
+                    results.append(result)
+                    if not isinstance(item, StreamedUploadedFile):
+                        result.update(status=item.status, detail=item.error)
+                        continue
+                    if quota and used + item.size > quota:
+                        staging_storage().delete(item.storage_name)
+                        result.update(status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=usage.quota_message(quota))
+                        continue
+                    used += item.size
+                    blob = commit_blob(item.storage_name, item.sha256, item.size)
+                    enqueue_derivatives(blob, self.file_type)
+                    result.update(status=status.HTTP_201_CREATED, file=MediaFile(
+                        owner_id=owner_id,
+                        file=blob.file.name,
+                        blob=blob,
+                        file_type=self.file_type,
+                        original_filename=item.name or "uploaded",
+                        content_type=item.content_type or "",
+                        size=item.size,
+                        sha256=item.sha256,
+                        **metadata[item.storage_name],
+                    ))
+                    rows.append(result["file"])
+                MediaFile.objects.bulk_create(rows)
+                if rows:
+                    usage.add(owner_id, self.file_type, sum(row.size for row in rows), len(rows))
+        except Exception:
+            handler.discard()
+            raise
+        return results
+
+    def batch_response(self, request, results: List[dict]) -> Response:
+        for result in results:
+            if "file" in result:
+                result["file"] = MediaFileSerializer(result["file"], context={"request": request}).data
+        return Response({"results": results}, status=status.HTTP_207_MULTI_STATUS)
+
+
+class BatchUploadImagesView(BatchUploadBaseView, UploadImageView):
+    @upload_images_schema
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
+
+class BatchUploadAudioView(BatchUploadBaseView, UploadAudioView):
+    @upload_audio_batch_schema
     def post(self, request, *args, **kwargs):
         return super().post(request, *args, **kwargs)
 
 
 class ListFilesView(ListAPIView):
+    """The caller's files, newest first.
+
+    Pages are cached per owner (see `listcache`) and carry an ETag, so a
+    repeat poll is a cache hit, or a 304 without a body when the client
+    sends `If-None-Match`. Neither touches the database. A miss reads from a
+    replica if there is one (see backend_server/dbrouter.py).
+    """
+
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = MediaFileSerializer
-    pagination_class = None
+    pagination_class = CreatedAtKeysetPagination
+
+    @list_files_schema
+    def get(self, request, *args, **kwargs):
+        cached = self.cached_response(request)
+        if cached is not None:
+            return cached
+        return self.remember(super().get(request, *args, **kwargs))
+
+    def cached_response(self, request):
+        """A 304 or the cached page for this request, or None to build it (then pass it to `remember`)."""
+        self.page_key = self.etag = None
+        if not listcache.enabled():
+            return None
+        self.page_key, etag = listcache.page_key(request, str(getattr(request.user, "id", "")))
+        self.etag = quote_etag(etag)
+        response = get_conditional_response(request, etag=self.etag)
+        if response is None:
+            data = listcache.cache().get(self.page_key)
+            if data is None:
+                return None
+            response = Response(data)
+        return self.with_validator(response)
+
+    def remember(self, response):
+        if self.page_key is not None and response.status_code == status.HTTP_200_OK:
+            listcache.cache().set(self.page_key, response.data, listcache.ttl())
+            self.with_validator(response)
+        return response
+
+    def with_validator(self, response):
+        response["ETag"] = self.etag
+        # Per user, and always revalidated; the ETag makes that a cheap 304.
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    def get_fields(self):
+        return MediaFileSerializer.parse_fields(self.request.query_params.get("fields"))
+
+    def get_variant(self) -> Optional[str]:
+        variant = self.request.query_params.get("variant")
+        if variant and variant not in settings.MEDIA_IMAGE_VARIANTS:
+            raise serializers.ValidationError({"variant": f"Unknown variant. Choose from: {', '.join(settings.MEDIA_IMAGE_VARIANTS)}."})
+        return variant or None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["variant"] = self.get_variant()
+        return context
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fields", self.get_fields())
+        return super().get_serializer(*args, **kwargs)
 
-    @extend_schema(
-        summary="List files for current user",
-        responses={200: MediaFileSerializer(many=True)},
-        tags=["media"],
-    )
     def get_queryset(self):
         owner_id = str(getattr(self.request.user, "id", ""))
-        return MediaFile.objects.filter(owner_id=owner_id)
+        qs = MediaFile.objects.filter(owner_id=owner_id)
+        fields = self.get_fields()
+        variant = self.get_variant()
+        if fields:
+            # The cursor needs id/created_at even if the client didn't ask for them.
+            columns = MediaFileSerializer.model_columns(fields)
+            if variant:
+                columns.append("blob")
+            qs = qs.only("id", "created_at", *columns)
+        if variant:
+            # One extra query for the whole page rather than one per row.
+            qs = qs.prefetch_related(Prefetch("blob__variants", queryset=ImageVariant.objects.filter(name=variant)))
+        return filters.filter_files(qs, self.get_filters())
+
+    def get_filters(self) -> dict:
+        params = MediaListFilterSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data
 
 
 class DeleteFileView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @delete_file_schema
+    def delete(self, request, pk: int, *args: Any, **kwargs: Any):
+        owner_id = str(getattr(request.user, "id", ""))
+        if not self.remove(pk, owner_id):
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def remove(self, pk: int, owner_id: str) -> bool:
+        """Soft-delete the file and queue its bytes for removal. Returns False if there's no such file for this owner."""
+        with transaction.atomic():
+            obj = MediaFile.objects.select_for_update().filter(pk=pk, owner_id=owner_id).only("id", "file_type", "size").first()
+            if obj is None:
+                return False
+            tombstones.bury([obj], owner_id)
+        return True
+
+
+class BatchDeleteFilesView(APIView):
+    """Delete many of the caller's files with one row lock and one UPDATE.
+
+    Like the single delete this only soft-deletes; the garbage collector
+    removes the rows and bytes in batches.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    @batch_delete_schema
+    def post(self, request, *args: Any, **kwargs: Any):
+        serializer = BatchDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        owner_id = str(getattr(request.user, "id", ""))
+        results = self.remove_many(serializer.validated_data["ids"], owner_id)
+        return Response({"results": results}, status=status.HTTP_207_MULTI_STATUS)
+
+    def remove_many(self, ids: List[int], owner_id: str) -> List[dict]:
+        with transaction.atomic():
+            rows = list(
+                MediaFile.objects.select_for_update().filter(pk__in=ids, owner_id=owner_id).only("id", "file_type", "size")
+            )
+            tombstones.bury(rows, owner_id)
+        deleted = {row.pk for row in rows}
+        return [{"id": pk, "status": 204 if pk in deleted else 404} for pk in ids]
+
+
+class UsageView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
     @extend_schema(
-        summary="Delete a file by id (must own the file)",
+        summary="Storage used by the current user, in total and per file type",
+        responses={
+            200: inline_serializer(
+                name="StorageUsage",
+                fields={
+                    "bytes_used": serializers.IntegerField(),
+                    "file_count": serializers.IntegerField(),
+                    "quota_bytes": serializers.IntegerField(allow_null=True, help_text="null when there's no quota"),
+                    "by_type": serializers.DictField(child=serializers.DictField(child=serializers.IntegerField())),
+                },
+            )
+        },
+        tags=["media"],
+    )
+    def get(self, request, *args: Any, **kwargs: Any):
+        by_type = usage.usage_for(str(getattr(request.user, "id", "")))
+        return Response({
+            "bytes_used": sum(t["bytes"] for t in by_type.values()),
+            "file_count": sum(t["files"] for t in by_type.values()),
+            "quota_bytes": settings.MEDIA_QUOTA_BYTES or None,
+            "by_type": by_type,
+        })
+
+
+class WaveformView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        summary="Waveform peaks of an audio file (audiowaveform .dat, 8-bit)",
+        description=(
+            "Binary, little-endian: int32 version (1), uint32 flags (1 = 8-bit), int32 sample rate, "
+            "int32 samples per pixel, uint32 pixel count, then one signed (min, max) byte pair per pixel. "
+            "Readable as-is by waveform-data.js / peaks.js. 202 while the waveform is still being computed."
+        ),
+        responses={
+            (200, "application/octet-stream"): OpenApiTypes.BINARY,
+            202: OpenApiResponse(description="Not computed yet; retry later"),
+            404: OpenApiResponse(description="Not found, not audio, or the waveform couldn't be computed"),
+        },
+        tags=["media"],
+    )
+    def get(self, request, pk: int, *args: Any, **kwargs: Any):
+        owner_id = str(getattr(request.user, "id", ""))
+        obj = get_object_or_404(
+            MediaFile.objects.select_related("blob"), pk=pk, owner_id=owner_id, file_type=MediaFile.TYPE_AUDIO
+        )
+        if obj.blob_id is None:
+            raise Http404
+        storage = blob_storage()
+        name = waveform_name(obj.blob.sha256)
+        try:
+            if not is_local(storage):
+                if not stored(storage, name):
+                    raise FileNotFoundError(name)
+                return HttpResponseRedirect(objectstore.presigned_get(name, content_type="application/octet-stream"))
+            peaks = storage.open(name, "rb")
+        except FileNotFoundError:
+            pending = DerivativeJob.objects.filter(
+                blob_id=obj.blob_id, status__in=[DerivativeJob.STATUS_PENDING, DerivativeJob.STATUS_RUNNING]
+            ).exists()
+            if not pending:
+                raise Http404
+            return Response({"detail": "Waveform is still being computed."}, status=status.HTTP_202_ACCEPTED, headers={"Retry-After": "5"})
+        response = FileResponse(peaks, content_type="application/octet-stream")
+        # Derived from immutable content, so it never changes for this file.
+        response["Cache-Control"] = "private, max-age=31536000, immutable"
+        return response
+
+
+class DownloadView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        summary="Download a file (or one of its image variants)",
+        description=(
+            "Supports a single `Range: bytes=...` (206, or 416 if unsatisfiable), `If-Range`, and "
+            "conditional requests: `If-None-Match` against the ETag (the file's SHA-256) or "
+            "`If-Modified-Since` return 304 without a body. With `variant`, serves that rendition of an "
+            "image, or the original while it hasn't been rendered yet."
+        ),
         parameters=[
-            {
-                "name": "pk",
-                "in": "path",
-                "required": True,
-                "schema": {"type": "integer"},
-                "description": "ID of the media file",
-            }
+            OpenApiParameter("variant", OpenApiTypes.STR, OpenApiParameter.QUERY, required=False, description="Image variant name"),
         ],
-        responses={204: OpenApiResponse(description="Deleted"), 404: OpenApiResponse(description="Not found")},
+        responses={
+            (200, "application/octet-stream"): OpenApiTypes.BINARY,
+            (206, "application/octet-stream"): OpenApiTypes.BINARY,
+            304: OpenApiResponse(description="Not modified"),
+            404: OpenApiResponse(description="Not found"),
+            416: OpenApiResponse(description="Range not satisfiable"),
+        },
         tags=["media"],
     )
-    def delete(self, request, pk: int, *args: Any, **kwargs: Any):
+    def get(self, request, pk: int, *args: Any, **kwargs: Any):
         owner_id = str(getattr(request.user, "id", ""))
-        obj = get_object_or_404(MediaFile, pk=pk, owner_id=owner_id)
-        # Remove the file from storage first; don't save the model afterwards
+        obj = get_object_or_404(MediaFile.objects.select_related("blob"), pk=pk, owner_id=owner_id)
+        name, content_type, etag = obj.file.name, obj.content_type, obj.sha256 or None
+        variant = request.query_params.get("variant")
+        if variant and variant not in settings.MEDIA_IMAGE_VARIANTS:
+            raise serializers.ValidationError({"variant": f"Unknown variant. Choose from: {', '.join(settings.MEDIA_IMAGE_VARIANTS)}."})
+        if variant and obj.blob_id is not None:
+            rendition = obj.blob.variants.filter(name=variant).first()
+            if rendition is not None:
+                # Re-rendered if the variant settings change, so validate on size/mtime instead.
+                name, content_type, etag = rendition.file.name, rendition.content_type, None
+        storage = blob_storage() if obj.blob_id is not None else obj.file.storage
+        if not is_local(storage):
+            # The store answers Range and conditional requests itself.
+            return HttpResponseRedirect(
+                objectstore.presigned_get(name, filename=obj.original_filename, content_type=content_type)
+            )
         try:
-            stored = obj.file
-            if stored and getattr(stored, "name", None):
-                stored.delete(save=False)
+            return serve_file(
+                request,
+                storage.path(name),
+                etag=etag,
+                content_type=content_type,
+                filename=obj.original_filename,
+                storage_name=name,
+            )
+        except FileNotFoundError:
+            raise Http404
+
+
+class UploadSessionBaseView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_session(self, request, session_id) -> UploadSession:
+        owner_id = str(getattr(request.user, "id", ""))
+        return get_object_or_404(UploadSession, pk=session_id, owner_id=owner_id)
+
+
+class InitiateUploadBaseView(UploadSessionBaseView):
+    file_type: str = ""
+    allowed_prefix: str = ""
+
+    def post(self, request, *args: Any, **kwargs: Any):
+        serializer = UploadSessionCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        content_type = serializer.validated_data["content_type"]
+        if not content_type.startswith(self.allowed_prefix + "/"):
+            return Response({"detail": f"Invalid content type. Expected {self.allowed_prefix}/*"}, status=status.HTTP_400_BAD_REQUEST)
+
+        session = UploadSession.objects.create(
+            owner_id=str(getattr(request.user, "id", "anonymous")),
+            file_type=self.file_type,
+            original_filename=serializer.validated_data["filename"],
+            content_type=content_type,
+        )
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+
+class InitiateAudioUploadView(InitiateUploadBaseView):
+    file_type = MediaFile.TYPE_AUDIO
+    allowed_prefix = "audio"
+
+    @extend_schema(
+        summary="Start a resumable multi-part audio upload",
+        description=(
+            "PUT the raw bytes of each part to `parts/<n>/` (n starts at 1; parts may be sent "
+            "concurrently and in any order), then POST `complete/`. GET the session to see which "
+            "parts have arrived when resuming."
+        ),
+        request=UploadSessionCreateSerializer,
+        responses={201: UploadSessionSerializer},
+        tags=["media"],
+    )
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
+
+class UploadSessionView(UploadSessionBaseView):
+    @extend_schema(
+        summary="Show an upload session and the parts received so far",
+        responses={200: UploadSessionSerializer, 404: OpenApiResponse(description="Not found")},
+        tags=["media"],
+    )
+    def get(self, request, session_id, *args: Any, **kwargs: Any):
+        session = self.get_session(request, session_id)
+        return Response(UploadSessionSerializer(session).data)
+
+    @extend_schema(
+        summary="Abort an upload session and discard its parts",
+        responses={204: OpenApiResponse(description="Aborted"), 404: OpenApiResponse(description="Not found")},
+        tags=["media"],
+    )
+    def delete(self, request, session_id, *args: Any, **kwargs: Any):
+        session = self.get_session(request, session_id)
+        session.delete()
+        remove_session_files(session_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadPartView(UploadSessionBaseView):
+    @extend_schema(
+        summary="Upload one part of a session (raw request body)",
+        request={"application/octet-stream": {"type": "string", "format": "binary"}},
+        responses={200: UploadPartSerializer, 404: OpenApiResponse(description="Not found"), 409: OpenApiResponse(description="Session is completing")},
+        tags=["media"],
+    )
+    def put(self, request, session_id, number: int, *args: Any, **kwargs: Any):
+        session = self.get_session(request, session_id)
+        if session.status != UploadSession.STATUS_OPEN:
+            return Response({"detail": "Upload session is already completing."}, status=status.HTTP_409_CONFLICT)
+        if not 1 <= number <= settings.MEDIA_UPLOAD_MAX_PARTS:
+            return Response({"detail": f"Part number must be between 1 and {settings.MEDIA_UPLOAD_MAX_PARTS}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_size = settings.MEDIA_UPLOAD_PART_MAX_BYTES
+        size_error = f"Part too large. Maximum size is {max_size} bytes."
+        quota_left = usage.remaining(session.owner_id)
+        if quota_left is not None:
+            # The other parts of this session will count once it completes.
+            quota_left -= session.parts.exclude(number=number).aggregate(total=Sum("size"))["total"] or 0
+            if quota_left < max_size:
+                max_size, size_error = max(quota_left, 0), usage.quota_message(settings.MEDIA_QUOTA_BYTES)
+        if declared_length(request) > max_size:
+            return Response({"detail": size_error}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        try:
+            size, sha256 = write_part(request._request, session.pk, number, max_size)
+        except PartTooLarge:
+            return Response({"detail": size_error}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if size == 0:
+            return Response({"detail": "Empty part."}, status=status.HTTP_400_BAD_REQUEST)
+
+        part, _ = UploadPart.objects.update_or_create(session=session, number=number, defaults={"size": size, "sha256": sha256})
+        UploadSession.objects.filter(pk=session.pk).update(updated_at=timezone.now())
+        return Response(UploadPartSerializer(part).data)
+
+
+class CompleteUploadView(UploadSessionBaseView):
+    @extend_schema(
+        summary="Assemble the uploaded parts into a media file",
+        request=None,
+        responses={
+            201: MediaFileSerializer,
+            400: OpenApiResponse(description="Parts missing or too large in total"),
+            409: OpenApiResponse(description="Session is already completing"),
+        },
+        tags=["media"],
+    )
+    def post(self, request, session_id, *args: Any, **kwargs: Any):
+        session = self.get_session(request, session_id)
+        # Claim the session so concurrent completes (or late parts) can't interfere.
+        claimed = UploadSession.objects.filter(pk=session.pk, status=UploadSession.STATUS_OPEN).update(
+            status=UploadSession.STATUS_COMPLETING, updated_at=timezone.now()
+        )
+        if not claimed:
+            return Response({"detail": "Upload session is already completing."}, status=status.HTTP_409_CONFLICT)
+
+        try:
+            parts = list(session.parts.order_by("number"))
+            error = self.check_parts(session, parts)
+            if error:
+                UploadSession.objects.filter(pk=session.pk).update(status=UploadSession.STATUS_OPEN)
+                return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+
+            staged, size, sha256 = assemble(session, parts)
+            try:
+                metadata = audio_metadata(staging_storage().path(staged)) if session.file_type == MediaFile.TYPE_AUDIO else {}
+                with transaction.atomic():
+                    usage.charge(session.owner_id, session.file_type, size)
+                    blob = commit_blob(staged, sha256, size)
+                    enqueue_derivatives(blob, session.file_type)
+                    instance = MediaFile.objects.create(
+                        owner_id=session.owner_id,
+                        file=blob.file.name,
+                        blob=blob,
+                        file_type=session.file_type,
+                        original_filename=session.original_filename,
+                        content_type=session.content_type,
+                        size=size,
+                        sha256=sha256,
+                        **metadata,
+                    )
+                    session.delete()
+            except Exception:
+                staging_storage().delete(staged)
+                raise
         except Exception:
-            # If storage delete fails, still remove the DB row to avoid dangling records
-            pass
-        obj.delete()
+            UploadSession.objects.filter(pk=session.pk).update(status=UploadSession.STATUS_OPEN)
+            raise
+
+        remove_session_files(session_id)
+        data = MediaFileSerializer(instance, context={"request": request}).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def check_parts(self, session: UploadSession, parts) -> str:
+        if not parts:
+            return "No parts uploaded."
+        missing = sorted(set(range(1, parts[-1].number + 1)) - {p.number for p in parts})
+        if missing:
+            return f"Missing parts: {missing[:20]}"
+        max_size = settings.MEDIA_MAX_UPLOAD_BYTES[session.file_type]
+        if sum(p.size for p in parts) > max_size:
+            return f"File too large. Maximum size is {max_size} bytes."
+        return ""
+
+
+class DirectUploadBaseView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_upload(self, request, upload_id) -> DirectUpload:
+        owner_id = str(getattr(request.user, "id", ""))
+        return get_object_or_404(DirectUpload, pk=upload_id, owner_id=owner_id)
+
+
+class InitiateDirectUploadView(DirectUploadBaseView):
+    @extend_schema(
+        summary="Get a presigned URL to upload a file straight to object storage",
+        description=(
+            "PUT the file's bytes to `url` with exactly the `headers` given, then POST `complete/`. "
+            "The size, content type and SHA-256 are signed into the URL, so the store rejects any other "
+            "body. Only available with object storage (MEDIA_STORAGE_BACKEND=s3)."
+        ),
+        request=DirectUploadCreateSerializer,
+        responses={
+            201: DirectUploadTicketSerializer,
+            400: OpenApiResponse(description="Invalid request, or no object storage configured"),
+            413: OpenApiResponse(description="File too large, or over the storage quota"),
+        },
+        tags=["media"],
+    )
+    def post(self, request, *args: Any, **kwargs: Any):
+        if not objectstore.enabled():
+            return Response({"detail": "Direct uploads need object storage (MEDIA_STORAGE_BACKEND=s3)."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = DirectUploadCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        file_type = data["content_type"].split("/", 1)[0]
+        if file_type not in (MediaFile.TYPE_IMAGE, MediaFile.TYPE_AUDIO):
+            return Response({"detail": "Invalid content type. Expected image/* or audio/*"}, status=status.HTTP_400_BAD_REQUEST)
+        max_size = settings.MEDIA_MAX_UPLOAD_BYTES[file_type]
+        if data["size"] > max_size:
+            return Response({"detail": f"File too large. Maximum size is {max_size} bytes."}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        owner_id = str(getattr(request.user, "id", "anonymous"))
+        quota_left = usage.remaining(owner_id)
+        if quota_left is not None and data["size"] > quota_left:
+            return Response({"detail": usage.quota_message(settings.MEDIA_QUOTA_BYTES)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        upload = DirectUpload.objects.create(
+            owner_id=owner_id,
+            file_type=file_type,
+            original_filename=data["filename"],
+            content_type=data["content_type"],
+            size=data["size"],
+            sha256=data["sha256"],
+        )
+        url, headers = objectstore.presigned_put(
+            direct.object_key(upload), content_type=upload.content_type, size=upload.size, sha256=upload.sha256
+        )
+        ticket = {"id": upload.id, "method": "PUT", "url": url, "headers": headers, "expires_in": settings.MEDIA_PRESIGNED_URL_TTL}
+        return Response(DirectUploadTicketSerializer(ticket).data, status=status.HTTP_201_CREATED)
+
+
+class DirectUploadView(DirectUploadBaseView):
+    @extend_schema(
+        summary="Abandon a direct upload and delete anything already uploaded for it",
+        responses={204: OpenApiResponse(description="Aborted"), 404: OpenApiResponse(description="Not found")},
+        tags=["media"],
+    )
+    def delete(self, request, upload_id, *args: Any, **kwargs: Any):
+        direct.discard(self.get_upload(request, upload_id))
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CompleteDirectUploadView(DirectUploadBaseView):
+    @extend_schema(
+        summary="Turn a finished direct upload into a media file",
+        description=(
+            "Checks the uploaded object's size and SHA-256 against what was declared, then moves it "
+            "into place with a server-side copy. Audio duration and format aren't probed for direct uploads."
+        ),
+        request=None,
+        responses={
+            201: MediaFileSerializer,
+            400: OpenApiResponse(description="Nothing uploaded yet, or the bytes don't match what was declared"),
+            404: OpenApiResponse(description="Not found"),
+            409: OpenApiResponse(description="The object was replaced while completing; retry"),
+            413: OpenApiResponse(description="Over the storage quota"),
+        },
+        tags=["media"],
+    )
+    def post(self, request, upload_id, *args: Any, **kwargs: Any):
+        upload = self.get_upload(request, upload_id)
+        try:
+            # Outside the transaction: without stored checksums this reads the whole object.
+            etag = direct.verify(upload)
+            with transaction.atomic():
+                # Of two concurrent completes, only the one that still finds the row goes on.
+                if not DirectUpload.objects.select_for_update().filter(pk=upload.pk).exists():
+                    raise Http404
+                usage.charge(upload.owner_id, upload.file_type, upload.size)
+                blob = commit_object(direct.object_key(upload), etag, upload.sha256, upload.size)
+                enqueue_derivatives(blob, upload.file_type)
+                instance = MediaFile.objects.create(
+                    owner_id=upload.owner_id,
+                    file=blob.file.name,
+                    blob=blob,
+                    file_type=upload.file_type,
+                    original_filename=upload.original_filename,
+                    content_type=upload.content_type,
+                    size=upload.size,
+                    sha256=upload.sha256,
+                )
+                upload.delete()
+        except direct.UploadMismatch as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except objectstore.ObjectChanged:
+            return Response({"detail": "The upload was replaced while completing. Try again."}, status=status.HTTP_409_CONFLICT)
+
+        data = MediaFileSerializer(instance, context={"request": request}).data
+        return Response(data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,135 @@
+"""Min/max waveform peaks for audio uploads; runs inside the derivative worker's process pool.
+
+The output is the audiowaveform binary format (version 1, 8-bit), which
+peaks.js / waveform-data.js read directly. It is a 20-byte little-endian
+header (version, flags, sample rate, samples per pixel, pixel count)
+followed by one signed (min, max) byte pair per pixel. A few thousand
+pixels describe any track in a few KB.
+
+PCM/float WAV is read directly. Only the most significant byte of each
+sample is needed at 8-bit resolution, so samples are taken as strided
+numpy views without converting the whole stream. Other formats are decoded
+by `ffmpeg` if it's on PATH. Either way, peaks are reduced block by block
+with numpy, so memory stays flat however long the track is.
+"""
+import math
+import os
+import shutil
+import subprocess
+import uuid
+from typing import Iterator
+
+import numpy as np
+
+from .audioinfo import WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_PCM, probe, wav_layout
+
+FORMAT_VERSION = 1
+FLAG_8BIT = 0x1
+# Pixels reduced per read; bounds how much sample data is held at once.
+PIXELS_PER_BLOCK = 256
+
+
+class WaveformUnavailable(Exception):
+    """The file can't be turned into samples here (unsupported format and no ffmpeg)."""
+
+
+def compute_peaks(source: str, target: str, points: int) -> dict:
+    """Write roughly `points` min/max pairs for `source` to `target`; returns a summary dict."""
+    with open(source, "rb") as f:
+        layout = wav_layout(f)
+    if layout is not None and layout.format_tag in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+        # Streaming writers may leave a bogus data size; never read past the end of the file.
+        layout = layout._replace(data_size=min(layout.data_size, os.path.getsize(source) - layout.data_offset))
+        sample_rate = layout.sample_rate
+        frame_bytes = layout.channels * layout.bits_per_sample // 8
+        total_frames = layout.data_size // frame_bytes if frame_bytes else 0
+        samples_per_pixel = max(math.ceil(total_frames / points), 1)
+        blocks = wav_blocks(source, layout, samples_per_pixel)
+        # Channels stay interleaved: a pixel's min/max covers every channel.
+        step = samples_per_pixel * layout.channels
+    else:
+        if not shutil.which("ffmpeg"):
+            raise WaveformUnavailable("Not a PCM WAV file and ffmpeg is not installed.")
+        info = probe(source)
+        if info is None:
+            raise WaveformUnavailable("Unrecognised audio format; can't size the waveform.")
+        sample_rate = info.sample_rate
+        samples_per_pixel = max(math.ceil(sample_rate * info.duration / points), 1)
+        blocks = ffmpeg_blocks(source, sample_rate, samples_per_pixel)
+        step = samples_per_pixel
+
+    peaks = np.concatenate([reduce_block(block, step) for block in blocks] or [np.zeros(0, dtype=np.int8)])
+    header = np.array([FORMAT_VERSION, FLAG_8BIT, sample_rate, samples_per_pixel, len(peaks) // 2], dtype="<i4")
+    tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        with open(tmp, "wb") as out:
+            out.write(header.tobytes())
+            out.write(peaks.tobytes())
+        os.replace(tmp, target)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return {"filename": os.path.basename(target), "size": os.path.getsize(target), "pixels": len(peaks) // 2}
+
+
+def reduce_block(samples: np.ndarray, step: int) -> np.ndarray:
+    """Interleaved int8 (min, max) for every `step` samples of a 1-D int8 block."""
+    if samples.size == 0:
+        return np.zeros(0, dtype=np.int8)
+    pixels = math.ceil(samples.size / step)
+    padded = samples
+    if pixels * step != samples.size:
+        # Pad the last, partial pixel with its own first sample so it can't skew min/max.
+        fill = np.full(pixels * step - samples.size, samples[(pixels - 1) * step], dtype=np.int8)
+        padded = np.concatenate([samples, fill])
+    grid = padded.reshape(pixels, step)
+    out = np.empty(pixels * 2, dtype=np.int8)
+    out[0::2] = grid.min(axis=1)
+    out[1::2] = grid.max(axis=1)
+    return out
+
+
+def wav_blocks(source: str, layout, samples_per_pixel: int) -> Iterator[np.ndarray]:
+    """int8 samples (all channels, interleaved) in whole-pixel blocks."""
+    width = layout.bits_per_sample // 8
+    frame_bytes = layout.channels * width
+    block_bytes = PIXELS_PER_BLOCK * samples_per_pixel * frame_bytes
+    remaining = layout.data_size
+    with open(source, "rb") as f:
+        f.seek(layout.data_offset)
+        while remaining > 0:
+            raw = f.read(min(block_bytes, remaining))
+            raw = raw[: len(raw) - len(raw) % frame_bytes]
+            if not raw:
+                break
+            remaining -= len(raw)
+            yield to_int8(raw, layout.format_tag, width)
+
+
+def to_int8(raw: bytes, format_tag: int, width: int) -> np.ndarray:
+    data = np.frombuffer(raw, dtype=np.uint8)
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        floats = np.frombuffer(raw, dtype="<f4" if width == 4 else "<f8")
+        return np.clip(floats * 127.0, -128, 127).astype(np.int8)
+    if width == 1:
+        # 8-bit WAV is unsigned, centred on 128.
+        return (data.astype(np.int16) - 128).astype(np.int8)
+    # Little-endian signed PCM: the top byte of each sample is its 8-bit value.
+    return data[width - 1 :: width].view(np.int8)
+
+
+def ffmpeg_blocks(source: str, sample_rate: int, samples_per_pixel: int) -> Iterator[np.ndarray]:
+    """Decode with ffmpeg to signed 8-bit mono at the native rate and yield whole-pixel blocks."""
+    cmd = ["ffmpeg", "-v", "error", "-nostdin", "-i", source, "-ac", "1", "-ar", str(sample_rate), "-f", "s8", "-"]
+    block_bytes = PIXELS_PER_BLOCK * samples_per_pixel
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+        while True:
+            raw = proc.stdout.read(block_bytes)
+            if not raw:
+                break
+            yield np.frombuffer(raw, dtype=np.int8)
+        stderr = proc.stderr.read()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace')[-500:]}")
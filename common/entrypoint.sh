@@ -0,0 +1,46 @@
+#!/usr/bin/env sh
+# Shared by both services; each image copies it to /app/entrypoint.sh and runs it from the project
+# directory. WSGI_APP and ASGI_APP name the service's applications (e.g. backend_server.wsgi:application);
+# the Dockerfiles set them.
+set -e
+
+# Export env if present (safe, without relying on xargs flags)
+set -a
+[ -f "/app/.env" ] && . /app/.env || true
+set +a
+
+# STARTUP_MODE decides what runs before serving, all in one process (manage.py bootstrap):
+#   fast (default) - migrate, collectstatic, the superuser from DJANGO_SUPERUSER_* and the service's own
+#                    steps (the backend's S3 bucket), each skipped when a fingerprint shows there's nothing to do
+#   full           - the same, but migrate and collectstatic always run
+#   none           - nothing; migrations are applied elsewhere (a release job, say) and static
+#                    files were collected when the image was built
+case "${STARTUP_MODE:-fast}" in
+  none)
+    ;;
+  full)
+    python manage.py bootstrap --force
+    ;;
+  *)
+    python manage.py bootstrap
+    ;;
+esac
+
+# SERVER_MODE picks how we serve:
+#   runserver (default) - Django's single-process dev server
+#   wsgi                - gunicorn, multi-process gthread workers (wsgi.py)
+#   asgi                - gunicorn managing uvicorn workers (asgi.py)
+# Worker/thread counts and timeouts are read by worknomads_common/gunicorn_conf.py (WEB_CONCURRENCY, GUNICORN_THREADS, GUNICORN_TIMEOUT, ...).
+# exec so the server is PID 1 and gets SIGTERM/SIGHUP directly (HUP = graceful reload under gunicorn).
+PORT="${PORT:-8000}"
+case "${SERVER_MODE:-runserver}" in
+  wsgi)
+    exec gunicorn "${WSGI_APP:?WSGI_APP is not set}" -c python:worknomads_common.gunicorn_conf
+    ;;
+  asgi)
+    exec gunicorn "${ASGI_APP:?ASGI_APP is not set}" -c python:worknomads_common.gunicorn_conf
+    ;;
+  *)
+    exec python manage.py runserver "0.0.0.0:$PORT"
+    ;;
+esac
@@ -0,0 +1,11 @@
+"""Code both services run, installed into each image from `common/` (`pip install ./common`).
+
+- `metrics`: request metrics, `/metrics` and Server-Timing.
+- `db`: DATABASES entries, with persistent or pooled connections.
+- `startup`, `bootstrap`: `manage.py bootstrap`, the container start-up that
+  skips work when nothing changed.
+- `schema`, `build_schema`: /api/schema/ served from a prebuilt, cached
+  document, and the `manage.py build_schema` that writes it.
+- `gunicorn_conf`: gunicorn settings for SERVER_MODE=wsgi|asgi, run by
+  `common/entrypoint.sh` with `-c python:worknomads_common.gunicorn_conf`.
+"""
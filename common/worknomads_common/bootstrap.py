@@ -0,0 +1,64 @@
+"""`manage.py bootstrap`, shared by both services.
+
+Each service's command subclasses `BootstrapCommand` and adds its own
+work in `service_steps()`, which runs once the database is migrated.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from . import startup
+
+
+class BootstrapCommand(BaseCommand):
+    help = (
+        "Prepare a container to serve: apply migrations, collect static files and create the superuser from "
+        "DJANGO_SUPERUSER_*. Steps with nothing to do are skipped."
+    )
+    # The system checks import every URLconf and view; the server doesn't need them run here.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Run migrate and collectstatic even if nothing changed.")
+        parser.add_argument(
+            "--static-only", action="store_true", help="Only collect static files (for the image build; needs no database)."
+        )
+
+    def handle(self, *args, **options):
+        self.started = time.perf_counter()
+        self.collect_static(options["force"])
+        if options["static_only"]:
+            return
+        self.migrate(options["force"])
+        self.service_steps()
+        username = os.getenv("DJANGO_SUPERUSER_USERNAME", "")
+        password = os.getenv("DJANGO_SUPERUSER_PASSWORD", "")
+        if username and password:
+            outcome = startup.ensure_superuser(username, os.getenv("DJANGO_SUPERUSER_EMAIL", ""), password)
+            self.report(f"superuser {username}: {outcome}")
+
+    def service_steps(self) -> None:
+        """The service's own start-up work, after migrations; nothing by default."""
+
+    def collect_static(self, force: bool) -> None:
+        fingerprint = startup.static_fingerprint()
+        if not force and fingerprint == startup.collected_fingerprint():
+            self.report("static files: up to date")
+            return
+        call_command("collectstatic", interactive=False, verbosity=0)
+        startup.record_static_fingerprint(fingerprint)
+        self.report(f"static files: collected into {settings.STATIC_ROOT}")
+
+    def migrate(self, force: bool) -> None:
+        pending = startup.unapplied_migrations()
+        if not force and not pending:
+            self.report("migrations: up to date")
+            return
+        call_command("migrate", interactive=False, verbosity=0)
+        self.report(f"migrations: applied {len(pending)}")
+
+    def report(self, message: str) -> None:
+        self.stdout.write(f"[{time.perf_counter() - self.started:6.2f}s] {message}")
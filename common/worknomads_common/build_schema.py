@@ -0,0 +1,24 @@
+"""`manage.py build_schema`, shared by both services; each service's command subclasses `BuildSchemaCommand`."""
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class BuildSchemaCommand(BaseCommand):
+    help = (
+        "Generate the OpenAPI document served at /api/schema/ and write it to API_SCHEMA_FILE. "
+        "Running servers pick up the new file on their next schema request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", help="Write here instead of API_SCHEMA_FILE.")
+
+    def handle(self, *args, **options):
+        if not settings.API_DOCS_ENABLED:
+            raise CommandError("API_DOCS_ENABLED is off, so there's no schema to serve.")
+        from .schema import write_schema
+
+        path = Path(options["file"] or settings.API_SCHEMA_FILE)
+        document = write_schema(path)
+        self.stdout.write(f"Wrote {len(document.get('paths', {}))} path(s), {path.stat().st_size} bytes, to {path}.")
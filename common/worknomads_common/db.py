@@ -0,0 +1,29 @@
+"""DATABASES entries for both services, built from URLs and the environment.
+
+By default each thread keeps one persistent connection for CONN_MAX_AGE
+seconds (600), checked before reuse. With DATABASE_POOL=true (PostgreSQL
+only, needs psycopg[pool]) each process keeps a pool of
+DATABASE_POOL_MIN_SIZE..DATABASE_POOL_MAX_SIZE connections instead, and a
+request borrows one only while it runs, so the database sees at most
+WEB_CONCURRENCY x DATABASE_POOL_MAX_SIZE per service. A request waits up to
+DATABASE_POOL_TIMEOUT seconds for a free connection, then fails.
+Connections are health-checked as they leave the pool (CONN_HEALTH_CHECKS)
+and replaced after DATABASE_POOL_MAX_LIFETIME seconds.
+"""
+import os
+
+import dj_database_url
+
+
+def database(url: str) -> dict:
+    config = dj_database_url.parse(url, conn_max_age=int(os.getenv("CONN_MAX_AGE", "600")), conn_health_checks=True)
+    if os.getenv("DATABASE_POOL", "False").lower() == "true" and config["ENGINE"] == "django.db.backends.postgresql":
+        # Django returns connections to the pool itself, so it can't also hold on to them.
+        config["CONN_MAX_AGE"] = 0
+        config.setdefault("OPTIONS", {})["pool"] = {
+            "min_size": int(os.getenv("DATABASE_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("DATABASE_POOL_MAX_SIZE", "10")),
+            "timeout": float(os.getenv("DATABASE_POOL_TIMEOUT", "10")),
+            "max_lifetime": float(os.getenv("DATABASE_POOL_MAX_LIFETIME", "3600")),
+        }
+    return config
@@ -0,0 +1,40 @@
+"""Gunicorn settings for SERVER_MODE=wsgi|asgi (see common/entrypoint.sh); everything is env-driven.
+
+Both services use it: `gunicorn <app> -c python:worknomads_common.gunicorn_conf`.
+
+Send SIGHUP to the master for a graceful reload: new workers start, old ones
+finish their in-flight requests (up to GUNICORN_GRACEFUL_TIMEOUT) and exit.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count() * 2 + 1)))
+# Threads per worker for the WSGI (gthread) mode; ignored by the ASGI worker class.
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "uvicorn_worker.UvicornWorker" if os.getenv("SERVER_MODE") == "asgi" else "gthread"
+
+# A worker silent for longer than this is killed and replaced (the request timeout).
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Recycle workers every N requests (0 = never) to cap slow leaks; jitter avoids a thundering herd.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+# Worker heartbeat files on tmpfs instead of the container's overlay disk.
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# Every worker writes its request metrics here so whichever one answers /metrics can add them all up.
+# Workers inherit the environment, so setting it here is enough; it's emptied on each cold start.
+metrics_dir = os.environ.setdefault(
+    "METRICS_DIR", os.path.join(worker_tmp_dir or tempfile.gettempdir(), f"metrics-{os.getenv('PORT', '8000')}")
+)
+
+
+def on_starting(server):
+    shutil.rmtree(metrics_dir, ignore_errors=True)
@@ -0,0 +1,389 @@
+"""Request metrics in the Prometheus text format, cheap enough to leave on.
+
+`MetricsMiddleware` times every request and records, per route (the URL
+pattern, not the path, so ids don't explode the series):
+- a latency histogram and the number of requests in flight;
+- DB queries and the time spent in them, counted by a wrapper every
+  connection gets (`install_query_counter`);
+- request body bytes, and bytes/s for larger bodies (uploads);
+- time spent in named phases. Code marks them with `phase("auth")`,
+  `phase("storage")`, ...; "db" comes from the query counter and
+  "render" (JSON encoding) from `TimedJSONRenderer`.
+
+Each request's numbers go into the process-wide `registry` under one lock
+acquisition. `GET /metrics` renders them. Under gunicorn every worker is
+its own process, so with METRICS_DIR set each one also writes a snapshot
+there every METRICS_FLUSH_SECONDS (on a daemon thread) and a scrape adds
+up all the snapshots. A worker that exits keeps its counters in the sum;
+its gauges are dropped.
+
+Numbers kept elsewhere, like a cache's hit count, are added with
+`registry.register(...)` and read at every snapshot.
+
+With METRICS_SERVER_TIMING on, responses carry a `Server-Timing` header
+with the same phases, which browser dev tools show per request.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+THROUGHPUT_BUCKETS = tuple(n * 2**20 for n in (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000))
+# Bodies smaller than this are mostly JSON, so they don't go into the bytes/s histogram.
+UPLOAD_MIN_BYTES = 64 * 1024
+BODY_METHODS = frozenset(("POST", "PUT", "PATCH"))
+# Anything else is recorded as "other", so made-up methods can't add series.
+METHODS = frozenset(("GET", "HEAD", "OPTIONS", "DELETE")) | BODY_METHODS
+
+# name -> (type, help, label names, histogram buckets)
+METRICS = {
+    "http_requests_in_flight": ("gauge", "Requests being handled right now.", (), None),
+    "http_request_duration_seconds": (
+        "histogram",
+        "Time from the request reaching Django until the response is returned (streamed bodies not included).",
+        ("method", "route", "status"),
+        LATENCY_BUCKETS,
+    ),
+    "http_request_phase_seconds": (
+        "histogram",
+        "Time one request spent in a phase: auth (token or password verification), db, storage, render.",
+        ("route", "phase"),
+        LATENCY_BUCKETS,
+    ),
+    "db_queries_total": ("counter", "Database queries run while handling requests.", ("route",), None),
+    "http_request_body_bytes_total": ("counter", "Request body bytes received (Content-Length).", ("route",), None),
+    "http_upload_bytes_per_second": (
+        "histogram",
+        f"Body bytes over request duration, for bodies of at least {UPLOAD_MIN_BYTES} bytes.",
+        ("route",),
+        THROUGHPUT_BUCKETS,
+    ),
+}
+
+Labels = Tuple[str, ...]
+
+
+class RequestStats:
+    """What one request has used so far; reachable from any code running for it via `current`."""
+
+    __slots__ = ("queries", "phases")
+
+    def __init__(self):
+        self.queries = 0
+        self.phases: Dict[str, float] = {}
+
+    def add(self, phase_name: str, seconds: float) -> None:
+        self.phases[phase_name] = self.phases.get(phase_name, 0.0) + seconds
+
+
+# Copied into sync_to_async threads, so ORM calls from async views are counted too.
+current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+class phase:
+    """`with phase("auth"):` charges the time spent in the block to that phase of the current request.
+
+    A no-op outside a request. A plain class rather than @contextmanager,
+    which costs a generator per use.
+    """
+
+    __slots__ = ("name", "stats", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.stats = current.get()
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        if self.stats is not None:
+            self.stats.add(self.name, time.perf_counter() - self.start)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with phase("render"):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+def count_query(execute, sql, params, many, context):
+    stats = current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.add("db", time.perf_counter() - start)
+
+
+def add_query_counter(connection, **kwargs) -> None:
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+def install_query_counter() -> None:
+    """Wrap queries on every connection, including ones opened later on other threads."""
+    connection_created.connect(add_query_counter, dispatch_uid="metrics-query-counter")
+    for connection in connections.all(initialized_only=True):
+        add_query_counter(connection)
+
+
+class Registry:
+    def __init__(self):
+        self.in_flight = 0
+        # name -> labels -> counter value, or per-bucket counts (the last one +Inf) followed by the sum.
+        self._values: Dict[str, Dict[Labels, object]] = {name: {} for name in METRICS}
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._readers: Dict[str, Callable[[], float]] = {}
+
+    def register(self, name: str, kind: str, help_text: str, read: Callable[[], float]) -> None:
+        """Export an unlabeled counter or gauge that's kept elsewhere; `read()` is called at every snapshot."""
+        METRICS[name] = (kind, help_text, (), None)
+        self._readers[name] = read
+
+    def _observe(self, name: str, labels: Labels, value: float) -> None:
+        buckets = METRICS[name][3]
+        series = self._values[name].get(labels)
+        if series is None:
+            series = self._values[name][labels] = [0] * (len(buckets) + 1) + [0.0]
+        series[bisect_left(buckets, value)] += 1
+        series[-1] += value
+
+    def _inc(self, name: str, labels: Labels, value: float) -> None:
+        values = self._values[name]
+        values[labels] = values.get(labels, 0) + value
+
+    def started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, method: str, route: str, status: int, duration: float, stats: RequestStats, body_bytes: int) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._observe("http_request_duration_seconds", (method, route, str(status)), duration)
+            for name, seconds in stats.phases.items():
+                self._observe("http_request_phase_seconds", (route, name), seconds)
+            if stats.queries:
+                self._inc("db_queries_total", (route,), stats.queries)
+            if body_bytes:
+                self._inc("http_request_body_bytes_total", (route,), body_bytes)
+                if body_bytes >= UPLOAD_MIN_BYTES and duration > 0:
+                    self._observe("http_upload_bytes_per_second", (route,), body_bytes / duration)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            values = {
+                name: [[list(labels), list(value) if isinstance(value, list) else value] for labels, value in series.items()]
+                for name, series in self._values.items()
+            }
+            values["http_requests_in_flight"] = [[[], self.in_flight]]
+        for name, read in list(self._readers.items()):
+            values[name] = [[[], read()]]
+        return values
+
+    def clear(self) -> None:
+        with self._lock:
+            for series in self._values.values():
+                series.clear()
+
+    # Multi-process (METRICS_DIR)
+
+    def start_flusher(self) -> None:
+        if not settings.METRICS_DIR or self._flusher is not None:
+            return
+        Path(settings.METRICS_DIR).mkdir(parents=True, exist_ok=True)
+        self._flusher = threading.Thread(target=self._flush_forever, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def _flush_forever(self) -> None:
+        while True:
+            time.sleep(settings.METRICS_FLUSH_SECONDS)
+            try:
+                self.flush()
+            except OSError as exc:
+                logger.warning("Writing metrics snapshot failed: %s", exc)
+
+    def flush(self) -> None:
+        path = Path(settings.METRICS_DIR) / f"{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path)
+
+    def collect(self) -> List[dict]:
+        """Snapshots of every process to add up: this one live, the others from METRICS_DIR."""
+        snapshots = [self.snapshot()]
+        if not settings.METRICS_DIR:
+            return snapshots
+        own = f"{os.getpid()}.json"
+        for path in Path(settings.METRICS_DIR).glob("*.json"):
+            if path.name == own:
+                continue
+            try:
+                snapshot = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue  # replaced or removed while we read it
+            if not process_alive(int(path.stem)):
+                for name, (kind, *_) in METRICS.items():
+                    if kind == "gauge":
+                        snapshot.pop(name, None)
+            snapshots.append(snapshot)
+        return snapshots
+
+
+registry = Registry()
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge(snapshots: List[dict]) -> Dict[str, Dict[Labels, object]]:
+    merged: Dict[str, Dict[Labels, object]] = {name: {} for name in METRICS}
+    for snapshot in snapshots:
+        for name, series in snapshot.items():
+            if name not in merged:
+                continue
+            for labels, value in series:
+                labels = tuple(labels)
+                if isinstance(value, list):
+                    total = merged[name].get(labels)
+                    merged[name][labels] = value if total is None else [a + b for a, b in zip(total, value)]
+                else:
+                    merged[name][labels] = merged[name].get(labels, 0) + value
+    return merged
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def label_text(names: Tuple[str, ...], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render(merged: Dict[str, Dict[Labels, object]]) -> str:
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(merged[name].items()):
+            if kind != "histogram":
+                lines.append(f"{name}{label_text(label_names, labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), value[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{label_text(label_names, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{label_text(label_names, labels)} {value[-1]}")
+            lines.append(f"{name}_count{label_text(label_names, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint. Needs `Authorization: Bearer <METRICS_TOKEN>` when that is set."""
+    if settings.METRICS_TOKEN:
+        header = request.headers.get("Authorization", "")
+        if not constant_time_compare(header, f"Bearer {settings.METRICS_TOKEN}"):
+            return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+    return HttpResponse(render(merge(registry.collect())), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def server_timing(stats: RequestStats, total: float) -> str:
+    parts = []
+    for name, seconds in stats.phases.items():
+        entry = f"{name};dur={seconds * 1000:.2f}"
+        if name == "db":
+            entry += f';desc="{stats.queries} queries"'
+        parts.append(entry)
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """Times each request into `registry`; put it first in MIDDLEWARE so it sees everything."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install_query_counter()
+        registry.start_flusher()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats, token, start = self.start()
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            self.finish(request, response, stats, token, start)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, start = self.start()
+        response = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.finish(request, response, stats, token, start)
+        return response
+
+    def start(self) -> Tuple[RequestStats, contextvars.Token, float]:
+        registry.started()
+        stats = RequestStats()
+        return stats, current.set(stats), time.perf_counter()
+
+    def finish(self, request, response, stats: RequestStats, token: contextvars.Token, start: float) -> None:
+        duration = time.perf_counter() - start
+        current.reset(token)
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match is not None else "unmatched"
+        body_bytes = 0
+        if request.method in BODY_METHODS:
+            try:
+                body_bytes = int(request.META.get("CONTENT_LENGTH") or 0)
+            except ValueError:
+                pass
+        status = response.status_code if response is not None else 500
+        method = request.method if request.method in METHODS else "other"
+        registry.finished(method, route, status, duration, stats, body_bytes)
+        if response is not None and settings.METRICS_SERVER_TIMING:
+            response["Server-Timing"] = server_timing(stats, duration)
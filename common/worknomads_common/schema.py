@@ -0,0 +1,139 @@
+"""The cached /api/schema/ view, only imported when API_DOCS_ENABLED (drf-spectacular isn't loaded otherwise).
+
+`CachedSchemaView` serves /api/schema/ without introspecting every view and
+serializer on each request. The document comes from API_SCHEMA_FILE, which
+`manage.py build_schema` writes when the image is built. The file records a
+digest of API_SCHEMA_SETTINGS, the settings the document depends on; if the
+running settings differ, or there is no file, the document is generated on
+the first request instead. Either way it's kept in memory, along with each
+format (YAML, JSON) rendered and gzipped once. Responses carry
+an ETag, so a poller that sends If-None-Match gets a 304. A rewritten
+API_SCHEMA_FILE is picked up on the next request, with no restart.
+Swagger UI and ReDoc load the document from the same URL.
+`?lang=` and `?version=`, or API_SCHEMA_CACHE off, still go through the
+live generator.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from drf_spectacular.renderers import OpenApiJsonRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+# Top-level key in API_SCHEMA_FILE holding settings_digest(); dropped before the document is served.
+DIGEST_KEY = "x-settings-digest"
+
+logger = logging.getLogger(__name__)
+
+
+def generate_schema() -> dict:
+    """Introspect the API, as SpectacularAPIView does, and normalize the result to plain JSON types."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(urlconf=spectacular_settings.SERVE_URLCONF)
+    document = generator.get_schema(request=None, public=spectacular_settings.SERVE_PUBLIC)
+    # Lazy translations, tuples, ...: what's served shouldn't depend on whether it came from the file.
+    return json.loads(OpenApiJsonRenderer().render(document))
+
+
+def settings_digest() -> str:
+    values = {name: getattr(settings, name, None) for name in settings.API_SCHEMA_SETTINGS}
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def write_schema(path: Path) -> dict:
+    document = generate_schema()
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(OpenApiJsonRenderer().render({**document, DIGEST_KEY: settings_digest()}))
+    os.replace(tmp, path)
+    return document
+
+
+def file_stamp() -> Optional[int]:
+    try:
+        return os.stat(settings.API_SCHEMA_FILE).st_mtime_ns if settings.API_SCHEMA_FILE else None
+    except OSError:
+        return None
+
+
+class Rendered(NamedTuple):
+    body: bytes
+    gzipped: bytes
+    etag: str
+
+
+class SchemaCache:
+    """The document and its renderings, one per renderer class, shared by the process's threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        self._document: Optional[dict] = None
+        # mtime of API_SCHEMA_FILE when the document was loaded; None if there was no file.
+        self._stamp: Optional[int] = None
+        self._rendered: Dict[type, Rendered] = {}
+
+    def rendered(self, renderer) -> Rendered:
+        stamp = file_stamp()
+        with self._lock:
+            # Under the lock, so a burst of first requests generates the document once.
+            if self._document is None or stamp != self._stamp:
+                self._document, self._stamp = self.load(stamp)
+                self._rendered = {}
+            rendered = self._rendered.get(type(renderer))
+            if rendered is None:
+                body = renderer.render(self._document, renderer.media_type, {})
+                etag = "W/" + quote_etag(hashlib.sha256(body).hexdigest()[:32])
+                rendered = self._rendered[type(renderer)] = Rendered(body, gzip.compress(body, mtime=0), etag)
+            return rendered
+
+    def load(self, stamp: Optional[int]) -> Tuple[dict, Optional[int]]:
+        if stamp is not None:
+            try:
+                with open(settings.API_SCHEMA_FILE, "rb") as f:
+                    document = json.load(f)
+            except (OSError, ValueError):
+                document = None
+            if isinstance(document, dict) and document.pop(DIGEST_KEY, None) == settings_digest():
+                return document, stamp
+            logger.info("%s is unreadable or was built with other settings; generating the schema", settings.API_SCHEMA_FILE)
+        # Keep the file's stamp, so the file isn't looked at again until it changes.
+        return generate_schema(), stamp
+
+
+schema_cache = SchemaCache()
+
+
+class CachedSchemaView(SpectacularAPIView):
+    def _get_schema_response(self, request):
+        if not settings.API_SCHEMA_CACHE or self.api_version or request.version or request.GET.get("version") or request.GET.get("lang"):
+            return super()._get_schema_response(request)
+        rendered = schema_cache.rendered(request.accepted_renderer)
+        response = get_conditional_response(request, etag=rendered.etag)
+        if response is None:
+            gzipped = bool(ACCEPTS_GZIP.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+            charset = request.accepted_renderer.charset
+            response = HttpResponse(
+                rendered.gzipped if gzipped else rendered.body,
+                content_type=f"{request.accepted_media_type}; charset={charset}" if charset else request.accepted_media_type,
+            )
+            if gzipped:
+                response["Content-Encoding"] = "gzip"
+            response["Content-Disposition"] = f'inline; filename="{self._get_filename(request, None)}"'
+        response["ETag"] = rendered.etag
+        # Cacheable, but always revalidated; the ETag makes that a 304.
+        response["Cache-Control"] = "no-cache"
+        patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+        return response
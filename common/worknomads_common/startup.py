@@ -0,0 +1,100 @@
+"""Container start-up work that can be skipped when nothing changed.
+
+The entrypoint used to run `migrate`, `collectstatic` and a `manage.py
+shell` for the superuser on every boot, each in a fresh interpreter that
+also ran the system checks (importing every URLconf and view). `manage.py
+bootstrap` does all of it in one process, without checks, and skips each
+step that wouldn't change anything:
+- migrations: the migration files on disk are compared with the
+  django_migrations table, one query and no migration imports;
+- static files: a fingerprint of every source file (path, size, mtime) is
+  compared with the one written next to the last collectstatic. The image
+  build runs `bootstrap --static-only`, so a container boots with a match;
+- the superuser is only written when its flags, email or password differ.
+  Checking the password costs one hash, so leave DJANGO_SUPERUSER_PASSWORD
+  unset where the admin isn't needed.
+"""
+import hashlib
+import os
+import pkgutil
+from importlib.util import find_spec
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+
+STATIC_FINGERPRINT_NAME = ".collectstatic-fingerprint"
+# collectstatic's default ignore patterns.
+STATIC_IGNORE = ["CVS", ".*", "*~"]
+
+
+def migration_files() -> List[Tuple[str, str]]:
+    """(app_label, name) for every migration file on disk, found without importing any of them."""
+    found = []
+    for app_config in apps.get_app_configs():
+        module_name, _ = MigrationLoader.migrations_module(app_config.label)
+        spec = find_spec(module_name) if module_name else None
+        if spec is None or not spec.submodule_search_locations:
+            continue
+        for module in pkgutil.iter_modules(spec.submodule_search_locations):
+            if not module.ispkg and module.name[0] not in "_~":
+                found.append((app_config.label, module.name))
+    return sorted(found)
+
+
+def unapplied_migrations(database: str = DEFAULT_DB_ALIAS) -> List[Tuple[str, str]]:
+    applied = MigrationRecorder(connections[database]).applied_migrations()
+    return [key for key in migration_files() if key not in applied]
+
+
+def static_fingerprint() -> str:
+    digest = hashlib.sha256(f"{settings.STATIC_ROOT}\0{settings.STORAGES['staticfiles']['BACKEND']}\n".encode())
+    entries = []
+    for finder in finders.get_finders():
+        for path, storage in finder.list(STATIC_IGNORE):
+            stat = os.stat(storage.path(path))
+            entries.append(f"{getattr(storage, 'prefix', None) or ''}\0{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n")
+    for entry in sorted(entries):
+        digest.update(entry.encode())
+    return digest.hexdigest()
+
+
+def static_fingerprint_path() -> Path:
+    return Path(settings.STATIC_ROOT) / STATIC_FINGERPRINT_NAME
+
+
+def collected_fingerprint() -> Optional[str]:
+    try:
+        return static_fingerprint_path().read_text().strip()
+    except OSError:
+        return None
+
+
+def record_static_fingerprint(fingerprint: str) -> None:
+    path = static_fingerprint_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(fingerprint)
+
+
+def ensure_superuser(username: str, email: str, password: str) -> str:
+    """Create or update the superuser; returns "created", "updated" or "unchanged"."""
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    user, created = User.objects.get_or_create(username=username, defaults={"email": email, "is_staff": True, "is_superuser": True})
+    if created:
+        user.set_password(password)
+        user.save(update_fields=["password"])
+        return "created"
+    if user.is_staff and user.is_superuser and user.email == email and user.check_password(password):
+        return "unchanged"
+    user.is_staff = user.is_superuser = True
+    user.email = email
+    user.set_password(password)
+    user.save()
+    return "updated"
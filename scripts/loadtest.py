@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+"""Requests/second for `/api/media/list/` and `/api/auth/login/` under each serving mode.
+
+Against already-running services (e.g. `docker compose up` with SERVER_MODE set):
+
+    python scripts/loadtest.py --auth-url http://localhost:8001 --backend-url http://localhost:8002
+
+Or let the script start both services locally through their entrypoints, once
+per mode, and print a side-by-side comparison:
+
+    python scripts/loadtest.py --spawn runserver,wsgi,asgi
+
+Stdlib only; every worker thread keeps its own keep-alive connection.
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class Endpoint:
+    def __init__(self, base_url: str, method: str, path: str, body=None, headers=None):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.method, self.path = method, path
+        self.body = json.dumps(body).encode() if body is not None else None
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def call(self, conn: http.client.HTTPConnection):
+        conn.request(self.method, self.path, body=self.body, headers=self.headers)
+        resp = conn.getresponse()
+        payload = resp.read()
+        return resp.status, payload
+
+
+def request_once(endpoint: Endpoint):
+    conn = http.client.HTTPConnection(endpoint.host, endpoint.port, timeout=30)
+    try:
+        return endpoint.call(conn)
+    finally:
+        conn.close()
+
+
+def hammer(endpoint: Endpoint, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        conn = http.client.HTTPConnection(endpoint.host, endpoint.port, timeout=30)
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status, _ = endpoint.call(conn)
+                ok = status < 400
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection(endpoint.host, endpoint.port, timeout=30)
+            if ok:
+                local.append(time.perf_counter() - start)
+            else:
+                failed += 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p95": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else float("nan"),
+        "errors": errors[0],
+    }
+
+
+def run_suite(auth_url: str, backend_url: str, concurrency: int, duration: float) -> dict:
+    username = f"load-{uuid.uuid4().hex[:8]}"
+    password = "load-test-Pa55word"
+    creds = {"username": username, "password": password}
+    status, body = request_once(Endpoint(auth_url, "POST", "/api/auth/register/", {**creds, "email": f"{username}@example.com"}))
+    if status != 201:
+        sys.exit(f"register failed: {status} {body[:200]!r}")
+    status, body = request_once(Endpoint(auth_url, "POST", "/api/auth/login/", creds))
+    if status != 200:
+        sys.exit(f"login failed: {status} {body[:200]!r}")
+    access = json.loads(body)["access"]
+
+    listing = Endpoint(backend_url, "GET", "/api/media/list/", headers={"Authorization": f"Bearer {access}"})
+    login = Endpoint(auth_url, "POST", "/api/auth/login/", creds)
+    return {
+        "GET /api/media/list/": hammer(listing, concurrency, duration),
+        "POST /api/auth/login/": hammer(login, concurrency, duration),
+    }
+
+
+def wait_for_port(port: int, timeout: float = 60) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"nothing listening on :{port} after {timeout}s")
+
+
+def spawn(service: str, mode: str, port: int, workdir: Path) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "SERVER_MODE": mode,
+        "PORT": str(port),
+        "DJANGO_SETTINGS_MODULE": f"{service}.settings",
+        "WSGI_APP": f"{service}.wsgi:application",
+        "ASGI_APP": f"{service}.asgi:application",
+        "DATABASE_URL": f"sqlite:///{(workdir / f'{service}.db').as_posix()}",
+        "SIMPLE_JWT_SIGNING_KEY": "load-test-signing-key",
+        "DJANGO_DEBUG": "False",
+        "DJANGO_ALLOWED_HOSTS": "*",
+        "GUNICORN_ACCESS_LOG": "",
+        "DJANGO_SUPERUSER_USERNAME": "",
+    }
+    log = open(workdir / f"{service}-{mode}.log", "wb")
+    return subprocess.Popen(
+        ["sh", "../common/entrypoint.sh"], cwd=ROOT / service, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True
+    )
+
+
+def stop(proc: subprocess.Popen) -> None:
+    os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+def print_results(label: str, results: dict) -> None:
+    for name, r in results.items():
+        print(f"{label:10} {name:24} {r['rps']:9.1f} req/s  p50 {r['p50']:8.1f} ms  p95 {r['p95']:8.1f} ms  errors {r['errors']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--auth-url", default="http://localhost:8001")
+    parser.add_argument("--backend-url", default="http://localhost:8002")
+    parser.add_argument("--spawn", help="Comma-separated SERVER_MODEs to start locally and compare (runserver,wsgi,asgi).")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per endpoint.")
+    parser.add_argument("--label", default="target")
+    args = parser.parse_args()
+
+    if not args.spawn:
+        print_results(args.label, run_suite(args.auth_url, args.backend_url, args.concurrency, args.duration))
+        return
+
+    for mode in [m.strip() for m in args.spawn.split(",") if m.strip()]:
+        workdir = Path(tempfile.mkdtemp(prefix=f"loadtest-{mode}-"))
+        procs = [spawn("auth_server", mode, 18001, workdir), spawn("backend_server", mode, 18002, workdir)]
+        try:
+            wait_for_port(18001)
+            wait_for_port(18002)
+            results = run_suite("http://127.0.0.1:18001", "http://127.0.0.1:18002", args.concurrency, args.duration)
+        finally:
+            for proc in procs:
+                stop(proc)
+        print_results(mode, results)
+
+
+if __name__ == "__main__":
+    main()
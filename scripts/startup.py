@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""Time from container start to the first answered request, per STARTUP_MODE.
+
+Starts each service locally through its entrypoint, the way the image does,
+and polls a real endpoint (`/api/media/list/`, `/api/auth/login/`) until it
+gets an HTTP response. Any status counts; a 401 or 405 still means the app
+is loaded and routing. The database is migrated beforehand and the
+superuser already exists, as for a new replica of a running deployment
+(`--cold` starts from an empty database instead). Modes:
+- legacy: the old entrypoint steps, one interpreter each (makemigrations,
+  migrate, collectstatic, `manage.py shell` for the superuser);
+- full, fast, none: STARTUP_MODE as documented in common/entrypoint.sh.
+Each runs once per `--api-docs` value.
+
+    python scripts/startup.py --modes legacy,fast,none --api-docs true,false --repeat 3
+
+Stdlib only.
+"""
+import argparse
+import http.client
+import os
+import signal
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PROBES = {"auth_server": ("GET", "/api/auth/login/"), "backend_server": ("GET", "/api/media/list/")}
+PORTS = {"auth_server": 18101, "backend_server": 18102}
+
+# The entrypoint's pre-serving steps before STARTUP_MODE existed (the backend also ran makemigrations first).
+LEGACY_STEPS = """
+python manage.py migrate --noinput
+python manage.py collectstatic --noinput || true
+if [ -n "$DJANGO_SUPERUSER_USERNAME" ] && [ -n "$DJANGO_SUPERUSER_PASSWORD" ]; then
+python manage.py shell <<'PY'
+from django.contrib.auth import get_user_model
+import os
+User = get_user_model()
+username = os.environ.get('DJANGO_SUPERUSER_USERNAME')
+email = os.environ.get('DJANGO_SUPERUSER_EMAIL','')
+password = os.environ.get('DJANGO_SUPERUSER_PASSWORD')
+u, created = User.objects.get_or_create(username=username, defaults={
+    'email': email,
+    'is_staff': True,
+    'is_superuser': True,
+})
+if not created:
+    u.is_staff = True
+    u.is_superuser = True
+u.email = email
+u.set_password(password)
+u.save()
+print('Superuser ready:', u.username)
+PY
+fi
+"""
+
+
+def service_env(service: str, workdir: Path, args, api_docs: str) -> dict:
+    env = {
+        **os.environ,
+        "SERVER_MODE": args.server_mode,
+        "PORT": str(PORTS[service]),
+        "DJANGO_SETTINGS_MODULE": f"{service}.settings",
+        "WSGI_APP": f"{service}.wsgi:application",
+        "ASGI_APP": f"{service}.asgi:application",
+        "DATABASE_URL": f"sqlite:///{(workdir / f'{service}.db').as_posix()}",
+        "SIMPLE_JWT_SIGNING_KEY": "startup-bench-signing-key",
+        "DJANGO_DEBUG": "False",
+        "DJANGO_ALLOWED_HOSTS": "*",
+        "WEB_CONCURRENCY": str(args.workers),
+        "GUNICORN_ACCESS_LOG": "",
+        "API_DOCS_ENABLED": api_docs,
+        "DJANGO_SUPERUSER_USERNAME": "" if args.no_superuser else "admin",
+        "DJANGO_SUPERUSER_PASSWORD": "startup-bench-Pa55word",
+        "DJANGO_SUPERUSER_EMAIL": "admin@example.com",
+    }
+    # Keep the refresh-token revocation filter out of the repo.
+    env.setdefault("REVOCATION_FILTER_PATH", str(workdir / "revoked.bloom"))
+    return env
+
+
+def spawn(service: str, mode: str, env: dict, log: Path) -> subprocess.Popen:
+    if mode == "legacy":
+        steps = LEGACY_STEPS
+        if service == "backend_server":
+            steps = "python manage.py makemigrations --noinput || true\n" + steps
+        command = ["sh", "-c", f"set -e\n{steps}\nexec sh ../common/entrypoint.sh"]
+        env = {**env, "STARTUP_MODE": "none"}
+    else:
+        command = ["sh", "../common/entrypoint.sh"]
+        env = {**env, "STARTUP_MODE": mode}
+    return subprocess.Popen(
+        command, cwd=ROOT / service, env=env, stdout=open(log, "ab"), stderr=subprocess.STDOUT, start_new_session=True
+    )
+
+
+def first_response(service: str, proc: subprocess.Popen, started: float, timeout: float) -> float:
+    method, path = PROBES[service]
+    while time.perf_counter() - started < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{service} exited with {proc.returncode} before answering")
+        conn = http.client.HTTPConnection("127.0.0.1", PORTS[service], timeout=timeout)
+        try:
+            conn.request(method, path)
+            conn.getresponse().read()
+            return time.perf_counter() - started
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.02)
+        finally:
+            conn.close()
+    raise RuntimeError(f"{service} didn't answer within {timeout}s")
+
+
+def stop(proc: subprocess.Popen) -> None:
+    os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="legacy,full,fast,none")
+    parser.add_argument("--api-docs", default="true", help="Comma-separated API_DOCS_ENABLED values to try.")
+    parser.add_argument("--services", default="auth_server,backend_server")
+    parser.add_argument("--server-mode", default="wsgi", choices=("runserver", "wsgi", "asgi"))
+    parser.add_argument("--workers", type=int, default=2, help="WEB_CONCURRENCY for wsgi/asgi.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cold", action="store_true", help="Start every run from an empty database.")
+    parser.add_argument("--no-superuser", action="store_true", help="Leave DJANGO_SUPERUSER_* unset.")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    services = [s.strip() for s in args.services.split(",") if s.strip()]
+    workdir = Path(tempfile.mkdtemp(prefix="startup-"))
+    print(f"logs in {workdir}")
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        for api_docs in [d.strip() for d in args.api_docs.split(",") if d.strip()]:
+            for service in services:
+                env = service_env(service, workdir, args, api_docs)
+                log = workdir / f"{service}-{mode}-docs-{api_docs}.log"
+                if not args.cold:
+                    # Warm: an up-to-date database and static files, as for a new replica.
+                    subprocess.run(["python", "manage.py", "bootstrap"], cwd=ROOT / service, env=env, stdout=open(log, "ab"), check=True)
+                samples = []
+                for _ in range(args.repeat):
+                    if args.cold:
+                        (workdir / f"{service}.db").unlink(missing_ok=True)
+                    started = time.perf_counter()
+                    proc = spawn(service, mode, env, log)
+                    try:
+                        samples.append(first_response(service, proc, started, args.timeout))
+                    finally:
+                        stop(proc)
+                print(
+                    f"{mode:7} docs={api_docs:5} {service:15} first response after "
+                    f"median {statistics.median(samples):5.2f}s  min {min(samples):5.2f}s  max {max(samples):5.2f}s"
+                )
+
+
+if __name__ == "__main__":
+    main()